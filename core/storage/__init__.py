@@ -24,6 +24,15 @@ def get_compute_db_path(symbol: str) -> Path:
     return PROJECT_ROOT / "data" / "assets" / symbol / "compute.db"
 
 
+def connect_readonly(path: str | Path) -> sqlite3.Connection:
+    """Read-only connection for validation/verification reads (takes no write locks, never
+    creates the file). Memory-maps the DB so large scans read from the page cache directly."""
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    conn.execute("PRAGMA mmap_size=30000000000;")
+    conn.execute("PRAGMA cache_size=-200000;")
+    return conn
+
+
 def get_conn() -> sqlite3.Connection:
     Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
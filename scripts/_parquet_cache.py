@@ -0,0 +1,76 @@
+"""
+Parquet sidecar cache shared by the validation scripts.
+
+cached_parquet(source, key, build, cache_dir) returns build() for a source file
+(CSV, SQLite DB) and keeps the frame as <key>@<size>-<mtime_ns><version>.parquet in
+cache_dir, so a rerun against an unchanged source skips the parse/query. Editing
+the source changes its size or mtime and misses; pass version for builds whose
+output also depends on code or parameters. I/O goes through Polars (pandas
+Parquet needs pyarrow).
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+from pathlib import Path
+from typing import Callable, Union
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+KEY_DELIM = "@"  # ends the key in the file name, so stale cleanup never matches a longer key
+
+
+def _round_trips(s: pd.Series) -> bool:
+    """Numeric/bool and naive-datetime columns, or NA-free string columns, read back unchanged."""
+    if isinstance(s.dtype, np.dtype) and s.dtype.kind in "biufM":
+        return True
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return pd.api.types.is_string_dtype(s.cat.categories) and s.notna().all()
+    return pd.api.types.is_string_dtype(s) and s.notna().all()
+
+
+def _to_polars(df: pd.DataFrame) -> pl.DataFrame:
+    return pl.DataFrame([
+        pl.Series(c, df[c].to_numpy()) if df[c].dtype.kind in "biufM"
+        else pl.Series(c, df[c].astype(object).tolist(), dtype=pl.String)
+        for c in df.columns
+    ])
+
+
+def cached_parquet(
+    source: Union[str, Path],
+    key: str,
+    build: Callable[[], pd.DataFrame],
+    cache_dir: Union[str, Path],
+    version: str = "",
+) -> pd.DataFrame:
+    """
+    build() behind a Parquet sidecar in cache_dir keyed by source size + mtime.
+    Hit: read the cached frame (default RangeIndex; strings and categoricals come
+    back as object columns). Miss: build, drop stale caches for the same key, and
+    write when every column round-trips exactly. A missing source is not cached:
+    build() runs and reports it.
+    """
+    source = Path(source)
+    cache_dir = Path(cache_dir)
+    if not source.exists():
+        return build()
+    st = source.stat()
+    prefix = f"{key}{KEY_DELIM}"
+    cache = cache_dir / f"{prefix}{st.st_size}-{st.st_mtime_ns}{version}.parquet"
+    if cache.exists():
+        pl_df = pl.read_parquet(cache)
+        return pd.DataFrame({c: pl_df[c].to_numpy() for c in pl_df.columns})
+
+    df = build()
+    if all(_round_trips(df[c]) for c in df.columns):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in cache_dir.glob(f"{glob.escape(prefix)}*.parquet"):
+            stale.unlink()
+        tmp = cache.with_suffix(f".{os.getpid()}.tmp")
+        _to_polars(df).write_parquet(tmp)
+        os.replace(tmp, cache)
+    return df
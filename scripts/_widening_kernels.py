@@ -0,0 +1,226 @@
+"""
+Forward-window kernels shared by the escalation validation scripts.
+
+forward_stats(close, H) returns, for every bar t with a full H-bar future window:
+- fwd : close_{t+H}/close_t - 1
+- mdd : min(close_{t+k}/close_t - 1), k=1..H
+- mur : max(close_{t+k}/close_t - 1), k=1..H
+The last H entries are NaN, and a NaN close anywhere in (t, t+H] makes mdd/mur
+NaN at t (as the original per-bar loop did). forward_stats_multi stacks these for several horizons.
+close may be float32 (half the bytes streamed through the window scans); the
+ratios are always formed and returned in float64.
+
+nonoverlap_starts(mask, H) is the event-driven episode scan: keep the first True
+bar, skip the next H bars, repeat.
+
+stationary_bootstrap_means(x, n_boot, block_len, rng) is the Politis-Romano
+stationary bootstrap of mean(x): circular blocks with geometric lengths (mean
+block_len), so serial dependence in x survives the resample.
+
+upper_quantile and cliffs_delta are the train-cutoff and effect-size helpers of
+the rolling-OOS scripts (rolling_oos, conditional_stress).
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Numba-accelerated path when available (pip install regime-engine[perf])
+try:
+    import numba
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+
+def _forward_stats_numba(close, H):
+    """Numba JIT: one pass with monotonic index deques over the window (t, t+H]."""
+    n = close.shape[0]
+    fwd = np.full(n, np.nan)
+    mdd = np.full(n, np.nan)
+    mur = np.full(n, np.nan)
+    if n <= H:
+        return fwd, mdd, mur
+    # indices only ever move forward, so plain arrays of size n serve as deques
+    qmin = np.empty(n, dtype=np.int64)
+    qmax = np.empty(n, dtype=np.int64)
+    hmin = tmin = 0
+    hmax = tmax = 0
+    last_nan = -1
+    for j in range(1, n):
+        c = close[j]
+        if np.isnan(c):
+            # NaN never enters the deques; any NaN in the window makes mdd/mur NaN
+            last_nan = j
+        else:
+            while tmin > hmin and close[qmin[tmin - 1]] >= c:
+                tmin -= 1
+            qmin[tmin] = j
+            tmin += 1
+            while tmax > hmax and close[qmax[tmax - 1]] <= c:
+                tmax -= 1
+            qmax[tmax] = j
+            tmax += 1
+
+        i = j - H
+        if i < 0:
+            continue
+        while hmin < tmin and qmin[hmin] <= i:
+            hmin += 1
+        while hmax < tmax and qmax[hmax] <= i:
+            hmax += 1
+        base = np.float64(close[i])
+        fwd[i] = np.float64(c) / base - 1.0
+        if last_nan <= i:
+            mdd[i] = np.float64(close[qmin[hmin]]) / base - 1.0
+            mur[i] = np.float64(close[qmax[hmax]]) / base - 1.0
+    return fwd, mdd, mur
+
+
+if _HAS_NUMBA:
+    _forward_stats_numba = numba.jit(nopython=True, cache=True)(_forward_stats_numba)
+
+
+def _as_price_array(close: np.ndarray) -> np.ndarray:
+    close = np.ascontiguousarray(close)
+    if close.dtype not in (np.float32, np.float64):
+        close = close.astype(np.float64)
+    return close
+
+
+def forward_stats(close: np.ndarray, H: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    close = _as_price_array(close)
+    if _HAS_NUMBA:
+        return _forward_stats_numba(close, int(H))
+
+    close = close.astype(np.float64, copy=False)
+
+    n = len(close)
+    fwd = np.full(n, np.nan)
+    if n > H:
+        fwd[:-H] = close[H:] / close[:-H] - 1.0
+    # rolling window ending at t+H covers close[t+1:t+H+1]; dividing its extreme by
+    # close[t] equals the extreme of the ratios (division by a positive price is monotonic)
+    s = pd.Series(close)
+    mdd = s.rolling(H, min_periods=H).min().shift(-H).to_numpy() / close - 1.0
+    mur = s.rolling(H, min_periods=H).max().shift(-H).to_numpy() / close - 1.0
+    return fwd, mdd, mur
+
+
+def forward_stats_multi(close: np.ndarray, Hs) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(len(Hs), n) fwd/mdd/mur arrays; close is converted once and stays hot across horizons."""
+    close = _as_price_array(close)
+    fwd = np.empty((len(Hs), len(close)))
+    mdd = np.empty_like(fwd)
+    mur = np.empty_like(fwd)
+    for k, H in enumerate(Hs):
+        fwd[k], mdd[k], mur[k] = forward_stats(close, H)
+    return fwd, mdd, mur
+
+
+def _nonoverlap_starts_numba(mask, step):
+    """Numba JIT: forward scan keeping i where mask[i] and then jumping to i + step."""
+    n = mask.shape[0]
+    out = np.empty(n, dtype=np.int64)
+    k = 0
+    i = 0
+    while i < n:
+        if mask[i]:
+            out[k] = i
+            k += 1
+            i += step
+        else:
+            i += 1
+    return out[:k]
+
+
+if _HAS_NUMBA:
+    _nonoverlap_starts_numba = numba.jit(nopython=True, cache=True)(_nonoverlap_starts_numba)
+
+
+def nonoverlap_starts(mask: np.ndarray, H: int) -> np.ndarray:
+    """Positions of non-overlapping episode starts: each kept True bar consumes itself and the next H - 1."""
+    mask = np.ascontiguousarray(mask, dtype=np.bool_)
+    if _HAS_NUMBA:
+        return _nonoverlap_starts_numba(mask, int(H))
+
+    # only True bars can start an episode: hop between them, one searchsorted per episode
+    pos = np.flatnonzero(mask)
+    keep = []
+    j = 0
+    while j < len(pos):
+        keep.append(pos[j])
+        j = int(np.searchsorted(pos, pos[j] + H, side="left"))
+    return np.asarray(keep, dtype=np.int64)
+
+
+# index-matrix elements per stationary-bootstrap chunk (bounds peak memory for long samples)
+_BOOT_CHUNK_ELEMS = 1 << 22
+
+
+def stationary_bootstrap_means(x: np.ndarray, n_boot: int, block_len: float,
+                               rng: np.random.Generator) -> np.ndarray:
+    """(n_boot,) means of stationary-bootstrap resamples of x (x in time order)."""
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    p = 1.0 / max(float(block_len), 1.0)
+    t = np.arange(n)
+    out = np.empty(n_boot)
+    rows = max(1, _BOOT_CHUNK_ELEMS // max(n, 1))
+    for r0 in range(0, n_boot, rows):
+        m = min(rows, n_boot - r0)
+        # a block starts at t=0 and wherever the geometric clock fires; each start draws a
+        # uniform origin and the block then walks forward circularly until the next start
+        new_block = rng.random((m, n)) < p
+        new_block[:, 0] = True
+        origin = rng.integers(0, n, size=(m, n))
+        last = np.maximum.accumulate(np.where(new_block, t, 0), axis=1)
+        idx = (np.take_along_axis(origin, last, axis=1) + (t - last)) % n
+        out[r0:r0 + m] = x[idx].mean(axis=1)
+    return out
+
+
+def upper_quantile(a: np.ndarray, q: float) -> float:
+    """
+    np.nanquantile(a, q) (linear method) via np.partition on the two bracketing
+    order statistics instead of nanquantile's generic per-call machinery.
+    """
+    a = a[~np.isnan(a)]
+    n = len(a)
+    if n == 0:
+        return float("nan")
+    pos = q * (n - 1)
+    k = int(math.floor(pos))
+    k1 = min(k + 1, n - 1)
+    part = np.partition(a, [k, k1])
+    lo, hi = part[k], part[k1]
+    # same lerp as numpy: symmetric form keeps the result exact at both ends
+    t = pos - k
+    d = hi - lo
+    return float(hi - d * (1.0 - t) if t >= 0.5 else lo + d * t)
+
+
+def cliffs_delta(x: np.ndarray, y: np.ndarray, u: Optional[float] = None) -> float:
+    """
+    Cliff's delta: probability that a random x is greater than a random y minus reverse.
+    Returns in [-1, 1]. Negative means x tends to be smaller than y.
+    Implementation: Mann-Whitney identity delta = 2U / (n*m) - 1, with U = rank sum of x
+    (midranks for ties) - n(n+1)/2. Pass u (Mann-Whitney U of x vs y) to reuse an
+    existing sort; it is only used when x and y contain no NaNs.
+    """
+    nx, ny = len(x), len(y)
+    x = x[~np.isnan(x)]
+    y = y[~np.isnan(y)]
+    n, m = len(x), len(y)
+    if n == 0 or m == 0:
+        return np.nan
+    if u is None or not np.isfinite(u) or (n, m) != (nx, ny):
+        from scipy.stats import rankdata  # only the rank path needs scipy
+
+        ranks = rankdata(np.concatenate([x, y]))
+        u = ranks[:n].sum() - n * (n + 1) / 2.0
+    return 2.0 * u / (n * m) - 1.0
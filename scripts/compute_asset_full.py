@@ -475,20 +475,15 @@ def update_latest_state_hazard(conn: sqlite3.Connection, symbol: str) -> None:
         )
 
 
-def main() -> None:
-    ap = argparse.ArgumentParser(description="Single compute: escalation + state_history + latest_state")
-    ap.add_argument("--symbol", required=True, help="e.g. QQQ, SPY")
-    ap.add_argument("-t", "--timeframe", help="Single TF. Default: all")
-    ap.add_argument(
-        "--input",
-        choices=["parquet", "frozen"],
-        default="parquet",
-        help="Bar source: parquet (default). frozen is deprecated.",
-    )
-    args = ap.parse_args()
-    symbol = args.symbol.strip().upper()
-    tfs = [args.timeframe] if args.timeframe else TIMEFRAMES
-    use_parquet = args.input == "parquet"
+def run(symbol: str, source: str = "parquet", timeframe: str | None = None) -> dict:
+    """
+    Full compute for one symbol (escalation + state_history + latest_state) into compute.db.
+    Library entry point for batch drivers (vultr_run_compute); main() is the CLI wrapper.
+    Returns the run totals.
+    """
+    symbol = symbol.strip().upper()
+    tfs = [timeframe] if timeframe else TIMEFRAMES
+    use_parquet = source == "parquet"
 
     conn_read: sqlite3.Connection | None = None
     frozen: Path | None = None
@@ -573,6 +568,26 @@ def main() -> None:
     conn_write.close()
 
     print(f"\nDONE. escalation={total_esc} | state wrote={total_state_wrote} skipped={total_state_skipped}")
+    return {
+        "escalation": total_esc,
+        "state_wrote": total_state_wrote,
+        "state_skipped": total_state_skipped,
+        "bars": bar_count_used,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Single compute: escalation + state_history + latest_state")
+    ap.add_argument("--symbol", required=True, help="e.g. QQQ, SPY")
+    ap.add_argument("-t", "--timeframe", help="Single TF. Default: all")
+    ap.add_argument(
+        "--input",
+        choices=["parquet", "frozen"],
+        default="parquet",
+        help="Bar source: parquet (default). frozen is deprecated.",
+    )
+    args = ap.parse_args()
+    run(args.symbol, source=args.input, timeframe=args.timeframe)
 
 
 if __name__ == "__main__":
@@ -3,12 +3,18 @@
 Validate and clean *_sample.csv files.
 Produces *_clean.csv and data_validation_report.csv.
 """
-import re
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
+# Numba-accelerated path when available (pip install regime-engine[perf])
+try:
+    import numba
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
 # =========================
 # CONFIG
 # =========================
@@ -27,7 +33,8 @@ CLOSE_CANDIDATES = ["Close", "close", "Price", "price"]
 ADJ_CLOSE_CANDIDATES = ["Adj Close", "AdjClose", "adj close", "adj_close", "Adj_Close"]
 VOLUME_CANDIDATES = ["Volume", "Vol.", "vol", "volume"]
 
-DIVIDEND_TEXT_PAT = re.compile(r"dividend|split", re.IGNORECASE)
+# Lower-case literals matched against the lower-cased OHLC text (no regex needed)
+DIVIDEND_TEXT_TOKENS = ("dividend", "split")
 
 
 def _first_present(cols, candidates):
@@ -38,15 +45,60 @@ def _first_present(cols, candidates):
 
 
 def _coerce_numeric(series: pd.Series) -> pd.Series:
-    # Remove commas and stray spaces
-    s = series.astype(str).str.replace(",", "", regex=False).str.strip()
+    # Columns are read as str (see validate_and_clean_file); remove commas and stray spaces
+    s = series.str.replace(",", "", regex=False).str.strip()
     # Empty strings -> NaN
     s = s.replace({"": np.nan, "nan": np.nan, "None": np.nan})
     return pd.to_numeric(s, errors="coerce")
 
 
+def _ohlc_gap_checks_numba(o, h, l, c, gap_days):
+    """Numba JIT: OHLC sanity violations and >7 day gaps in one pass.
+    Same rule as the pandas check: High >= nanmax(Open, Close, Low) and
+    Low <= nanmin(Open, Close, High); any NaN comparison counts as a violation.
+    """
+    violations = 0
+    for i in range(o.shape[0]):
+        mx = o[i]
+        if np.isnan(mx) or c[i] > mx:
+            mx = c[i]
+        if np.isnan(mx) or l[i] > mx:
+            mx = l[i]
+        mn = o[i]
+        if np.isnan(mn) or c[i] < mn:
+            mn = c[i]
+        if np.isnan(mn) or h[i] < mn:
+            mn = h[i]
+        if not (h[i] >= mx and l[i] <= mn):
+            violations += 1
+    gaps = 0
+    for i in range(gap_days.shape[0]):
+        if gap_days[i] > 7:
+            gaps += 1
+    return violations, gaps
+
+
+if _HAS_NUMBA:
+    _ohlc_gap_checks_numba = numba.jit(nopython=True, cache=True)(_ohlc_gap_checks_numba)
+
+
+def _ohlc_gap_checks(o, h, l, c, gap_days):
+    """Return (ohlc_sanity_violations, date_gaps_gt_7d) for float64 OHLC arrays
+    and integer day gaps between consecutive rows."""
+    if _HAS_NUMBA:
+        return _ohlc_gap_checks_numba(o, h, l, c, gap_days)
+    mx = np.fmax(np.fmax(o, c), l)
+    mn = np.fmin(np.fmin(o, c), h)
+    ok = (h >= mx) & (l <= mn)
+    return int(np.count_nonzero(~ok)), int(np.count_nonzero(gap_days > 7))
+
+
 def validate_and_clean_file(path: Path) -> dict:
-    raw = pd.read_csv(path)
+    # Read everything as text: every column is re-coerced below, so pandas type
+    # inference would be wasted work.
+    raw = pd.read_csv(
+        path, dtype=str, keep_default_na=False, na_values=["", "nan", "None"], engine="c"
+    )
     raw.columns = [c.strip() for c in raw.columns]
 
     cols = set(raw.columns)
@@ -88,9 +140,14 @@ def validate_and_clean_file(path: Path) -> dict:
 
     # Remove dividend/split rows if any text appears in numeric columns
     # Many exports place "Dividend" in Open/High/Low or another numeric column.
-    text_mask = pd.Series(False, index=df.index)
-    for c in [open_col, high_col, low_col, close_col]:
-        text_mask = text_mask | df[c].astype(str).str.contains(DIVIDEND_TEXT_PAT, na=False)
+    # Join the four columns once and do literal substring scans in NumPy.
+    joined = df[open_col].astype(str).str.cat(
+        [df[c].astype(str) for c in (high_col, low_col, close_col)], sep="|", na_rep=""
+    ).str.lower()
+    text = joined.to_numpy(dtype=str)
+    text_mask = np.logical_or.reduce(
+        [np.char.find(text, token) >= 0 for token in DIVIDEND_TEXT_TOKENS]
+    )
 
     removed = int(text_mask.sum())
     if removed > 0:
@@ -139,23 +196,25 @@ def validate_and_clean_file(path: Path) -> dict:
     df = df.drop_duplicates(subset=[date_col], keep="last").copy()
     info["duplicate_dates_removed"] = int(before - len(df))
 
-    # OHLC sanity checks (allow NaNs but count violations)
-    sanity = pd.Series(True, index=df.index)
-    sanity &= df["High"] >= df[["Open", "Close", "Low"]].max(axis=1)
-    sanity &= df["Low"]  <= df[["Open", "Close", "High"]].min(axis=1)
-    violations = int((~sanity).sum())
-    info["ohlc_sanity_violations"] = violations
+    # OHLC sanity checks (allow NaNs but count violations) and date gaps
+    # (rough check), fused into a single pass over the numeric arrays.
+    dates = df[date_col].to_numpy(dtype="datetime64[ns]")
+    gap_days = np.diff(dates) // np.timedelta64(1, "D")
+    violations, gaps_gt_7d = _ohlc_gap_checks(
+        df["Open"].to_numpy(dtype=np.float64),
+        df["High"].to_numpy(dtype=np.float64),
+        df["Low"].to_numpy(dtype=np.float64),
+        df["Close"].to_numpy(dtype=np.float64),
+        gap_days,
+    )
+    info["ohlc_sanity_violations"] = int(violations)
     if violations > 0:
         issues.append(f"OHLC sanity violations: {violations} rows")
 
-    # Date gaps (rough check)
-    dates = df[date_col].values
-    if len(dates) >= 2:
-        gaps = pd.Series(pd.to_datetime(dates)).diff().dt.days.fillna(0)
-        # More than 7 days gap might be missing chunks (not weekends)
-        info["date_gaps_gt_7d"] = int((gaps > 7).sum())
-        if info["date_gaps_gt_7d"] > 0:
-            issues.append(f"Date gaps > 7 days: {info['date_gaps_gt_7d']}")
+    # More than 7 days gap might be missing chunks (not weekends)
+    info["date_gaps_gt_7d"] = int(gaps_gt_7d)
+    if gaps_gt_7d > 0:
+        issues.append(f"Date gaps > 7 days: {info['date_gaps_gt_7d']}")
 
     # Final shape check
     if len(df) < MIN_ROWS:
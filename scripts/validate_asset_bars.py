@@ -38,6 +38,8 @@ MIN_BARS_PER_TF = 100
 TF_EXPECTED_MINUTES = {"15min": 15, "1h": 60, "4h": 240, "1day": 1440, "1week": 10080}
 GAP_MULTIPLIER = 10  # flag if gap > 10x expected interval
 
+OHLC_COLUMNS = ["ts", "open", "high", "low", "close"]
+
 
 def asset_dir(symbol: str) -> Path:
     return PROJECT_ROOT / "data" / "assets" / symbol
@@ -47,14 +49,18 @@ def live_db_path(symbol: str) -> Path:
     return asset_dir(symbol) / "live.db"
 
 
-def _check_gaps_parquet(symbol: str, check_gaps: bool) -> int:
+def _check_gaps_parquet(
+    symbol: str, check_gaps: bool, frames: dict[str, pl.DataFrame] | None = None
+) -> int:
     """Optional gap detection. Flags (warns) large gaps; does not fail validation. Returns 0."""
     if not check_gaps:
         return 0
     flagged = 0
     for tf in TIMEFRAMES:
-        lf = BarsProvider.get_bars(symbol, tf)
-        df = lf.collect()
+        if frames is not None:
+            df = frames[tf]
+        else:
+            df = BarsProvider.get_bars(symbol, tf).collect()
         if df.is_empty() or len(df) < 2:
             continue
         df = df.sort("ts").with_columns(
@@ -77,9 +83,18 @@ def validate_parquet(symbol: str, check_gaps: bool = False) -> int:
     errors = 0
     total = 0
 
+    # Collect each TF once (only the checked columns, sorted by ts); every
+    # check below reuses the materialized frame.
+    frames = {
+        tf: BarsProvider.get_bars(symbol, tf)
+        .select(OHLC_COLUMNS)
+        .sort("ts")
+        .collect()
+        for tf in TIMEFRAMES
+    }
+
     for tf in TIMEFRAMES:
-        lf = BarsProvider.get_bars(symbol, tf)
-        df = lf.collect()
+        df = frames[tf]
         n = len(df)
         total += n
 
@@ -97,13 +112,14 @@ def validate_parquet(symbol: str, check_gaps: bool = False) -> int:
     # Duplicates per TF
     dup_count = 0
     for tf in TIMEFRAMES:
-        lf = BarsProvider.get_bars(symbol, tf)
-        df = lf.collect()
+        df = frames[tf]
         if df.is_empty():
             continue
-        dup = df.filter(pl.col("ts").is_duplicated())
-        if not dup.is_empty():
-            dup_count += len(dup)
+        # Sorted ts: duplicates are adjacent, so compare neighbours instead of hashing.
+        ts = df["ts"]
+        same_prev = ts == ts.shift(1)
+        same_next = ts == ts.shift(-1)
+        dup_count += int((same_prev.fill_null(False) | same_next.fill_null(False)).sum())
     if dup_count:
         print(f"[validate] ERROR: {dup_count} duplicate ts within timeframes")
         errors += 1
@@ -113,8 +129,7 @@ def validate_parquet(symbol: str, check_gaps: bool = False) -> int:
     # Nulls in OHLC
     null_count = 0
     for tf in TIMEFRAMES:
-        lf = BarsProvider.get_bars(symbol, tf)
-        df = lf.collect()
+        df = frames[tf]
         if df.is_empty():
             continue
         nulls = df.filter(
@@ -134,8 +149,7 @@ def validate_parquet(symbol: str, check_gaps: bool = False) -> int:
     # OHLC sanity
     bad_count = 0
     for tf in TIMEFRAMES:
-        lf = BarsProvider.get_bars(symbol, tf)
-        df = lf.collect()
+        df = frames[tf]
         if df.is_empty():
             continue
         bad = df.filter(
@@ -159,7 +173,7 @@ def validate_parquet(symbol: str, check_gaps: bool = False) -> int:
 
     # Optional gap detection (informational only, does not fail)
     if check_gaps:
-        _check_gaps_parquet(symbol, check_gaps=True)
+        _check_gaps_parquet(symbol, check_gaps=True, frames=frames)
 
     print(f"[validate] total bars: {total}")
     if errors:
@@ -186,16 +200,20 @@ def validate_live(symbol: str, check_gaps: bool = False) -> int:
             print("[validate] ERROR: bars table not found")
             return 1
 
-        # 1. Counts and date ranges per TF
-        for tf in TIMEFRAMES:
-            row = conn.execute(
+        # 1. Counts and date ranges per TF: one aggregate over the
+        # (symbol, timeframe, ts) primary key instead of a query per TF
+        stats = {
+            tf: (n, min_ts, max_ts)
+            for tf, n, min_ts, max_ts in conn.execute(
                 """
-                SELECT COUNT(*), MIN(ts), MAX(ts)
-                FROM bars WHERE symbol=? AND timeframe=?
+                SELECT timeframe, COUNT(*), MIN(ts), MAX(ts)
+                FROM bars WHERE symbol=? GROUP BY timeframe
                 """,
-                (symbol, tf),
-            ).fetchone()
-            n, min_ts, max_ts = row[0], row[1], row[2]
+                (symbol,),
+            )
+        }
+        for tf in TIMEFRAMES:
+            n, min_ts, max_ts = stats.get(tf, (0, None, None))
             if n == 0:
                 print(f"[validate] WARN: {tf} has 0 bars")
                 continue
@@ -255,9 +273,7 @@ def validate_live(symbol: str, check_gaps: bool = False) -> int:
         else:
             print("[validate] OK: OHLC sanity passed")
 
-        total = conn.execute(
-            "SELECT COUNT(*) FROM bars WHERE symbol=?", (symbol,)
-        ).fetchone()[0]
+        total = sum(n for n, _, _ in stats.values())
         print(f"[validate] total bars: {total}")
         if errors:
             print("[validate] FAIL")
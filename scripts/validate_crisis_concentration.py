@@ -16,16 +16,28 @@ If detection fails, set EPISODES_PATH and PRICES_PATH below.
 
 from __future__ import annotations
 
+import fnmatch
 import json
-import math
 import os
 import sqlite3
-from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+import polars as pl
+
+try:
+    from scripts._parquet_cache import cached_parquet
+except ModuleNotFoundError:
+    from _parquet_cache import cached_parquet
+
+# Bottleneck C kernels when available (pip install regime-engine[perf])
+try:
+    import bottleneck as bn
+    _HAS_BOTTLENECK = True
+except ImportError:
+    _HAS_BOTTLENECK = False
 
 
 # =========================
@@ -44,10 +56,13 @@ RNG_SEED = 42
 
 # Expected forward horizon from validation
 DEFAULT_H = 20
+GROUP_DTYPE = pd.CategoricalDtype(["HIGH", "LOW"])  # codes: 0 = HIGH, 1 = LOW
+EPISODES_SCHEMA = 1  # bump when _standardize_episodes output changes (invalidates cached episodes)
 
 # Where your project lives
 PROJECT_DIR = Path("/Users/sherifsaad/Documents/regime-engine")
 VALIDATION_DIR = PROJECT_DIR / "validation_outputs"
+CACHE_DIR = VALIDATION_DIR / ".cache"  # parsed prices / standardized episodes, reused across runs
 # Same DB as Step 4 (SPY 4h bars for drawdown)
 DB_PATH = PROJECT_DIR / "data" / "regime_cache_SPY_escalation_frozen_2026-02-19.db"
 
@@ -55,10 +70,52 @@ DB_PATH = PROJECT_DIR / "data" / "regime_cache_SPY_escalation_frozen_2026-02-19.
 # =========================
 # Helpers
 # =========================
-def _safe_read_csv(path: Path) -> pd.DataFrame:
-    df = pd.read_csv(path)
+TS_COL_CANDIDATES = ["ts", "timestamp", "datetime", "date", "time"]
+PRICE_COL_CANDIDATES = ["adj_close", "adj close", "close"]  # lower-case, see _prepare_prices
+GIANT_FILE_BYTES = 500_000_000  # autodetect penalty; ~2M rows of a merged bars/episodes CSV
+FAST_READ_MIN_BYTES = 50_000_000  # use the multithreaded Polars reader above this size
+
+
+def _fast_read_csv(
+    path: Path,
+    usecols: Optional[List[str]] = None,
+    dtype: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """
+    Multithreaded Polars CSV parse for big merged files, returned as pandas.
+    Timestamps stay as text; _safe_read_csv normalizes them like the pandas path.
+    """
+    pl_df = pl.read_csv(path, columns=usecols, infer_schema_length=10_000)
+    # Build pandas DataFrame without pyarrow (Polars.to_pandas requires pyarrow)
+    df = pd.DataFrame({c: pl_df[c].to_numpy() for c in pl_df.columns})
+    if dtype:
+        df = df.astype(dtype)
+    return df
+
+
+def _safe_read_csv(
+    path: Path,
+    usecols: Optional[List[str]] = None,
+    dtype: Optional[Dict[str, str]] = None,
+    parse_dates: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    df = None
+    if path.stat().st_size >= FAST_READ_MIN_BYTES:
+        try:
+            df = _fast_read_csv(path, usecols=usecols, dtype=dtype)
+        except Exception:
+            df = None  # schema surprises (e.g. text deep in a numeric column): use pandas
+    if df is None:
+        df = pd.read_csv(
+            path,
+            engine="c",
+            usecols=usecols,
+            dtype=dtype,
+            parse_dates=parse_dates,
+            cache_dates=True,
+        )
     # normalize datetime column
-    for c in ["ts", "timestamp", "datetime", "date", "time"]:
+    for c in TS_COL_CANDIDATES:
         if c in df.columns:
             df[c] = pd.to_datetime(df[c], utc=False, errors="coerce")
             df = df.rename(columns={c: "ts"})
@@ -69,12 +126,59 @@ def _safe_read_csv(path: Path) -> pd.DataFrame:
     return df
 
 
+def _peek_cols(path: Path) -> Optional[set]:
+    """
+    Lower-cased column names from the CSV header only (no data rows parsed).
+    None if unreadable or no recognizable timestamp column (same files
+    _safe_read_csv would reject).
+    """
+    try:
+        header = [str(c) for c in pd.read_csv(path, nrows=0).columns]
+    except Exception:
+        return None
+    if not any(c in header for c in TS_COL_CANDIDATES):
+        return None
+    return {c.lower() for c in header}
+
+
+def _read_prices_csv(path: Path) -> pd.DataFrame:
+    """
+    Read only the timestamp and close/adj close columns of a price CSV
+    (header peeked first), with prices parsed straight to float64.
+    """
+    header = list(pd.read_csv(path, nrows=0).columns)
+    usecols = [c for c in header if c in TS_COL_CANDIDATES or c.lower() in PRICE_COL_CANDIDATES]
+    dtype = {c: "float64" for c in usecols if c.lower() in PRICE_COL_CANDIDATES}
+    try:
+        return _safe_read_csv(path, usecols=usecols, dtype=dtype)
+    except ValueError:
+        # non-numeric junk in a price column: let _prepare_prices coerce it
+        return _safe_read_csv(path, usecols=usecols)
+
+
+def _csv_names(directory: Path) -> List[str]:
+    """*.csv file names in directory from one os.scandir pass."""
+    try:
+        with os.scandir(directory) as it:
+            return [e.name for e in it if e.name.endswith(".csv") and e.is_file()]
+    except FileNotFoundError:
+        return []
+
+
+def _match_csvs(directory: Path, patterns: List[str]) -> List[Path]:
+    """Files in directory matching any of the fnmatch patterns (single directory listing)."""
+    return [
+        directory / name
+        for name in _csv_names(directory)
+        if any(fnmatch.fnmatchcase(name, pat) for pat in patterns)
+    ]
+
+
 def _auto_detect_episodes_file() -> Path:
     """
     Try to find the Step 4 event-driven episode sample file.
     We look for likely filenames in validation_outputs.
     """
-    candidates = []
     patterns = [
         "*event*driven*episode*.csv",
         "*nonoverlap*episode*.csv",
@@ -83,18 +187,15 @@ def _auto_detect_episodes_file() -> Path:
         "*event*driven*.csv",
         "*nonoverlap*.csv",
     ]
-    for pat in patterns:
-        candidates.extend(list(VALIDATION_DIR.glob(pat)))
+    candidates = _match_csvs(VALIDATION_DIR, patterns)
 
     # Filter: prefer files that contain BOTH high/low episode info
     scored: List[Tuple[int, Path]] = []
     for p in sorted(set(candidates)):
-        try:
-            df = _safe_read_csv(p)
-        except Exception:
+        cols = _peek_cols(p)
+        if cols is None:
             continue
 
-        cols = set(df.columns.str.lower())
         score = 0
         # key signals for episodes
         if any(k in cols for k in ["episode_id", "ep_id", "episode"]):
@@ -107,8 +208,8 @@ def _auto_detect_episodes_file() -> Path:
             score += 2
         if any(k in cols for k in ["event", "is_event", "hit"]):
             score += 2
-        # discourage giant raw merged files if present
-        if df.shape[0] > 2_000_000:
+        # discourage giant raw merged files if present (file size as a row-count proxy)
+        if p.stat().st_size > GIANT_FILE_BYTES:
             score -= 10
 
         scored.append((score, p))
@@ -132,30 +233,19 @@ def _auto_detect_prices_file() -> Path:
     - PROJECT_DIR/*.csv
     - validation_outputs might also contain merged bars
     """
-    candidates = []
-    patterns = [
-        "data/*SPY*4h*.csv",
-        "data/*spy*4h*.csv",
-        "data/*SPY*.csv",
-        "*SPY*4h*.csv",
-        "*spy*4h*.csv",
-    ]
-    for pat in patterns:
-        candidates.extend(list(PROJECT_DIR.glob(pat)))
+    candidates = _match_csvs(PROJECT_DIR / "data", ["*SPY*4h*.csv", "*spy*4h*.csv", "*SPY*.csv"])
+    candidates += _match_csvs(PROJECT_DIR, ["*SPY*4h*.csv", "*spy*4h*.csv"])
     # Also check validation dir
-    for pat in ["*SPY*4h*.csv", "*spy*4h*.csv", "*bars*.csv"]:
-        candidates.extend(list(VALIDATION_DIR.glob(pat)))
+    candidates += _match_csvs(VALIDATION_DIR, ["*SPY*4h*.csv", "*spy*4h*.csv", "*bars*.csv"])
 
-    candidates = [p for p in set(candidates) if p.is_file()]
+    candidates = list(set(candidates))
 
     # Score candidates by presence of OHLC columns
     scored = []
     for p in candidates:
-        try:
-            df = _safe_read_csv(p)
-        except Exception:
+        cols = _peek_cols(p)
+        if cols is None:
             continue
-        cols = set(df.columns.str.lower())
         score = 0
         if "close" in cols:
             score += 5
@@ -190,37 +280,55 @@ def _load_prices_from_db() -> pd.DataFrame:
             f"DB not found: {DB_PATH}. Set PRICES_PATH to a SPY 4h CSV manually."
         )
     con = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query(
-        "SELECT ts, close FROM bars WHERE symbol='SPY' AND timeframe='4h'",
-        con,
-    )
+    # Numeric filter/cast in SQL (non-numeric close would coerce to NaN and be dropped anyway);
+    # ORDER BY rides the (symbol, timeframe, ts) primary key.
+    rows = con.execute(
+        """
+        SELECT ts, CAST(close AS REAL) FROM bars
+        WHERE symbol=? AND timeframe=? AND typeof(close) IN ('integer', 'real')
+        ORDER BY ts
+        """,
+        ("SPY", "4h"),
+    ).fetchall()
     con.close()
-    df["ts"] = pd.to_datetime(df["ts"], errors="coerce")
-    df["close"] = pd.to_numeric(df["close"], errors="coerce")
-    df = df.dropna(subset=["ts", "close"]).sort_values("ts").reset_index(drop=True)
+    ts = [r[0] for r in rows]
+    close = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+    df = pd.DataFrame({"ts": pd.to_datetime(pd.Series(ts, dtype=object), errors="coerce"), "close": close})
+    df = df.dropna(subset=["ts"]).sort_values("ts").reset_index(drop=True)
     return df
 
 
-def _wilson_ci(k: int, n: int, z: float = 1.96) -> Tuple[float, float]:
-    if n == 0:
-        return (np.nan, np.nan)
-    p = k / n
-    denom = 1 + z**2 / n
-    center = (p + z**2 / (2 * n)) / denom
-    margin = (z * math.sqrt((p * (1 - p) + z**2 / (4 * n)) / n)) / denom
-    return (max(0.0, center - margin), min(1.0, center + margin))
+def _wilson_ci_vec(k, n, z: float = 1.96) -> Tuple[np.ndarray, np.ndarray]:
+    """Wilson score interval for arrays of successes k out of n trials. NaN where n == 0."""
+    k = np.asarray(k, dtype=float)
+    n = np.asarray(n, dtype=float)
+    z2 = z * z
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = np.where(n > 0, k / n, np.nan)
+        denom = 1 + z2 / n
+        center = (p + z2 / (2 * n)) / denom
+        margin = (z * np.sqrt((p * (1 - p) + z2 / (4 * n)) / n)) / denom
+    return np.clip(center - margin, 0.0, 1.0), np.clip(center + margin, 0.0, 1.0)
+
+
+def _bootstrap_means(rng: np.random.Generator, p: np.ndarray, n: int) -> np.ndarray:
+    """
+    Means of n bootstrap resamples of p, without a Python loop.
+    0/1 data: a resample mean is Binomial(len(p), mean(p)) / len(p) (exact, O(n)).
+    Otherwise: multinomial resample counts (n x len(p)) times p in one matmul.
+    """
+    m = len(p)
+    if np.all((p == 0) | (p == 1)):
+        return rng.binomial(m, float(np.mean(p)), size=n) / m
+    weights = rng.multinomial(m, np.full(m, 1.0 / m), size=n)
+    return (weights @ p) / m
 
 
 def _bootstrap_diff(p_hi: np.ndarray, p_lo: np.ndarray, n: int, seed: int) -> Dict[str, float]:
     rng = np.random.default_rng(seed)
     if len(p_hi) == 0 or len(p_lo) == 0:
         return {"mean": np.nan, "p05": np.nan, "p95": np.nan}
-    diffs = []
-    for _ in range(n):
-        hi = rng.choice(p_hi, size=len(p_hi), replace=True)
-        lo = rng.choice(p_lo, size=len(p_lo), replace=True)
-        diffs.append(float(np.mean(hi) - np.mean(lo)))
-    diffs = np.array(diffs, dtype=float)
+    diffs = _bootstrap_means(rng, p_hi, n) - _bootstrap_means(rng, p_lo, n)
     return {
         "mean": float(np.mean(diffs)),
         "p05": float(np.quantile(diffs, 0.05)),
@@ -228,8 +336,7 @@ def _bootstrap_diff(p_hi: np.ndarray, p_lo: np.ndarray, n: int, seed: int) -> Di
     }
 
 
-@dataclass
-class LiftResult:
+class LiftResult(NamedTuple):
     test_name: str
     n_hi: int
     n_lo: int
@@ -256,7 +363,7 @@ def _standardize_episodes(df: pd.DataFrame) -> pd.DataFrame:
     """
     cols = {c.lower(): c for c in df.columns}
 
-    out = df.copy()
+    out = df.copy(deep=False)  # new columns only; source data is never written
 
     # ts already normalized by _safe_read_csv
     # group / label
@@ -278,7 +385,8 @@ def _standardize_episodes(df: pd.DataFrame) -> pd.DataFrame:
             )
 
     out["group"] = out["group"].astype(str).str.upper()
-    out = out[out["group"].isin(["HIGH", "LOW"])].copy()
+    out = out[out["group"].isin(GROUP_DTYPE.categories)]
+    out["group"] = out["group"].astype(GROUP_DTYPE)
 
     # event / hit
     if "event" not in out.columns:
@@ -291,8 +399,8 @@ def _standardize_episodes(df: pd.DataFrame) -> pd.DataFrame:
             "Could not infer event column. Expected event/is_event/hit/etc."
         )
 
-    out["event"] = pd.to_numeric(out["event"], errors="coerce").fillna(0).astype(int)
-    out["event"] = (out["event"] != 0).astype(int)
+    out["event"] = pd.to_numeric(out["event"], errors="coerce").fillna(0)
+    out["event"] = (out["event"] != 0).astype(np.int8)
 
     # horizon H
     if "h" not in out.columns:
@@ -324,43 +432,60 @@ def _prepare_prices(prices: pd.DataFrame) -> pd.DataFrame:
     out = out.dropna(subset=["ts", "px"]).sort_values("ts").reset_index(drop=True)
 
     # rolling drawdown: dd = px / rolling_max(px) - 1
-    roll_max = out["px"].rolling(DD_LOOKBACK_BARS, min_periods=max(10, DD_LOOKBACK_BARS // 4)).max()
-    out["dd"] = out["px"] / roll_max - 1.0
+    min_periods = max(10, DD_LOOKBACK_BARS // 4)
+    if _HAS_BOTTLENECK:
+        px_arr = out["px"].to_numpy(dtype=np.float64)
+        out["dd"] = px_arr / bn.move_max(px_arr, DD_LOOKBACK_BARS, min_count=min_periods) - 1.0
+    else:
+        roll_max = out["px"].rolling(DD_LOOKBACK_BARS, min_periods=min_periods).max()
+        out["dd"] = out["px"] / roll_max - 1.0
 
     return out
 
 
 def _merge_episode_with_dd(episodes: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
     """
-    Align episode anchor ts to nearest price ts (asof merge).
+    Align episode anchor ts to nearest price ts (asof merge, backward):
+    dd of the last price bar with ts <= episode ts, NaN if none.
     """
-    ep = episodes.sort_values("ts").copy()
-    pr = prices.sort_values("ts").copy()
-    merged = pd.merge_asof(ep, pr[["ts", "dd"]], on="ts", direction="backward")
-    return merged
-
-
-def _compute_lift(episodes: pd.DataFrame, test_name: str) -> LiftResult:
-    hi = episodes[episodes["group"] == "HIGH"].copy()
-    lo = episodes[episodes["group"] == "LOW"].copy()
+    ep = episodes.sort_values("ts").reset_index(drop=True)
+    pr = prices.sort_values("ts")
+    ts_p = pr["ts"].to_numpy(dtype="datetime64[ns]")
+    idx = np.searchsorted(ts_p, ep["ts"].to_numpy(dtype="datetime64[ns]"), side="right") - 1
+    dd = np.full(len(ep), np.nan)
+    hit = idx >= 0
+    dd[hit] = pr["dd"].to_numpy(dtype=np.float64)[idx[hit]]
+    ep["dd"] = dd
+    return ep
+
+
+def _compute_lift(events: np.ndarray, is_hi: np.ndarray, keep: np.ndarray, test_name: str) -> LiftResult:
+    """
+    Lift on the rows selected by keep. events (0/1) and is_hi (HIGH vs LOW) are
+    the full episode arrays, extracted once and shared by every test.
+    """
+    hi_mask = keep & is_hi
+    lo_mask = keep & ~is_hi
+    p_hi = events[hi_mask]
+    p_lo = events[lo_mask]
 
-    n_hi = int(len(hi))
-    n_lo = int(len(lo))
+    n_hi = int(len(p_hi))
+    n_lo = int(len(p_lo))
 
-    hi_k = int(hi["event"].sum())
-    lo_k = int(lo["event"].sum())
+    hi_k = int(p_hi.sum())
+    lo_k = int(p_lo.sum())
 
     hi_rate = float(hi_k / n_hi) if n_hi else np.nan
     lo_rate = float(lo_k / n_lo) if n_lo else np.nan
     diff = float(hi_rate - lo_rate) if (n_hi and n_lo) else np.nan
     ratio = float(hi_rate / lo_rate) if (n_hi and n_lo and lo_rate > 0) else np.nan
 
-    hi_ci = _wilson_ci(hi_k, n_hi)
-    lo_ci = _wilson_ci(lo_k, n_lo)
+    # One vectorized call for both groups: index 0 = HIGH, 1 = LOW
+    ci_lo, ci_hi = _wilson_ci_vec([hi_k, lo_k], [n_hi, n_lo])
 
     boot = _bootstrap_diff(
-        hi["event"].to_numpy(dtype=float),
-        lo["event"].to_numpy(dtype=float),
+        p_hi,
+        p_lo,
         n=BOOTSTRAP_N,
         seed=RNG_SEED,
     )
@@ -373,55 +498,57 @@ def _compute_lift(episodes: pd.DataFrame, test_name: str) -> LiftResult:
         lo_rate=lo_rate,
         diff=diff,
         ratio=ratio,
-        hi_wilson_lo=float(hi_ci[0]),
-        hi_wilson_hi=float(hi_ci[1]),
-        lo_wilson_lo=float(lo_ci[0]),
-        lo_wilson_hi=float(lo_ci[1]),
+        hi_wilson_lo=float(ci_lo[0]),
+        hi_wilson_hi=float(ci_hi[0]),
+        lo_wilson_lo=float(ci_lo[1]),
+        lo_wilson_hi=float(ci_hi[1]),
         boot_mean=float(boot["mean"]),
         boot_p05=float(boot["p05"]),
         boot_p95=float(boot["p95"]),
     )
 
 
-def _exclude_top_dd(episodes_dd: pd.DataFrame, top_pct: float) -> pd.DataFrame:
+def _exclude_top_dd(dd: np.ndarray, top_pct: float) -> np.ndarray:
     """
-    Exclude episode anchors that fall in the worst drawdown bars (most negative dd).
+    Keep mask excluding episode anchors that fall in the worst drawdown bars (most negative dd).
     """
-    df = episodes_dd.copy()
-    df = df.dropna(subset=["dd"]).copy()
+    valid = ~np.isnan(dd)
     # Worst drawdowns = most negative dd -> take quantile at top_pct (e.g., 5%) of dd distribution's LOWER tail.
-    cutoff = float(np.quantile(df["dd"], top_pct))
-    # dd <= cutoff are the worst bars
-    keep = df["dd"] > cutoff
-    return df.loc[keep, ["ts", "group", "event", "H"]].copy()
+    cutoff = float(np.quantile(dd[valid], top_pct))
+    # dd <= cutoff are the worst bars (NaN dd compares False and is dropped too)
+    return dd > cutoff
 
 
-def _exclude_date_ranges(episodes: pd.DataFrame, ranges: List[Tuple[str, str]]) -> pd.DataFrame:
-    df = episodes.copy()
+def _exclude_date_ranges(ts: np.ndarray, ranges: List[Tuple[str, str]]) -> np.ndarray:
+    """Keep mask excluding episodes with ts inside any [start, end] range."""
+    keep = np.ones(len(ts), dtype=bool)
     for start, end in ranges:
-        s = pd.to_datetime(start)
-        e = pd.to_datetime(end)
-        df = df[~((df["ts"] >= s) & (df["ts"] <= e))].copy()
-    return df
+        s = pd.to_datetime(start).to_datetime64()
+        e = pd.to_datetime(end).to_datetime64()
+        keep &= ~((ts >= s) & (ts <= e))
+    return keep
 
 
-def _subperiod_splits(episodes: pd.DataFrame, k: int = 3) -> Dict[str, pd.DataFrame]:
+def _subperiod_splits(ts: np.ndarray, k: int = 3) -> Dict[str, np.ndarray]:
     """
-    Split by time into k equal-size bins by timestamp.
+    Split by time into k equal-size bins by timestamp. Returns a keep mask per bin.
+    ts must be sorted ascending.
     """
-    df = episodes.sort_values("ts").copy()
-    if len(df) < k * 10:
+    n = len(ts)
+    if n < k * 10:
         # too small; return one bucket
-        return {"subperiod_all": df}
+        return {"subperiod_all": np.ones(n, dtype=bool)}
 
     qs = np.linspace(0, 1, k + 1)
-    cuts = [df["ts"].quantile(q) for q in qs]
+    cuts = pd.Series(ts).quantile(qs).to_numpy(dtype=ts.dtype)
+    # sorted ts: bucket [a, b] (both ends inclusive) is a contiguous row range
+    lo = np.searchsorted(ts, cuts[:-1], side="left")
+    hi = np.searchsorted(ts, cuts[1:], side="right")
     buckets = {}
     for i in range(k):
-        a = cuts[i]
-        b = cuts[i + 1]
-        part = df[(df["ts"] >= a) & (df["ts"] <= b)].copy()
-        buckets[f"subperiod_{i+1}_of_{k}"] = part
+        keep = np.zeros(n, dtype=bool)
+        keep[lo[i]:hi[i]] = True
+        buckets[f"subperiod_{i+1}_of_{k}"] = keep
     return buckets
 
 
@@ -433,26 +560,35 @@ def main() -> None:
 
     if PRICES_PATH:
         prices_path = Path(PRICES_PATH)
-        prices_raw = _safe_read_csv(prices_path)
+        prices_raw = cached_parquet(
+            prices_path, f"px_{prices_path.stem}", lambda: _read_prices_csv(prices_path), CACHE_DIR
+        )
         prices_source = str(prices_path)
         print(f"[Step5] Episodes file: {episodes_path}")
         print(f"[Step5] Prices file:   {prices_path}")
     else:
         try:
             prices_path = _auto_detect_prices_file()
-            prices_raw = _safe_read_csv(prices_path)
+            prices_raw = cached_parquet(
+                prices_path, f"px_{prices_path.stem}", lambda: _read_prices_csv(prices_path), CACHE_DIR
+            )
             prices_source = str(prices_path)
             print(f"[Step5] Episodes file: {episodes_path}")
             print(f"[Step5] Prices file:   {prices_path}")
         except FileNotFoundError:
-            prices_raw = _load_prices_from_db()
+            prices_raw = cached_parquet(DB_PATH, f"px_db_{DB_PATH.stem}", _load_prices_from_db, CACHE_DIR)
             prices_source = f"db:{DB_PATH.name}"
             print(f"[Step5] Episodes file: {episodes_path}")
             print(f"[Step5] Prices:        from DB {DB_PATH.name}")
 
     # --- load ---
-    episodes_raw = _safe_read_csv(episodes_path)
-    episodes = _standardize_episodes(episodes_raw)
+    episodes = cached_parquet(
+        episodes_path,
+        f"ep_{episodes_path.stem}",
+        lambda: _standardize_episodes(_safe_read_csv(episodes_path)),
+        CACHE_DIR,
+        version=f"-s{EPISODES_SCHEMA}-H{DEFAULT_H}",
+    )
 
     print(f"[Step5] Episode ts range: {episodes['ts'].min()} -> {episodes['ts'].max()}")
     print("[Step5] Episodes per year:")
@@ -463,37 +599,48 @@ def main() -> None:
     # --- join episodes with drawdown ---
     episodes_dd = _merge_episode_with_dd(episodes, prices)
 
+    # Every test is a keep mask over the same (ts-sorted) episode rows
+    events = episodes_dd["event"].to_numpy(dtype=np.int8)
+    # astype is a no-op on fresh frames; cached frames come back as plain strings
+    is_hi = episodes_dd["group"].astype(GROUP_DTYPE).cat.codes.to_numpy() == 0
+    ts = episodes_dd["ts"].to_numpy()
+    dd = episodes_dd["dd"].to_numpy(dtype=np.float64)
+
     results: List[LiftResult] = []
 
     # Baseline (should match Step 4 approximately if same episode file)
-    results.append(_compute_lift(episodes, "baseline_step4_episode_sample"))
+    keep_all = np.ones(len(events), dtype=bool)
+    results.append(_compute_lift(events, is_hi, keep_all, "baseline_step4_episode_sample"))
 
     # 5A: Exclude worst drawdown bars (top 5% most negative)
-    ep_no_dd = _exclude_top_dd(episodes_dd, EXCLUDE_DD_TOP_PCT)
-    results.append(_compute_lift(ep_no_dd, f"exclude_worst_drawdown_top_{int(EXCLUDE_DD_TOP_PCT*100)}pct"))
+    keep = _exclude_top_dd(dd, EXCLUDE_DD_TOP_PCT)
+    results.append(_compute_lift(events, is_hi, keep, f"exclude_worst_drawdown_top_{int(EXCLUDE_DD_TOP_PCT*100)}pct"))
 
     # 5B: Exclude 2008 explicitly (full year)
-    ep_no_2008 = _exclude_date_ranges(episodes, [("2008-01-01", "2008-12-31")])
-    results.append(_compute_lift(ep_no_2008, "exclude_2008"))
+    keep = _exclude_date_ranges(ts, [("2008-01-01", "2008-12-31")])
+    results.append(_compute_lift(events, is_hi, keep, "exclude_2008"))
 
     # 5C: Exclude 2020 explicitly (COVID crash year)
-    ep_no_2020 = _exclude_date_ranges(episodes, [("2020-01-01", "2020-12-31")])
-    results.append(_compute_lift(ep_no_2020, "exclude_2020"))
+    keep = _exclude_date_ranges(ts, [("2020-01-01", "2020-12-31")])
+    results.append(_compute_lift(events, is_hi, keep, "exclude_2020"))
 
     # 5D: Exclude both 2008 and 2020
-    ep_no_2008_2020 = _exclude_date_ranges(episodes, [("2008-01-01", "2008-12-31"), ("2020-01-01", "2020-12-31")])
-    results.append(_compute_lift(ep_no_2008_2020, "exclude_2008_and_2020"))
+    keep = _exclude_date_ranges(ts, [("2008-01-01", "2008-12-31"), ("2020-01-01", "2020-12-31")])
+    results.append(_compute_lift(events, is_hi, keep, "exclude_2008_and_2020"))
 
     # 5E: Subperiod splits (3 bins)
-    splits = _subperiod_splits(episodes, k=3)
-    for name, part in splits.items():
-        results.append(_compute_lift(part, name))
+    splits = _subperiod_splits(ts, k=3)
+    for name, keep in splits.items():
+        results.append(_compute_lift(events, is_hi, keep, name))
 
     # --- save outputs ---
     out_csv = VALIDATION_DIR / "step5_crisis_concentration_summary.csv"
     out_json = VALIDATION_DIR / "step5_crisis_concentration_summary.json"
 
-    df_out = pd.DataFrame([asdict(r) for r in results])
+    # Column-wise (SoA) build: one array per field, no per-row dicts
+    df_out = pd.DataFrame(
+        {name: np.asarray(col) for name, col in zip(LiftResult._fields, zip(*results))}
+    )
     df_out.to_csv(out_csv, index=False)
 
     payload = {
@@ -503,7 +650,7 @@ def main() -> None:
         "exclude_dd_top_pct": EXCLUDE_DD_TOP_PCT,
         "bootstrap_n": BOOTSTRAP_N,
         "rng_seed": RNG_SEED,
-        "results": [asdict(r) for r in results],
+        "results": [r._asdict() for r in results],
     }
     out_json.write_text(json.dumps(payload, indent=2))
 
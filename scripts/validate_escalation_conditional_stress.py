@@ -25,11 +25,18 @@ validation_outputs/escalation_conditional_stress_rolling_oos.csv
 import os
 import sys
 import math
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 
 from scipy.stats import mannwhitneyu
 
+try:
+    from scripts._widening_kernels import cliffs_delta, upper_quantile
+except ModuleNotFoundError:
+    from _widening_kernels import cliffs_delta, upper_quantile
+
 ESC_COL = "escalation_score"
 FWD_COL = "fwd_20d_ret"
 REGIME_COL_CAND = ["regime_label", "regime"]
@@ -47,6 +54,8 @@ LAST_YEAR = 2026
 MIN_TRAIN_ROWS = 500
 MIN_TEST_ROWS = 100
 
+MAX_WORKERS = 1  # >1 runs OOS windows in a process pool (worth it only for long/intraday histories)
+
 STRESS_REGIMES = {"TRANSITION", "PANIC_RISK", "SHOCK"}
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -61,25 +70,78 @@ def pick_col(df, candidates):
     raise KeyError(f"Missing date column. Found: {list(df.columns)}")
 
 
-def cliffs_delta(x, y):
-    x = x[~np.isnan(x)]
-    y = y[~np.isnan(y)]
-    if len(x) == 0 or len(y) == 0:
-        return np.nan
-    gt = 0
-    lt = 0
-    for xi in x:
-        gt += np.sum(xi > y)
-        lt += np.sum(xi < y)
-    return (gt - lt) / (len(x) * len(y))
-
-
 def safe_ratio(a, b):
     if b == 0:
         return math.inf if a > 0 else 0.0
     return a / b
 
 
+_POOL_DF = None  # joined frame in each pool worker, set once by _init_pool_worker
+
+
+def _init_pool_worker(df):
+    """Pool initializer: keep the joined frame in a module global instead of pickling it per window."""
+    global _POOL_DF
+    _POOL_DF = df
+
+
+def _run_pool_window(test_start):
+    return _run_window(test_start, _POOL_DF)
+
+
+def _run_window(test_start, df):
+    """One rolling-OOS window; None when the stress-regime test slice is too small."""
+    test_end = min(test_start + TEST_WINDOW_YEARS - 1, LAST_YEAR)
+
+    # df is date-sorted, so train/test are contiguous row ranges of the year column
+    lo, mid, hi = np.searchsorted(
+        df["year"].to_numpy(), [TRAIN_START_YEAR, test_start, test_end + 1], side="left"
+    )
+    test = df.iloc[mid:hi]
+
+    # Train-only cutoff
+    cutoff = upper_quantile(df[ESC_COL].to_numpy(dtype=float)[lo:mid], 1 - TOP_PCT)
+
+    # Condition OOS to stress regimes only
+    test_stress = test[test["regime_label"].isin(STRESS_REGIMES)]
+
+    if len(test_stress) < MIN_TEST_ROWS:
+        return None
+
+    high = test_stress[test_stress[ESC_COL] >= cutoff]
+    rest = test_stress[test_stress[ESC_COL] < cutoff]
+
+    high_ret = high[FWD_COL].to_numpy(dtype=float)
+    rest_ret = rest[FWD_COL].to_numpy(dtype=float)
+
+    tail_high = np.mean(high_ret <= TAIL_THRESHOLD) if len(high_ret) else np.nan
+    tail_rest = np.mean(rest_ret <= TAIL_THRESHOLD) if len(rest_ret) else np.nan
+    ratio = safe_ratio(tail_high, tail_rest)
+
+    try:
+        mw = mannwhitneyu(high_ret, rest_ret, alternative="two-sided")
+        p = mw.pvalue
+        u = mw.statistic
+    except Exception:
+        p = np.nan
+        u = None
+
+    cd = cliffs_delta(high_ret, rest_ret, u=u)
+
+    return {
+        "test_start_year": test_start,
+        "test_end_year": test_end,
+        "n_test_stress": len(test_stress),
+        "n_high": len(high),
+        "n_rest": len(rest),
+        "tail_high": tail_high,
+        "tail_rest": tail_rest,
+        "ratio": ratio,
+        "p_value": p,
+        "cliffs_d": cd,
+    }
+
+
 def main():
 
     esc_path = os.path.join(OUT_DIR, "escalation_score_daily.csv")
@@ -96,8 +158,9 @@ def main():
 
     esc[dcol_e] = pd.to_datetime(esc[dcol_e], errors="coerce")
     fwd[dcol_f] = pd.to_datetime(fwd[dcol_f], errors="coerce")
-    esc["_date"] = esc[dcol_e].dt.date
-    fwd["_date"] = fwd[dcol_f].dt.date
+    # day keys stay datetime64 (integer-backed merge), not per-row datetime.date objects
+    esc["_date"] = esc[dcol_e].dt.normalize()
+    fwd["_date"] = fwd[dcol_f].dt.normalize()
 
     esc = esc.drop_duplicates(subset=["_date"], keep="last")
     fwd = fwd.drop_duplicates(subset=["_date"], keep="last")
@@ -111,67 +174,30 @@ def main():
         how="inner",
     )
     df = df.rename(columns={"_date": "date"})
-    df["date"] = pd.to_datetime(df["date"])
     df = df.rename(columns={regime_col: "regime_label"})
 
     df = df.sort_values("date").reset_index(drop=True)
     df["year"] = df["date"].dt.year
 
-    results = []
-
-    test_start = FIRST_TEST_START_YEAR
-
-    while test_start <= LAST_YEAR:
-
-        test_end = min(test_start + TEST_WINDOW_YEARS - 1, LAST_YEAR)
-
-        train = df[(df["year"] >= TRAIN_START_YEAR) & (df["year"] <= test_start - 1)]
-        test = df[(df["year"] >= test_start) & (df["year"] <= test_end)]
-
-        if len(train) < MIN_TRAIN_ROWS:
+    # Expanding train only grows, so the first window short of MIN_TRAIN_ROWS
+    # ends the run; filter windows up front instead of breaking mid-loop.
+    years = []
+    for test_start in range(FIRST_TEST_START_YEAR, LAST_YEAR + 1, TEST_WINDOW_YEARS):
+        n_train = int(((df["year"] >= TRAIN_START_YEAR) & (df["year"] <= test_start - 1)).sum())
+        if n_train < MIN_TRAIN_ROWS:
             break
-
-        # Train-only cutoff
-        cutoff = np.nanquantile(train[ESC_COL], 1 - TOP_PCT)
-
-        # Condition OOS to stress regimes only
-        test_stress = test[test["regime_label"].isin(STRESS_REGIMES)]
-
-        if len(test_stress) < MIN_TEST_ROWS:
-            test_start += TEST_WINDOW_YEARS
-            continue
-
-        high = test_stress[test_stress[ESC_COL] >= cutoff]
-        rest = test_stress[test_stress[ESC_COL] < cutoff]
-
-        high_ret = high[FWD_COL].to_numpy(dtype=float)
-        rest_ret = rest[FWD_COL].to_numpy(dtype=float)
-
-        tail_high = np.mean(high_ret <= TAIL_THRESHOLD) if len(high_ret) else np.nan
-        tail_rest = np.mean(rest_ret <= TAIL_THRESHOLD) if len(rest_ret) else np.nan
-        ratio = safe_ratio(tail_high, tail_rest)
-
-        try:
-            p = mannwhitneyu(high_ret, rest_ret, alternative="two-sided").pvalue
-        except Exception:
-            p = np.nan
-
-        cd = cliffs_delta(high_ret, rest_ret)
-
-        results.append({
-            "test_start_year": test_start,
-            "test_end_year": test_end,
-            "n_test_stress": len(test_stress),
-            "n_high": len(high),
-            "n_rest": len(rest),
-            "tail_high": tail_high,
-            "tail_rest": tail_rest,
-            "ratio": ratio,
-            "p_value": p,
-            "cliffs_d": cd,
-        })
-
-        test_start += TEST_WINDOW_YEARS
+        years.append(test_start)
+
+    # Windows are independent; MAX_WORKERS > 1 fans them out to a process pool.
+    # Each worker receives df once via the initializer, not once per window.
+    if MAX_WORKERS > 1 and len(years) > 1:
+        with ProcessPoolExecutor(
+            max_workers=MAX_WORKERS, initializer=_init_pool_worker, initargs=(df,)
+        ) as ex:
+            results = list(ex.map(_run_pool_window, years))
+    else:
+        results = [_run_window(y, df) for y in years]
+    results = [r for r in results if r is not None]
 
     out_df = pd.DataFrame(results)
     out_path = os.path.join(OUT_DIR, "escalation_conditional_stress_rolling_oos.csv")
@@ -34,6 +34,13 @@ import sqlite3
 import numpy as np
 import pandas as pd
 
+# Numba-accelerated path when available (pip install regime-engine[perf])
+try:
+    import numba
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
 
 PROJECT_DIR = "/Users/sherifsaad/Documents/regime-engine"
 DB_PATH = os.path.join(PROJECT_DIR, "data", "regime_cache_SPY_escalation_frozen_2026-02-19.db")
@@ -58,42 +65,58 @@ def _ensure_dirs():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
+def _fetch_frame(con: sqlite3.Connection, sql: str, columns: list[str]) -> pd.DataFrame:
+    # Text key columns stay object, the trailing REAL column goes straight to a
+    # float64 array; skips read_sql_query's per-cell object frame construction.
+    rows = con.execute(sql, (SYMBOL,)).fetchall()
+    out = {}
+    for j, c in enumerate(columns[:-1]):
+        col = np.empty(len(rows), dtype=object)
+        col[:] = [r[j] for r in rows]
+        out[c] = col
+    out[columns[-1]] = np.fromiter((r[-1] for r in rows), dtype=np.float64, count=len(rows))
+    df = pd.DataFrame(out)
+    df.insert(0, "symbol", SYMBOL)  # fixed by the WHERE clause, not fetched per row
+    return df
+
+
 def load_from_db(db_path: str) -> pd.DataFrame:
     con = sqlite3.connect(db_path)
 
-    esc = pd.read_sql_query(
+    # Null/non-numeric filtering and REAL casts happen in SQL, and ORDER BY rides the
+    # (symbol, timeframe, ts|asof) primary keys, so pandas only parses timestamps.
+    # The asof <-> ts join stays in pandas on parsed datetimes: the two tables are
+    # written by different jobs and their text formats are not guaranteed to match.
+    esc = _fetch_frame(
+        con,
         f"""
-        SELECT symbol, timeframe, asof, esc_pctl
+        SELECT timeframe, asof, CAST(esc_pctl AS REAL)
         FROM {ESC_TABLE}
-        WHERE symbol = ?
+        WHERE symbol = ? AND typeof(esc_pctl) IN ('integer', 'real')
+        ORDER BY timeframe, asof
         """,
-        con,
-        params=(SYMBOL,),
+        ["timeframe", "asof", "esc_pctl"],
     )
 
-    bars = pd.read_sql_query(
+    bars = _fetch_frame(
+        con,
         f"""
-        SELECT symbol, timeframe, ts, close
+        SELECT timeframe, ts, CAST(close AS REAL)
         FROM {BARS_TABLE}
-        WHERE symbol = ?
+        WHERE symbol = ? AND typeof(close) IN ('integer', 'real')
+        ORDER BY timeframe, ts
         """,
-        con,
-        params=(SYMBOL,),
+        ["timeframe", "ts", "close"],
     )
 
     con.close()
 
     esc["asof"] = pd.to_datetime(esc["asof"], errors="coerce")
     bars["ts"] = pd.to_datetime(bars["ts"], errors="coerce")
-    esc = esc.dropna(subset=["asof", "timeframe", "esc_pctl"])
-    bars = bars.dropna(subset=["ts", "timeframe", "close"])
-
-    esc["esc_pctl"] = pd.to_numeric(esc["esc_pctl"], errors="coerce")
-    bars["close"] = pd.to_numeric(bars["close"], errors="coerce")
-    esc = esc.dropna(subset=["esc_pctl"])
-    bars = bars.dropna(subset=["close"])
+    esc = esc.dropna(subset=["asof"])
+    bars = bars.dropna(subset=["ts"])
 
-    bars = bars.sort_values(["timeframe", "ts"]).reset_index(drop=True)
+    bars = bars.sort_values(["timeframe", "ts"], kind="stable").reset_index(drop=True)
 
     # returns + forward return
     g = bars.groupby(["timeframe"], group_keys=False)
@@ -128,39 +151,84 @@ def _bin_by_quantiles(s: pd.Series, n_bins: int) -> pd.Series:
         return pd.qcut(r, q=n_bins, duplicates="drop")
 
 
+def _bin_tail_counts_numba(bin_idx, is_hi, is_lo, tail, ret, nb):
+    """Numba JIT: one pass accumulating per-bin totals, ret sums, and HIGH/LOW
+    counts + tail counts. bin_idx < 0 (unbinned) rows are skipped."""
+    n_total = np.zeros(nb, dtype=np.int64)
+    ret_sum = np.zeros(nb, dtype=np.float64)
+    hi_n = np.zeros(nb, dtype=np.int64)
+    hi_t = np.zeros(nb, dtype=np.int64)
+    lo_n = np.zeros(nb, dtype=np.int64)
+    lo_t = np.zeros(nb, dtype=np.int64)
+    for i in range(bin_idx.shape[0]):
+        b = bin_idx[i]
+        if b < 0:
+            continue
+        n_total[b] += 1
+        ret_sum[b] += ret[i]
+        if is_hi[i]:
+            hi_n[b] += 1
+            hi_t[b] += tail[i]
+        if is_lo[i]:
+            lo_n[b] += 1
+            lo_t[b] += tail[i]
+    return n_total, ret_sum, hi_n, hi_t, lo_n, lo_t
+
+
+if _HAS_NUMBA:
+    _bin_tail_counts_numba = numba.jit(nopython=True, cache=True)(_bin_tail_counts_numba)
+
+
+def _bin_tail_counts(bin_idx, is_hi, is_lo, tail, ret, nb):
+    if _HAS_NUMBA:
+        return _bin_tail_counts_numba(bin_idx, is_hi, is_lo, tail, ret, nb)
+    ok = bin_idx >= 0
+    b = bin_idx[ok]
+    is_hi, is_lo, tail = is_hi[ok], is_lo[ok], tail[ok]
+    n_total = np.bincount(b, minlength=nb)
+    ret_sum = np.bincount(b, weights=ret[ok], minlength=nb)
+    hi_n = np.bincount(b[is_hi], minlength=nb)
+    hi_t = np.bincount(b[is_hi & tail], minlength=nb)
+    lo_n = np.bincount(b[is_lo], minlength=nb)
+    lo_t = np.bincount(b[is_lo & tail], minlength=nb)
+    return n_total, ret_sum, hi_n, hi_t, lo_n, lo_t
+
+
 def conditional_tail_table(df: pd.DataFrame, bin_col: str, label: str) -> pd.DataFrame:
     # define groups
-    df = df.copy()
-    df["is_high"] = df["esc_pctl"] >= ESC_HIGH
-    df["is_low"] = df["esc_pctl"] <= ESC_LOW
-
-    df["bin"] = _bin_by_quantiles(df[bin_col], N_BINS)
-
-    rows = []
-    for b, sub in df.groupby("bin"):
-        hi = sub[sub["is_high"]]
-        lo = sub[sub["is_low"]]
-
-        # tail rates
-        hi_n = len(hi)
-        lo_n = len(lo)
-        hi_tail = float(hi["tail_20"].mean()) if hi_n else np.nan
-        lo_tail = float(lo["tail_20"].mean()) if lo_n else np.nan
-
-        rows.append({
-            "scheme": label,
-            "bin": str(b),
-            "bin_col": bin_col,
-            "bin_n_total": int(len(sub)),
-            "hi_n": int(hi_n),
-            "lo_n": int(lo_n),
-            "hi_tail_rate": hi_tail,
-            "lo_tail_rate": lo_tail,
-            "tail_rate_diff_hi_minus_lo": (hi_tail - lo_tail) if (hi_n and lo_n) else np.nan,
-            "bin_mean_ret_t": float(sub["ret_t"].mean()),
-        })
-
-    out = pd.DataFrame(rows)
+    esc = df["esc_pctl"].to_numpy(dtype=np.float64)
+    is_high = esc >= ESC_HIGH
+    is_low = esc <= ESC_LOW
+
+    bins = _bin_by_quantiles(df[bin_col], N_BINS)
+    cats = bins.cat.categories
+    n_total, ret_sum, hi_n, hi_t, lo_n, lo_t = _bin_tail_counts(
+        bins.cat.codes.to_numpy(dtype=np.int64),
+        is_high,
+        is_low,
+        df["tail_20"].to_numpy(dtype=bool),
+        df["ret_t"].to_numpy(dtype=np.float64),
+        len(cats),
+    )
+
+    # tail rates (empty bins are dropped, as groupby on observed bins does)
+    keep = n_total > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hi_tail = np.where(hi_n > 0, hi_t / hi_n, np.nan)
+        lo_tail = np.where(lo_n > 0, lo_t / lo_n, np.nan)
+        bin_mean = ret_sum / n_total
+    out = pd.DataFrame({
+        "scheme": label,
+        "bin": [str(b) for b in cats[keep]],
+        "bin_col": bin_col,
+        "bin_n_total": n_total[keep],
+        "hi_n": hi_n[keep],
+        "lo_n": lo_n[keep],
+        "hi_tail_rate": hi_tail[keep],
+        "lo_tail_rate": lo_tail[keep],
+        "tail_rate_diff_hi_minus_lo": (hi_tail - lo_tail)[keep],
+        "bin_mean_ret_t": bin_mean[keep],
+    })
 
     # adjusted (bin-weighted) difference using bins where both groups exist
     valid = out.dropna(subset=["tail_rate_diff_hi_minus_lo", "hi_n", "lo_n"])
@@ -175,6 +243,65 @@ def conditional_tail_table(df: pd.DataFrame, bin_col: str, label: str) -> pd.Dat
     return out
 
 
+def _group_bin_codes(df: pd.DataFrame, bin_col: str) -> np.ndarray:
+    # quantile bin codes cut within each timeframe; -1 marks unbinned rows
+    codes = np.full(len(df), -1, dtype=np.int64)
+    for idx in df.groupby("timeframe", sort=False).indices.values():
+        codes[idx] = _bin_by_quantiles(df[bin_col].iloc[idx], N_BINS).cat.codes.to_numpy(dtype=np.int64)
+    return codes
+
+
+def timeframe_summary(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-timeframe overall and bin-adjusted HIGH-LOW tail differences.
+
+    Every scheme is tallied in one pass over (timeframe, bin) cells instead of
+    rebuilding both conditional tables for each timeframe.
+    """
+    tf_codes, tf_names = pd.factorize(df["timeframe"], sort=True)
+    n_tf = len(tf_names)
+    esc = df["esc_pctl"].to_numpy(dtype=np.float64)
+    is_high = esc >= ESC_HIGH
+    is_low = esc <= ESC_LOW
+    tail = df["tail_20"].to_numpy(dtype=bool)
+    ret = df["ret_t"].to_numpy(dtype=np.float64)
+
+    rows = np.bincount(tf_codes, minlength=n_tf)
+    tail_n = np.bincount(tf_codes[tail], minlength=n_tf)
+    hi_count = np.bincount(tf_codes[is_high], minlength=n_tf)
+    lo_count = np.bincount(tf_codes[is_low], minlength=n_tf)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hi_rate = np.bincount(tf_codes[is_high & tail], minlength=n_tf) / hi_count
+        lo_rate = np.bincount(tf_codes[is_low & tail], minlength=n_tf) / lo_count
+
+    out = pd.DataFrame({
+        "timeframe": tf_names,
+        "rows_used": rows,
+        "hi_count": hi_count,
+        "lo_count": lo_count,
+        "overall_tail_rate": tail_n / rows,
+        "hi_tail_rate_overall": hi_rate,
+        "lo_tail_rate_overall": lo_rate,
+        "overall_diff_hi_minus_lo": hi_rate - lo_rate,
+    })
+
+    for bin_col, name in [("ret_t", "adj_diff_cond_on_ret_t"), ("ret_recent_4", "adj_diff_cond_on_recent4")]:
+        codes = _group_bin_codes(df, bin_col)
+        cell = np.where(codes >= 0, tf_codes * N_BINS + codes, -1)
+        _, _, hi_n, hi_t, lo_n, lo_t = _bin_tail_counts(cell, is_high, is_low, tail, ret, n_tf * N_BINS)
+
+        # weight by min(hi_n, lo_n) over cells where both groups exist, as in conditional_tail_table
+        both = (hi_n > 0) & (lo_n > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            diff = np.where(both, hi_t / hi_n - lo_t / lo_n, 0.0)
+        w = np.where(both, np.minimum(hi_n, lo_n), 0).astype(float)
+        cell_tf = np.repeat(np.arange(n_tf), N_BINS)
+        w_sum = np.bincount(cell_tf, weights=w, minlength=n_tf)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[name] = np.where(w_sum > 0, np.bincount(cell_tf, weights=w * diff, minlength=n_tf) / w_sum, np.nan)
+
+    return out
+
+
 def main() -> int:
     _ensure_dirs()
 
@@ -194,31 +321,8 @@ def main() -> int:
     tab_a.to_csv(out_a, index=False)
     tab_b.to_csv(out_b, index=False)
 
-    # summary per timeframe
-    # (We run per timeframe separately for institutional clarity)
-    summaries = []
-    for tf, sub in df.groupby("timeframe"):
-        sub = sub.copy()
-        sub["ret_recent_4"] = sub["ret_t"] + sub["ret_t_minus_1"] + sub["ret_t_minus_2"] + sub["ret_t_minus_3"]
-
-        ta = conditional_tail_table(sub, "ret_t", "A_ret_t_deciles")
-        tb = conditional_tail_table(sub, "ret_recent_4", "B_recent4_deciles")
-
-        summaries.append({
-            "timeframe": tf,
-            "rows_used": int(len(sub)),
-            "hi_count": int((sub["esc_pctl"] >= ESC_HIGH).sum()),
-            "lo_count": int((sub["esc_pctl"] <= ESC_LOW).sum()),
-            "overall_tail_rate": float(sub["tail_20"].mean()),
-            "hi_tail_rate_overall": float(sub.loc[sub["esc_pctl"] >= ESC_HIGH, "tail_20"].mean()),
-            "lo_tail_rate_overall": float(sub.loc[sub["esc_pctl"] <= ESC_LOW, "tail_20"].mean()),
-            "overall_diff_hi_minus_lo": float(sub.loc[sub["esc_pctl"] >= ESC_HIGH, "tail_20"].mean()
-                                             - sub.loc[sub["esc_pctl"] <= ESC_LOW, "tail_20"].mean()),
-            "adj_diff_cond_on_ret_t": ta.attrs.get("adjusted_diff", np.nan),
-            "adj_diff_cond_on_recent4": tb.attrs.get("adjusted_diff", np.nan),
-        })
-
-    summary = pd.DataFrame(summaries).sort_values("timeframe").reset_index(drop=True)
+    # summary per timeframe (bins are re-cut within each timeframe for institutional clarity)
+    summary = timeframe_summary(df)
     out_s = os.path.join(OUTPUT_DIR, "step3_conditional_tail_summary.csv")
     summary.to_csv(out_s, index=False)
 
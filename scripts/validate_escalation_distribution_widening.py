@@ -29,14 +29,28 @@ Data source:
 Outputs:
 - validation_outputs/step3_widening_summary.csv
 - validation_outputs/step3_widening_detail.csv
+  (each with a .parquet sibling for downstream reuse)
 """
 
 from __future__ import annotations
 
+import hashlib
+import inspect
 import os
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import numpy as np
 import pandas as pd
+import polars as pl
+
+try:
+    from scripts import _widening_kernels
+    from scripts._widening_kernels import forward_stats_multi
+except ModuleNotFoundError:
+    import _widening_kernels
+    from _widening_kernels import forward_stats_multi
 
 PROJECT_DIR = "/Users/sherifsaad/Documents/regime-engine"
 DB_PATH = os.path.join(PROJECT_DIR, "data", "regime_cache_SPY_escalation_frozen_2026-02-19.db")
@@ -55,18 +69,39 @@ HORIZONS = [5, 20, 60]
 
 ABS_Q = 0.95  # threshold for "large absolute move" based on unconditional abs(fwd_H)
 
+# summary metrics reported as HIGH - LOW in the DIFF row
+DIFF_COLS = ["p_abs_ge_q95", "mean_abs_fwd", "std_fwd", "mean_excursion", "p_fwd_ge_q95_pos", "p_fwd_le_q05_neg"]
+
+MAX_WORKERS = 1  # >1 processes timeframes in a process pool (pays off with many/intraday timeframes)
+
 def ensure_dirs():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 def load_joined(db_path: str) -> pd.DataFrame:
     con = sqlite3.connect(db_path)
 
+    # Null/non-numeric filtering and REAL casts happen in SQL, and ORDER BY rides the
+    # (symbol, timeframe, ts|asof) primary keys, so pandas only parses timestamps.
+    # symbol is fixed by the WHERE clause and is not fetched; timeframe becomes a
+    # categorical shared by both frames so the merge hashes small integer codes.
+    # The asof <-> ts join stays in pandas on parsed datetimes: the two tables are
+    # written by different jobs and their text formats are not guaranteed to match.
     esc = pd.read_sql_query(
-        f"SELECT symbol, timeframe, asof, esc_pctl FROM {ESC_TABLE} WHERE symbol = ?",
+        f"""
+        SELECT timeframe, asof, CAST(esc_pctl AS REAL) AS esc_pctl
+        FROM {ESC_TABLE}
+        WHERE symbol = ? AND typeof(esc_pctl) IN ('integer', 'real')
+        ORDER BY timeframe, asof
+        """,
         con, params=(SYMBOL,)
     )
     bars = pd.read_sql_query(
-        f"SELECT symbol, timeframe, ts, close FROM {BARS_TABLE} WHERE symbol = ?",
+        f"""
+        SELECT timeframe, ts, CAST(close AS REAL) AS close
+        FROM {BARS_TABLE}
+        WHERE symbol = ? AND typeof(close) IN ('integer', 'real')
+        ORDER BY timeframe, ts
+        """,
         con, params=(SYMBOL,)
     )
     con.close()
@@ -74,153 +109,191 @@ def load_joined(db_path: str) -> pd.DataFrame:
     esc["asof"] = pd.to_datetime(esc["asof"], errors="coerce")
     bars["ts"] = pd.to_datetime(bars["ts"], errors="coerce")
 
-    esc = esc.dropna(subset=["asof", "timeframe", "esc_pctl"]).copy()
-    bars = bars.dropna(subset=["ts", "timeframe", "close"]).copy()
-
-    esc["esc_pctl"] = pd.to_numeric(esc["esc_pctl"], errors="coerce")
-    bars["close"] = pd.to_numeric(bars["close"], errors="coerce")
+    esc = esc.dropna(subset=["asof"])
+    bars = bars.dropna(subset=["ts"])
 
-    esc = esc.dropna(subset=["esc_pctl"])
-    bars = bars.dropna(subset=["close"])
+    tf_dtype = pd.CategoricalDtype(sorted(set(esc["timeframe"]) | set(bars["timeframe"])))
+    esc["timeframe"] = esc["timeframe"].astype(tf_dtype)
+    bars["timeframe"] = bars["timeframe"].astype(tf_dtype)
 
-    bars = bars.sort_values(["timeframe", "ts"]).reset_index(drop=True)
+    bars = bars.sort_values(["timeframe", "ts"], kind="stable").reset_index(drop=True)
 
     df = bars.merge(
         esc,
-        left_on=["symbol", "timeframe", "ts"],
-        right_on=["symbol", "timeframe", "asof"],
+        left_on=["timeframe", "ts"],
+        right_on=["timeframe", "asof"],
         how="left",
     ).drop(columns=["asof"])
 
     df = df.dropna(subset=["esc_pctl"]).copy()
     return df
 
-def compute_forward_and_excursions(df_tf: pd.DataFrame, H: int) -> pd.DataFrame:
+def compute_forward_and_excursions(close: np.ndarray, horizons: list[int]) -> dict[str, np.ndarray]:
     """
-    Adds columns for a given horizon H:
+    Per-bar arrays for every horizon H in horizons:
     - fwd_H : close_{t+H}/close_t - 1
     - abs_fwd_H
     - mdd_H : min future return within 1..H
     - mur_H : max future return within 1..H
     - excursion_H : max(|mdd_H|, |mur_H|)
     """
-    close = df_tf["close"].to_numpy(dtype=float)
-    n = len(close)
-
-    fwd = np.full(n, np.nan)
-    if n > H:
-        fwd[:-H] = close[H:] / close[:-H] - 1.0
-
-    # excursion using rolling window future max/min of ratio
-    # For each t, look at close[t+1:t+H+1] relative to close[t]
-    mdd = np.full(n, np.nan)
-    mur = np.full(n, np.nan)
-
-    # O(n*H) is fine for this dataset size, but we keep it reasonably small with H<=60.
-    for i in range(n - H):
-        base = close[i]
-        window = close[i+1:i+H+1] / base - 1.0
-        mdd[i] = np.min(window)
-        mur[i] = np.max(window)
-
+    fwd, mdd, mur = forward_stats_multi(close, horizons)
     excursion = np.maximum(np.abs(mdd), np.abs(mur))
 
-    out = df_tf.copy()
-    out[f"fwd_{H}"] = fwd
-    out[f"abs_fwd_{H}"] = np.abs(fwd)
-    out[f"mdd_{H}"] = mdd
-    out[f"mur_{H}"] = mur
-    out[f"excursion_{H}"] = excursion
+    cols = {}
+    for k, H in enumerate(horizons):
+        cols[f"fwd_{H}"] = fwd[k]
+        cols[f"abs_fwd_{H}"] = np.abs(fwd[k])
+        cols[f"mdd_{H}"] = mdd[k]
+        cols[f"mur_{H}"] = mur[k]
+        cols[f"excursion_{H}"] = excursion[k]
 
-    return out
+    return cols
 
-def summarize(df_tf: pd.DataFrame, H: int) -> pd.DataFrame:
-    col_fwd = f"fwd_{H}"
-    col_abs = f"abs_fwd_{H}"
-    col_exc = f"excursion_{H}"
+def summarize(cols: dict[str, np.ndarray], esc: np.ndarray, H: int) -> pd.DataFrame:
+    fwd = cols[f"fwd_{H}"]
+    abs_fwd = cols[f"abs_fwd_{H}"]
+    exc = cols[f"excursion_{H}"]
 
-    work = df_tf.dropna(subset=[col_fwd, col_abs, col_exc]).copy()
-    if work.empty:
+    valid = ~(np.isnan(fwd) | np.isnan(abs_fwd) | np.isnan(exc))
+    if not valid.any():
         return pd.DataFrame()
 
     # unconditional thresholds per timeframe & horizon
-    q_abs = float(work[col_abs].quantile(ABS_Q))
-    q_pos = float(work[col_fwd].quantile(0.95))
-    q_neg = float(work[col_fwd].quantile(0.05))
-
-    work["is_high"] = work["esc_pctl"] >= ESC_HIGH
-    work["is_low"]  = work["esc_pctl"] <= ESC_LOW
+    q_abs = float(np.quantile(abs_fwd[valid], ABS_Q))
+    q_pos, q_neg = (float(v) for v in np.quantile(fwd[valid], [0.95, 0.05]))
 
-    hi = work[work["is_high"]]
-    lo = work[work["is_low"]]
+    is_high = valid & (esc >= ESC_HIGH)
+    is_low = valid & (esc <= ESC_LOW)
 
-    def rate(s: pd.Series) -> float:
-        return float(s.mean()) if len(s) else np.nan
+    def rate(m: np.ndarray) -> float:
+        return float(m.mean()) if len(m) else np.nan
 
     rows = []
-    for label, grp in [("HIGH", hi), ("LOW", lo)]:
+    for label, mask in [("HIGH", is_high), ("LOW", is_low)]:
+        g_fwd, g_abs, g_exc = fwd[mask], abs_fwd[mask], exc[mask]
+        n = len(g_fwd)
         rows.append({
             "group": label,
-            "n": int(len(grp)),
-            "p_abs_ge_q95": rate(grp[col_abs] >= q_abs),
-            "mean_abs_fwd": float(grp[col_abs].mean()) if len(grp) else np.nan,
-            "std_fwd": float(grp[col_fwd].std(ddof=0)) if len(grp) else np.nan,
-            "mean_excursion": float(grp[col_exc].mean()) if len(grp) else np.nan,
-            "p_fwd_ge_q95_pos": rate(grp[col_fwd] >= q_pos),
-            "p_fwd_le_q05_neg": rate(grp[col_fwd] <= q_neg),
+            "n": int(n),
+            "p_abs_ge_q95": rate(g_abs >= q_abs),
+            "mean_abs_fwd": float(g_abs.mean()) if n else np.nan,
+            "std_fwd": float(g_fwd.std(ddof=0)) if n else np.nan,
+            "mean_excursion": float(g_exc.mean()) if n else np.nan,
+            "p_fwd_ge_q95_pos": rate(g_fwd >= q_pos),
+            "p_fwd_le_q05_neg": rate(g_fwd <= q_neg),
             "q95_abs_threshold": q_abs,
             "q95_pos_threshold": q_pos,
             "q05_neg_threshold": q_neg,
         })
 
-    out = pd.DataFrame(rows)
-
     # add diffs (HIGH - LOW)
-    if len(out) == 2:
-        hi_row = out.iloc[0]
-        lo_row = out.iloc[1]
-        diff = {
-            "group": "DIFF_HIGH_MINUS_LOW",
-            "n": np.nan,
-            "p_abs_ge_q95": hi_row["p_abs_ge_q95"] - lo_row["p_abs_ge_q95"],
-            "mean_abs_fwd": hi_row["mean_abs_fwd"] - lo_row["mean_abs_fwd"],
-            "std_fwd": hi_row["std_fwd"] - lo_row["std_fwd"],
-            "mean_excursion": hi_row["mean_excursion"] - lo_row["mean_excursion"],
-            "p_fwd_ge_q95_pos": hi_row["p_fwd_ge_q95_pos"] - lo_row["p_fwd_ge_q95_pos"],
-            "p_fwd_le_q05_neg": hi_row["p_fwd_le_q05_neg"] - lo_row["p_fwd_le_q05_neg"],
-            "q95_abs_threshold": hi_row["q95_abs_threshold"],
-            "q95_pos_threshold": hi_row["q95_pos_threshold"],
-            "q05_neg_threshold": hi_row["q05_neg_threshold"],
-        }
-        out = pd.concat([out, pd.DataFrame([diff])], ignore_index=True)
-
-    return out
+    hi_row, lo_row = rows
+    rows.append({
+        "group": "DIFF_HIGH_MINUS_LOW",
+        "n": np.nan,
+        **{k: hi_row[k] - lo_row[k] for k in DIFF_COLS},
+        "q95_abs_threshold": q_abs,
+        "q95_pos_threshold": q_pos,
+        "q05_neg_threshold": q_neg,
+    })
+
+    return pd.DataFrame(rows)
+
+def write_table(df: pd.DataFrame, csv_path: str) -> None:
+    """Write df as CSV plus a zstd Parquet sibling (Polars I/O; pandas Parquet needs pyarrow)."""
+    df.to_csv(csv_path, index=False)
+    pl.DataFrame({c: df[c].to_numpy() for c in df.columns}).write_parquet(
+        os.path.splitext(csv_path)[0] + ".parquet", compression="zstd"
+    )
+
+def _timeframe_arrays(df: pd.DataFrame) -> dict[str, dict[str, np.ndarray]]:
+    """
+    Column arrays per timeframe. load_joined returns rows sorted by (timeframe, ts),
+    so each timeframe is a contiguous slice (a view) of one array per column.
+    close as float32 halves the bytes the window kernel streams (returns are still
+    formed in float64); esc_pctl stays float64 so the 0.99/0.50 cuts are exact.
+    """
+    tf = df["timeframe"].astype("category").cat
+    codes = tf.codes.to_numpy()
+    if len(codes) == 0:
+        return {}
+    close = df["close"].to_numpy(dtype=np.float32)
+    esc = df["esc_pctl"].to_numpy(dtype=float)
+    bounds = np.r_[0, np.flatnonzero(codes[1:] != codes[:-1]) + 1, len(codes)]
+    return {
+        str(tf.categories[codes[lo]]): {"close": close[lo:hi], "esc_pctl": esc[lo:hi]}
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    }
+
+def _code_fingerprint() -> bytes:
+    """Digest of compute_forward_and_excursions + _widening_kernels.py: a kernel edit invalidates the cache."""
+    h = hashlib.sha1(inspect.getsource(compute_forward_and_excursions).encode())
+    with open(_widening_kernels.__file__, "rb") as f:
+        h.update(f.read())
+    return h.digest()
+
+def _cached_forward_cols(
+    tf: str, close: np.ndarray, horizons: list[int], cache_dir: str | None
+) -> dict[str, np.ndarray]:
+    """
+    compute_forward_and_excursions behind a compressed .npz sidecar in cache_dir,
+    keyed by a digest of the close bytes + horizons + the computing code (so a changed
+    DB, horizon list or kernel misses). Miss: compute, write, and drop stale caches for the tf.
+    """
+    if cache_dir is None:
+        return compute_forward_and_excursions(close, horizons)
+    h = hashlib.sha1(np.ascontiguousarray(close).tobytes())
+    h.update(repr(list(horizons)).encode())
+    h.update(_code_fingerprint())
+    prefix = f"widening_{tf}_"
+    path = os.path.join(cache_dir, f"{prefix}{h.hexdigest()[:16]}.npz")
+    if os.path.exists(path):
+        with np.load(path) as z:
+            return {k: z[k] for k in z.files}
+
+    cols = compute_forward_and_excursions(close, horizons)
+    os.makedirs(cache_dir, exist_ok=True)
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name.endswith(".npz"):
+            os.remove(os.path.join(cache_dir, name))
+    np.savez_compressed(path, **cols)
+    return cols
+
+def _process_tf(
+    tf: str, arrs: dict[str, np.ndarray], horizons: list[int], cache_dir: str | None = None
+) -> list[pd.DataFrame]:
+    """Detail tables (HIGH/LOW/DIFF rows) for every horizon of one ts-sorted timeframe."""
+    cols = _cached_forward_cols(tf, arrs["close"], horizons, cache_dir)
+
+    tabs = []
+    for H in horizons:
+        tab = summarize(cols, arrs["esc_pctl"], H)
+        if tab.empty:
+            continue
+        tab.insert(0, "timeframe", tf)
+        tab.insert(1, "horizon_bars", H)
+        tabs.append(tab)
+    return tabs
 
 def main():
     ensure_dirs()
     df = load_joined(DB_PATH)
 
-    all_detail = []
-    all_summary = []
-
-    for tf, df_tf in df.groupby("timeframe"):
-        df_tf = df_tf.sort_values("ts").reset_index(drop=True)
-
-        for H in HORIZONS:
-            df_h = compute_forward_and_excursions(df_tf, H)
-            tab = summarize(df_h, H)
-            if tab.empty:
-                continue
-
-            tab.insert(0, "timeframe", tf)
-            tab.insert(1, "horizon_bars", H)
+    # Timeframes are independent; ship only the sorted numeric columns to workers
+    groups = list(_timeframe_arrays(df).items())
 
-            all_detail.append(tab)
+    run = partial(_process_tf, horizons=HORIZONS, cache_dir=os.path.join(OUTPUT_DIR, ".cache"))
+    if MAX_WORKERS > 1 and len(groups) > 1:
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as ex:
+            tabs = list(ex.map(run, *zip(*groups)))
+    else:
+        tabs = [run(tf, arrs) for tf, arrs in groups]
 
-            # one-line summary (diff row only)
-            diff = tab[tab["group"] == "DIFF_HIGH_MINUS_LOW"].copy()
-            if not diff.empty:
-                all_summary.append(diff)
+    all_detail = [t for tf_tabs in tabs for t in tf_tabs]
+    # one-line summary (diff row only)
+    all_summary = [t[t["group"] == "DIFF_HIGH_MINUS_LOW"] for t in all_detail]
+    all_summary = [t for t in all_summary if not t.empty]
 
     detail = pd.concat(all_detail, ignore_index=True) if all_detail else pd.DataFrame()
     summary = pd.concat(all_summary, ignore_index=True) if all_summary else pd.DataFrame()
@@ -228,8 +301,8 @@ def main():
     out_detail = os.path.join(OUTPUT_DIR, "step3_widening_detail.csv")
     out_summary = os.path.join(OUTPUT_DIR, "step3_widening_summary.csv")
 
-    detail.to_csv(out_detail, index=False)
-    summary.to_csv(out_summary, index=False)
+    write_table(detail, out_detail)
+    write_table(summary, out_summary)
 
     print("=== STEP 3 — Distribution Widening / Instability ===")
     print("DB:", DB_PATH)
@@ -11,6 +11,11 @@ from typing import Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
 
+try:
+    from scripts._widening_kernels import forward_stats
+except ModuleNotFoundError:
+    from _widening_kernels import forward_stats
+
 try:
     from scipy.stats import mannwhitneyu  # type: ignore
     SCIPY_OK = True
@@ -86,16 +91,14 @@ def add_forward_returns(px: pd.DataFrame, horizons: List[int]) -> pd.DataFrame:
 
 def cliffs_delta(a: np.ndarray, b: np.ndarray) -> float:
     # Cliff's delta: P(a > b) - P(a < b)
-    # O(n*m) but our samples are manageable
+    # Counted with binary searches into sorted b: O((n+m) log m), no scipy needed
     a = a[~np.isnan(a)]
     b = b[~np.isnan(b)]
     if len(a) == 0 or len(b) == 0:
         return np.nan
-    gt = 0
-    lt = 0
-    for x in a:
-        gt += np.sum(x > b)
-        lt += np.sum(x < b)
+    b = np.sort(b)
+    gt = int(np.searchsorted(b, a, side="left").sum())
+    lt = int((len(b) - np.searchsorted(b, a, side="right")).sum())
     denom = len(a) * len(b)
     return (gt - lt) / denom if denom else np.nan
 
@@ -132,15 +135,34 @@ class Row:
 def compute_stats(df: pd.DataFrame) -> pd.DataFrame:
     rows: List[Dict] = []
     # df must include escalation_score + fwd_*d columns
-    for q in QUANTILES:
-        cutoff = float(df["escalation_score"].quantile(q))
-        hi_mask = df["escalation_score"] >= cutoff
+    esc = df["escalation_score"].to_numpy(dtype=float)
+    fwd = {h: df[f"fwd_{h}d"].to_numpy(dtype=float) for h in HORIZONS}
+    valid = {h: ~np.isnan(fwd[h]) & ~np.isnan(esc) for h in HORIZONS}
+
+    # all cutoffs from one selection over the score column
+    cutoffs = np.nanquantile(esc, QUANTILES)
+
+    for q, cutoff in zip(QUANTILES, cutoffs):
+        cutoff = float(cutoff)
+        hi_mask = esc >= cutoff
 
         for h in HORIZONS:
-            col = f"fwd_{h}d"
-            d = df.dropna(subset=[col, "escalation_score"]).copy()
-            hi = d.loc[hi_mask.reindex(d.index, fill_value=False), col].to_numpy(dtype=float)
-            lo = d.loc[~hi_mask.reindex(d.index, fill_value=False), col].to_numpy(dtype=float)
+            hi = fwd[h][hi_mask & valid[h]]
+            lo = fwd[h][~hi_mask & valid[h]]
+
+            # tail-independent stats, computed once per (q, h)
+            base = {
+                "n_hi": int(len(hi)),
+                "n_lo": int(len(lo)),
+                "hi_mean": float(np.nanmean(hi)) if len(hi) else np.nan,
+                "lo_mean": float(np.nanmean(lo)) if len(lo) else np.nan,
+                "hi_median": float(np.nanmedian(hi)) if len(hi) else np.nan,
+                "lo_median": float(np.nanmedian(lo)) if len(lo) else np.nan,
+                "hi_neg_rate": float(np.mean(hi < 0)) if len(hi) else np.nan,
+                "lo_neg_rate": float(np.mean(lo < 0)) if len(lo) else np.nan,
+                "mw_pvalue": mw_pvalue(hi, lo),
+                "cliffs_delta": cliffs_delta(hi, lo),
+            }
 
             for tail in TAILS:
                 hi_tail = float(np.mean(hi <= tail)) if len(hi) else np.nan
@@ -151,16 +173,7 @@ def compute_stats(df: pd.DataFrame) -> pd.DataFrame:
                     "cutoff": cutoff,
                     "horizon_days": h,
                     "tail_threshold": tail,
-                    "n_hi": int(len(hi)),
-                    "n_lo": int(len(lo)),
-                    "hi_mean": float(np.nanmean(hi)) if len(hi) else np.nan,
-                    "lo_mean": float(np.nanmean(lo)) if len(lo) else np.nan,
-                    "hi_median": float(np.nanmedian(hi)) if len(hi) else np.nan,
-                    "lo_median": float(np.nanmedian(lo)) if len(lo) else np.nan,
-                    "hi_neg_rate": float(np.mean(hi < 0)) if len(hi) else np.nan,
-                    "lo_neg_rate": float(np.mean(lo < 0)) if len(lo) else np.nan,
-                    "mw_pvalue": mw_pvalue(hi, lo),
-                    "cliffs_delta": cliffs_delta(hi, lo),
+                    **base,
                     "hi_tail_rate": hi_tail,
                     "lo_tail_rate": lo_tail,
                 })
@@ -180,22 +193,21 @@ def compute_hit_rate_for_drawdowns(px: pd.DataFrame, esc: pd.DataFrame, lookahea
     # (use forward returns from Close shifted)
     close = df["Close"].to_numpy(dtype=float)
     n = len(df)
-    min_fwd = np.full(n, np.nan, dtype=float)
+    _, min_fwd, _ = forward_stats(close, lookahead_td)
 
-    for i in range(n):
-        j = min(n - 1, i + lookahead_td)
-        if i == j:
-            continue
-        # forward returns from i to each future day k in (i+1..j)
-        future = close[i+1:j+1] / close[i] - 1.0
-        if future.size:
-            min_fwd[i] = float(np.min(future))
+    # the last lookahead_td days see a truncated window close[i+1:n] (suffix min);
+    # the final day has no future and stays NaN
+    lo = max(0, n - lookahead_td)
+    if n > 1:
+        suffix_min = np.minimum.accumulate(close[::-1])[::-1]
+        min_fwd[lo:n - 1] = suffix_min[lo + 1:] / close[lo:n - 1] - 1.0
 
     df["min_fwd_lookahead"] = min_fwd
 
     out_rows: List[Dict] = []
-    for q in QUANTILES:
-        cutoff = float(df["escalation_score"].quantile(q))
+    cutoffs = np.nanquantile(df["escalation_score"].to_numpy(dtype=float), QUANTILES)
+    for q, cutoff in zip(QUANTILES, cutoffs):
+        cutoff = float(cutoff)
         warn = df["escalation_score"] >= cutoff
 
         for thr in [-0.10, -0.20]:
@@ -35,6 +35,7 @@ from typing import Optional, Tuple, List, Dict
 
 import numpy as np
 import pandas as pd
+import polars as pl
 
 try:
     from scipy.stats import mannwhitneyu
@@ -42,6 +43,18 @@ except Exception:
     print("ERROR: scipy is required. Install with: pip install scipy")
     sys.exit(1)
 
+try:
+    from scripts._widening_kernels import cliffs_delta, upper_quantile
+except ModuleNotFoundError:
+    from _widening_kernels import cliffs_delta, upper_quantile
+
+# Numba-accelerated path when available (pip install regime-engine[perf])
+try:
+    import numba
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
 
 # ----------------------------
 # Config (edit if needed)
@@ -89,6 +102,32 @@ def _resolve_path(fname: str) -> Optional[str]:
     return None
 
 
+def read_table(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a CSV input, preferring a sibling .parquet written at or after the CSV
+    (typed columns, no text reparse). Uses Polars I/O (pandas Parquet needs pyarrow).
+    columns: candidate names to keep; whichever exist in the file are read, the rest skipped.
+    """
+    pq_path = os.path.splitext(path)[0] + ".parquet"
+    if os.path.exists(pq_path) and os.path.getmtime(pq_path) >= os.path.getmtime(path):
+        if columns is not None:
+            columns = [c for c in pl.read_parquet_schema(pq_path) if c in columns]
+        pl_df = pl.read_parquet(pq_path, columns=columns)
+        return pd.DataFrame({c: pl_df[c].to_numpy() for c in pl_df.columns})
+    if columns is not None:
+        header = pd.read_csv(path, nrows=0).columns
+        columns = [c for c in header if c in columns]
+    return pd.read_csv(path, usecols=columns)
+
+
+def write_table(df: pd.DataFrame, csv_path: str) -> None:
+    """Write df as CSV plus a zstd Parquet sibling for downstream reuse."""
+    df.to_csv(csv_path, index=False)
+    pl.DataFrame({c: df[c].to_numpy() for c in df.columns}).write_parquet(
+        os.path.splitext(csv_path)[0] + ".parquet", compression="zstd"
+    )
+
+
 def find_existing_input_path() -> str:
     for fname in DEFAULT_INPUT_CANDIDATES:
         p = _resolve_path(fname)
@@ -110,25 +149,56 @@ def pick_column(df: pd.DataFrame, candidates: List[str], required: bool = True)
     return None
 
 
-def cliffs_delta(x: np.ndarray, y: np.ndarray) -> float:
+def _mwu_asymptotic_numba(x, y):
+    """
+    Numba JIT: two-sided Mann-Whitney U of x vs y with midranks, tie-corrected
+    normal approximation and continuity correction (scipy's asymptotic method).
+    Returns (U of x, p-value).
     """
-    Cliff's delta: probability that a random x is greater than a random y minus reverse.
-    Returns in [-1, 1]. Negative means x tends to be smaller than y.
-    Implementation: O(n log n) via ranking approximation is possible, but n is small enough for O(n*m) per window.
-    We'll do a safe-ish O(n*m) with early type coercion.
+    n1 = x.shape[0]
+    n2 = y.shape[0]
+    n = n1 + n2
+    z = np.concatenate((x, y))
+    order = np.argsort(z, kind="mergesort")
+    r1 = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < n:
+        j = i + 1
+        while j < n and z[order[j]] == z[order[i]]:
+            j += 1
+        t = j - i
+        avg_rank = 0.5 * (i + 1 + j)  # midrank of 1-based positions i+1..j
+        for k in range(i, j):
+            if order[k] < n1:
+                r1 += avg_rank
+        tie_term += t * t * t - t
+        i = j
+    u1 = r1 - n1 * (n1 + 1) / 2.0
+    u = max(u1, n1 * n2 - u1)
+    mu = n1 * n2 / 2.0
+    s = math.sqrt(n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1))))
+    if s == 0.0:
+        return u1, 1.0  # every value tied: scipy reports p=1
+    zscore = (u - mu - 0.5) / s
+    p = math.erfc(zscore / math.sqrt(2.0))  # 2 * norm.sf(z)
+    return u1, min(p, 1.0)
+
+
+if _HAS_NUMBA:
+    _mwu_asymptotic_numba = numba.jit(nopython=True, cache=True)(_mwu_asymptotic_numba)
+
+
+def mann_whitney(x: np.ndarray, y: np.ndarray) -> Tuple[float, float]:
     """
-    x = x[~np.isnan(x)]
-    y = y[~np.isnan(y)]
-    if len(x) == 0 or len(y) == 0:
-        return np.nan
-    # O(n*m)
-    gt = 0
-    lt = 0
-    for xi in x:
-        gt += np.sum(xi > y)
-        lt += np.sum(xi < y)
-    denom = len(x) * len(y)
-    return (gt - lt) / denom
+    Two-sided Mann-Whitney (U of x, p-value). Uses the JIT kernel where scipy's
+    "auto" method would pick the asymptotic test (both samples > 8, no NaNs);
+    otherwise defers to scipy (exact small-sample test, NaN propagation).
+    """
+    if _HAS_NUMBA and min(len(x), len(y)) > 8 and not (np.isnan(x).any() or np.isnan(y).any()):
+        return _mwu_asymptotic_numba(x.astype(np.float64), y.astype(np.float64))
+    res = mannwhitneyu(x, y, alternative="two-sided")
+    return float(res.statistic), float(res.pvalue)
 
 
 @dataclass
@@ -163,8 +233,8 @@ def main():
     esc_path = _resolve_path("escalation_score_daily.csv")
     fwd_path = _resolve_path("spy_regime_daily_forward.csv")
     if esc_path and fwd_path:
-        esc_df = pd.read_csv(esc_path)
-        fwd_df = pd.read_csv(fwd_path)
+        esc_df = read_table(esc_path, DATE_COL_CANDIDATES + [ESC_COL] + REGIME_COL_CANDIDATES)
+        fwd_df = read_table(fwd_path, DATE_COL_CANDIDATES + ["fwd_20d_ret"])
         esc_date = pick_column(esc_df, DATE_COL_CANDIDATES, required=True)
         fwd_date = pick_column(fwd_df, DATE_COL_CANDIDATES, required=True)
         esc_df[esc_date] = pd.to_datetime(esc_df[esc_date], errors="coerce").dt.tz_localize(None)
@@ -180,7 +250,9 @@ def main():
         input_path = f"(merged: {esc_path} + {fwd_path})"
     else:
         input_path = find_existing_input_path()
-        df = pd.read_csv(input_path)
+        df = read_table(
+            input_path, DATE_COL_CANDIDATES + [ESC_COL] + FWD20_COL_CANDIDATES + REGIME_COL_CANDIDATES
+        )
 
     if ESC_COL not in df.columns:
         raise KeyError(f"Missing escalation column '{ESC_COL}'. Need escalation_score_daily.csv.")
@@ -191,39 +263,48 @@ def main():
 
     # 2) Normalize date + sort
     df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-    df = df.dropna(subset=[date_col, ESC_COL, fwd_col]).copy()
+    df = df.dropna(subset=[date_col, ESC_COL, fwd_col])
+
+    # year as an integer view of datetime64[Y] (wall-clock year for tz-aware input);
+    # rows outside TRAIN_START_YEAR..LAST_YEAR are never touched by any window
+    dates = df[date_col]
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    year = dates.to_numpy(dtype="datetime64[Y]").astype(np.int64) + 1970
+    df = df.assign(year=year)[(year >= TRAIN_START_YEAR) & (year <= LAST_YEAR)]
     df = df.sort_values(date_col).reset_index(drop=True)
 
-    df["year"] = df[date_col].dt.year.astype(int)
-
     # 3) Rolling windows
+    # df is date-sorted, so every train/test window is a contiguous row range found
+    # by binary search on the year column; windows read zero-copy array slices.
     results: List[WindowResult] = []
+    years = df["year"].to_numpy()
+    esc_arr = df[ESC_COL].to_numpy(dtype=float)
+    fwd_arr = df[fwd_col].to_numpy(dtype=float)
+    dates = df[date_col]
 
     test_start = FIRST_TEST_START_YEAR
     while test_start <= LAST_YEAR:
         test_end = min(test_start + TEST_WINDOW_YEARS - 1, LAST_YEAR)
 
-        train_mask = (df["year"] >= TRAIN_START_YEAR) & (df["year"] <= (test_start - 1))
-        test_mask = (df["year"] >= test_start) & (df["year"] <= test_end)
-
-        train = df.loc[train_mask].copy()
-        test = df.loc[test_mask].copy()
+        lo, mid, hi = np.searchsorted(years, [TRAIN_START_YEAR, test_start, test_end + 1], side="left")
+        n_train = int(mid - lo)
+        n_test = int(hi - mid)
 
         # Sanity checks
-        if len(train) < MIN_TRAIN_ROWS or len(test) < MIN_TEST_ROWS:
+        if n_train < MIN_TRAIN_ROWS or n_test < MIN_TEST_ROWS:
             # Stop once tests get too small near ends, or early start too small.
             # But keep going if only one side is small? We'll stop to avoid junk windows.
             break
 
         # TRAIN-only cutoff
-        cutoff = float(np.nanquantile(train[ESC_COL].to_numpy(dtype=float), 1.0 - TOP_PCT))
+        cutoff = upper_quantile(esc_arr[lo:mid], 1.0 - TOP_PCT)
 
         # Apply to TEST
-        test_high = test.loc[test[ESC_COL] >= cutoff]
-        test_rest = test.loc[test[ESC_COL] < cutoff]
-
-        high_returns = test_high[fwd_col].to_numpy(dtype=float)
-        rest_returns = test_rest[fwd_col].to_numpy(dtype=float)
+        test_esc = esc_arr[mid:hi]
+        test_fwd = fwd_arr[mid:hi]
+        high_returns = test_fwd[test_esc >= cutoff]
+        rest_returns = test_fwd[test_esc < cutoff]
 
         # Tail probabilities
         tail_high = float(np.mean(high_returns <= TAIL_THRESHOLD)) if len(high_returns) else np.nan
@@ -233,21 +314,21 @@ def main():
         # Mann–Whitney U (two-sided) comparing distributions
         # Note: if sizes are tiny, p-values can be unstable; we guarded via MIN_TEST_ROWS.
         try:
-            u = mannwhitneyu(high_returns, rest_returns, alternative="two-sided")
-            p_value = float(u.pvalue)
+            u_stat, p_value = mann_whitney(high_returns, rest_returns)
         except Exception:
             p_value = np.nan
+            u_stat = None
 
         # Cliff's delta (negative means high escalation has *worse* returns if we compare high vs rest)
         # We want to know if high escalation shifts returns downward (more negative), so we compute delta on returns:
         # If high_returns tend to be smaller than rest_returns -> delta will be negative.
-        cliffs_d = float(cliffs_delta(high_returns, rest_returns))
+        cliffs_d = float(cliffs_delta(high_returns, rest_returns, u=u_stat))
 
         # Date bounds
-        train_start_dt = train[date_col].iloc[0]
-        train_end_dt = train[date_col].iloc[-1]
-        test_start_dt = test[date_col].iloc[0]
-        test_end_dt = test[date_col].iloc[-1]
+        train_start_dt = dates.iloc[lo]
+        train_end_dt = dates.iloc[mid - 1]
+        test_start_dt = dates.iloc[mid]
+        test_end_dt = dates.iloc[hi - 1]
 
         results.append(
             WindowResult(
@@ -255,11 +336,11 @@ def main():
                 train_end=train_end_dt.strftime("%Y-%m-%d"),
                 test_start=test_start_dt.strftime("%Y-%m-%d"),
                 test_end=test_end_dt.strftime("%Y-%m-%d"),
-                n_train=int(len(train)),
-                n_test=int(len(test)),
+                n_train=n_train,
+                n_test=n_test,
                 cutoff=cutoff,
-                n_high=int(len(test_high)),
-                n_rest=int(len(test_rest)),
+                n_high=int(len(high_returns)),
+                n_rest=int(len(rest_returns)),
                 tail_high=tail_high,
                 tail_rest=tail_rest,
                 ratio=ratio,
@@ -287,7 +368,7 @@ def main():
     out_df["is_p_lt_0_10"] = out_df["p_value"] < 0.10
     out_df["is_p_lt_0_05"] = out_df["p_value"] < 0.05
 
-    out_df.to_csv(out_path, index=False)
+    write_table(out_df, out_path)
 
     # 5) Print summary
     ratios = out_df["ratio"].replace([np.inf, -np.inf], np.nan).dropna()
@@ -24,11 +24,16 @@ from __future__ import annotations
 import os
 import sys
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+try:
+    from scripts._parquet_cache import cached_parquet
+except ModuleNotFoundError:
+    from _parquet_cache import cached_parquet
+
 
 # -----------------------------
 # Config
@@ -81,6 +86,15 @@ def _pick_col(df: pd.DataFrame, candidates: List[str], required: bool = True) ->
     return None
 
 
+def _pick_colmap(df: pd.DataFrame) -> ColMap:
+    return ColMap(
+        tf=_pick_col(df, TF_COL_CANDIDATES),
+        dt=_pick_col(df, DT_COL_CANDIDATES),
+        esc_pctl=_pick_col(df, ESC_PCTL_COL_CANDIDATES),
+        ret=_pick_col(df, RET_COL_CANDIDATES),
+    )
+
+
 def _ensure_dirs() -> None:
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -93,27 +107,32 @@ def load_data(path: str) -> pd.DataFrame:
             f"If your file has a different name, edit ESC_HISTORY_FILE in this script."
         )
 
-    df = pd.read_csv(path)
+    # Column mapping from the header; only the four mapped columns are parsed
+    colmap = _pick_colmap(pd.read_csv(path, nrows=0))
+    cols = [colmap.tf, colmap.dt, colmap.esc_pctl, colmap.ret]
 
-    # Column mapping
-    colmap = ColMap(
-        tf=_pick_col(df, TF_COL_CANDIDATES),
-        dt=_pick_col(df, DT_COL_CANDIDATES),
-        esc_pctl=_pick_col(df, ESC_PCTL_COL_CANDIDATES),
-        ret=_pick_col(df, RET_COL_CANDIDATES),
-    )
+    def build() -> pd.DataFrame:
+        df = pd.read_csv(path, usecols=cols)[cols]
 
-    # Parse dt
-    df[colmap.dt] = pd.to_datetime(df[colmap.dt], errors="coerce", utc=False)
-    df = df.dropna(subset=[colmap.dt, colmap.tf, colmap.esc_pctl, colmap.ret]).copy()
+        # Parse dt
+        df[colmap.dt] = pd.to_datetime(df[colmap.dt], errors="coerce", utc=False)
+        df = df.dropna(subset=[colmap.dt, colmap.tf, colmap.esc_pctl, colmap.ret]).copy()
 
-    # Coerce numeric
-    df[colmap.esc_pctl] = pd.to_numeric(df[colmap.esc_pctl], errors="coerce")
-    df[colmap.ret] = pd.to_numeric(df[colmap.ret], errors="coerce")
-    df = df.dropna(subset=[colmap.esc_pctl, colmap.ret]).copy()
+        # Coerce numeric
+        df[colmap.esc_pctl] = pd.to_numeric(df[colmap.esc_pctl], errors="coerce")
+        df[colmap.ret] = pd.to_numeric(df[colmap.ret], errors="coerce")
+        df = df.dropna(subset=[colmap.esc_pctl, colmap.ret]).copy()
 
-    # Sort for stable shifting
-    df = df.sort_values([colmap.tf, colmap.dt]).reset_index(drop=True)
+        # Sort for stable shifting
+        return df.sort_values([colmap.tf, colmap.dt]).reset_index(drop=True)
+
+    # The cleaned frame is cached as Parquet, keyed by CSV size + mtime
+    stem = os.path.splitext(os.path.basename(path))[0]
+    df = cached_parquet(path, f"leakage_{stem}", build, os.path.join(OUTPUT_DIR, ".cache"))
+
+    # Timeframe has a handful of values: group/factorize on category codes. esc_pctl and
+    # ret stay float64 so percentile cutoffs and return stats are unchanged.
+    df[colmap.tf] = df[colmap.tf].astype("category")
 
     # Attach mapping for downstream
     df.attrs["colmap"] = colmap
@@ -123,19 +142,24 @@ def load_data(path: str) -> pd.DataFrame:
 def compute_temporal_leakage_table(df: pd.DataFrame, pctl_threshold: float) -> Tuple[pd.DataFrame, pd.DataFrame]:
     colmap: ColMap = df.attrs["colmap"]
 
-    # Create lag/lead returns within each timeframe
-    g = df.groupby(colmap.tf, group_keys=False)
-
     df_work = df[[colmap.tf, colmap.dt, colmap.esc_pctl, colmap.ret]].copy()
-
-    # prior lags
     df_work["ret_t"] = df_work[colmap.ret]
-    for k in range(1, N_PRIOR + 1):
-        df_work[f"ret_t_minus_{k}"] = g[colmap.ret].shift(k)
 
-    # optional forward context
-    for k in range(1, N_FWD + 1):
-        df_work[f"ret_t_plus_{k}"] = g[colmap.ret].shift(-k)
+    # Lag/lead returns within each timeframe. load_data sorts by (tf, dt), so every
+    # timeframe is a contiguous block: a positional shift is the grouped shift once rows
+    # whose source lies in another timeframe are blanked.
+    ret = df_work[colmap.ret].to_numpy(dtype=float)
+    tf_codes = pd.factorize(df_work[colmap.tf])[0]
+    shifts = list(range(1, N_PRIOR + 1)) + [-k for k in range(1, N_FWD + 1)]  # prior lags, then forward context
+    shifted = np.full((len(ret), len(shifts)), np.nan)
+    for j, k in enumerate(shifts):
+        dst = slice(k, None) if k > 0 else slice(None, k)
+        src = slice(None, -k) if k > 0 else slice(-k, None)
+        col = shifted[dst, j]
+        col[:] = ret[src]
+        col[tf_codes[dst] != tf_codes[src]] = np.nan
+    lag_cols = [f"ret_t_minus_{k}" for k in range(1, N_PRIOR + 1)] + [f"ret_t_plus_{k}" for k in range(1, N_FWD + 1)]
+    df_work[lag_cols] = shifted
 
     # Condition set
     cond = df_work[colmap.esc_pctl] >= pctl_threshold
@@ -160,54 +184,65 @@ def compute_temporal_leakage_table(df: pd.DataFrame, pctl_threshold: float) -> T
         }])
         return by_tf, summary
 
-    rows = []
-    for tf, sub in df_hi.groupby(colmap.tf):
-        n_total = int((df_work[colmap.tf] == tf).sum())
-        n_hi = int(len(sub))
-        hi_rate = n_hi / n_total if n_total else np.nan
-
-        def _stats(series: pd.Series) -> Dict[str, float]:
-            s = pd.to_numeric(series, errors="coerce").dropna()
-            if s.empty:
-                return {"mean": np.nan, "median": np.nan, "pct_neg": np.nan}
-            return {
-                "mean": float(s.mean()),
-                "median": float(s.median()),
-                "pct_neg": float((s < 0).mean()),
-            }
-
-        out = {
-            "timeframe": tf,
-            "n_total": n_total,
-            "n_hi": n_hi,
-            "hi_rate": hi_rate,
-        }
-
-        # Stats for t, t-1..t-3, plus a small forward context
-        for col in ["ret_t"] + [f"ret_t_minus_{k}" for k in range(1, N_PRIOR + 1)] + [f"ret_t_plus_{k}" for k in range(1, N_FWD + 1)]:
-            st = _stats(sub[col])
-            out[f"mean_{col}"] = st["mean"]
-            out[f"median_{col}"] = st["median"]
-            out[f"pct_neg_{col}"] = st["pct_neg"]
-
-        rows.append(out)
-
-    by_tf = pd.DataFrame(rows).sort_values("timeframe").reset_index(drop=True)
-
-    # Overall summary across all timeframes (pooled)
-    pooled = df_hi.copy()
+    # Per-timeframe stats for every lag/lead column from bincounts over timeframe codes.
+    # NaNs (shifted columns at timeframe edges) are skipped, so pct_neg divides by the
+    # non-NaN count like dropna() did.
+    ret_cols = ["ret_t"] + [f"ret_t_minus_{k}" for k in range(1, N_PRIOR + 1)] + [f"ret_t_plus_{k}" for k in range(1, N_FWD + 1)]
+    codes, tf_values = pd.factorize(df_hi[colmap.tf], sort=True)
+    n_tf = len(tf_values)
+    vals = df_hi[ret_cols].to_numpy(dtype=float)
+    valid = ~np.isnan(vals)
+    n_valid = np.empty((n_tf, len(ret_cols)))
+    sums = np.empty_like(n_valid)
+    n_neg = np.empty_like(n_valid)
+    for j in range(len(ret_cols)):
+        c, v = codes[valid[:, j]], vals[valid[:, j], j]
+        n_valid[:, j] = np.bincount(c, minlength=n_tf)
+        sums[:, j] = np.bincount(c, weights=v, minlength=n_tf)
+        n_neg[:, j] = np.bincount(c, weights=v < 0, minlength=n_tf)
+
+    # medians: sort each timeframe's rows once (NaNs sort last), average the middle pair
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(n_tf + 1))
+    medians = np.empty_like(n_valid)
+    for g in range(n_tf):
+        block = np.sort(vals[order[bounds[g]:bounds[g + 1]]], axis=0)
+        cnt = n_valid[g].astype(np.int64)
+        mid = np.take_along_axis(block, np.maximum(np.stack([(cnt - 1) // 2, cnt // 2]), 0), axis=0)
+        medians[g] = np.where(cnt > 0, (mid[0] + mid[1]) / 2.0, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = sums / n_valid
+        pct_neg = n_neg / n_valid
+    # per column: mean, median, pct_neg
+    stats = pd.DataFrame({
+        f"{st}_{col}": arr[:, j]
+        for j, col in enumerate(ret_cols)
+        for st, arr in (("mean", means), ("median", medians), ("pct_neg", pct_neg))
+    })
+
+    n_hi = np.bincount(codes, minlength=n_tf)
+    n_total = df_work[colmap.tf].value_counts().reindex(tf_values)
+    by_tf = pd.DataFrame({
+        "timeframe": tf_values,
+        "n_total": n_total.to_numpy(dtype=int),
+        "n_hi": n_hi.astype(int),
+        "hi_rate": n_hi / n_total.to_numpy(),
+    })
+    by_tf = pd.concat([by_tf, stats], axis=1)
+    by_tf = by_tf.sort_values("timeframe").reset_index(drop=True)
+
+    # Overall summary across all timeframes (pooled); return columns are float64 from
+    # load_data, so no re-coercion or copy is needed
     pooled_row = {
         "pctl_threshold": pctl_threshold,
-        "n_hi_total": int(len(pooled)),
-        "mean_ret_t": float(pd.to_numeric(pooled["ret_t"], errors="coerce").mean()),
-        "median_ret_t": float(pd.to_numeric(pooled["ret_t"], errors="coerce").median()),
-        "pct_neg_ret_t": float((pd.to_numeric(pooled["ret_t"], errors="coerce") < 0).mean()),
+        "n_hi_total": int(len(df_hi)),
     }
-    for k in range(1, N_PRIOR + 1):
-        s = pd.to_numeric(pooled[f"ret_t_minus_{k}"], errors="coerce")
-        pooled_row[f"mean_ret_t_minus_{k}"] = float(s.mean())
-        pooled_row[f"median_ret_t_minus_{k}"] = float(s.median())
-        pooled_row[f"pct_neg_ret_t_minus_{k}"] = float((s < 0).mean())
+    for col in ["ret_t"] + [f"ret_t_minus_{k}" for k in range(1, N_PRIOR + 1)]:
+        s = df_hi[col]
+        pooled_row[f"mean_{col}"] = float(s.mean())
+        pooled_row[f"median_{col}"] = float(s.median())
+        pooled_row[f"pct_neg_{col}"] = float((s < 0).mean())
 
     summary = pd.DataFrame([pooled_row])
 
@@ -48,44 +48,65 @@ def ensure_dirs():
 
 def load_joined() -> pd.DataFrame:
     con = sqlite3.connect(DB_PATH)
+
+    # Same shape as the distribution-widening loader: non-numeric values are dropped and
+    # REAL-cast in SQL and ORDER BY rides the (symbol, timeframe, ts|asof) primary keys,
+    # so pandas only parses timestamps. Only TF_FOCUS timeframes are read (main() skips
+    # the rest). The asof <-> ts join stays on parsed datetimes.
+    tfs = sorted(TF_FOCUS)
+    tf_in = ", ".join("?" * len(tfs))
     esc = pd.read_sql_query(
-        f"SELECT symbol, timeframe, asof, esc_pctl FROM {ESC_TABLE} WHERE symbol=?",
-        con, params=(SYMBOL,)
+        f"SELECT timeframe, asof, CAST(esc_pctl AS REAL) AS esc_pctl FROM {ESC_TABLE} "
+        f"WHERE symbol=? AND timeframe IN ({tf_in}) AND typeof(esc_pctl) IN ('integer', 'real') "
+        f"ORDER BY timeframe, asof",
+        con, params=(SYMBOL, *tfs)
     )
     bars = pd.read_sql_query(
-        f"SELECT symbol, timeframe, ts, close FROM {BARS_TABLE} WHERE symbol=?",
-        con, params=(SYMBOL,)
+        f"SELECT timeframe, ts, CAST(close AS REAL) AS close FROM {BARS_TABLE} "
+        f"WHERE symbol=? AND timeframe IN ({tf_in}) AND typeof(close) IN ('integer', 'real') "
+        f"ORDER BY timeframe, ts",
+        con, params=(SYMBOL, *tfs)
     )
     con.close()
 
     esc["asof"] = pd.to_datetime(esc["asof"], errors="coerce")
     bars["ts"]  = pd.to_datetime(bars["ts"], errors="coerce")
-    esc = esc.dropna(subset=["asof","timeframe","esc_pctl"])
-    bars = bars.dropna(subset=["ts","timeframe","close"])
-
-    esc["esc_pctl"] = pd.to_numeric(esc["esc_pctl"], errors="coerce")
-    bars["close"] = pd.to_numeric(bars["close"], errors="coerce")
-    esc = esc.dropna(subset=["esc_pctl"])
-    bars = bars.dropna(subset=["close"])
+    esc = esc.dropna(subset=["asof"])
+    bars = bars.dropna(subset=["ts"])
 
-    bars = bars.sort_values(["timeframe","ts"]).reset_index(drop=True)
+    # symbol is fixed by the query; a shared categorical timeframe keeps the merge keys cheap
+    tf_dtype = pd.CategoricalDtype(sorted(set(esc["timeframe"]) | set(bars["timeframe"])))
+    esc["timeframe"] = esc["timeframe"].astype(tf_dtype)
+    bars["timeframe"] = bars["timeframe"].astype(tf_dtype)
 
     df = bars.merge(
         esc,
-        left_on=["symbol","timeframe","ts"],
-        right_on=["symbol","timeframe","asof"],
-        how="left",
+        left_on=["timeframe","ts"],
+        right_on=["timeframe","asof"],
+        how="inner",
     ).drop(columns=["asof"])
-
-    df = df.dropna(subset=["esc_pctl"]).copy()
     return df
 
+def _qcut_codes(s: pd.Series, n: int) -> pd.Series:
+    # pd.qcut(s, n, duplicates="drop") without per-row Interval work: same quantile edges,
+    # codes from searchsorted (right-closed, lowest edge included), labels built from the
+    # edges alone.
+    edges = np.unique(s.dropna().quantile(np.linspace(0, 1, n + 1)).to_numpy())
+    labels = pd.cut(edges, edges, include_lowest=True).categories
+    x = s.to_numpy(dtype=float)
+    ids = np.searchsorted(edges, x, side="left")
+    ids[x == edges[0]] = 1
+    codes = ids - 1
+    codes[np.isnan(x) | (ids == 0) | (ids == len(edges))] = -1
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels, ordered=True), index=s.index, name=s.name)
+
+
 def qbin(s: pd.Series, n=N_BINS):
     try:
-        return pd.qcut(s, q=n, duplicates="drop")
+        return _qcut_codes(s, n)
     except Exception:
         r = s.rank(method="average")
-        return pd.qcut(r, q=n, duplicates="drop")
+        return _qcut_codes(r, n)
 
 def main():
     ensure_dirs()
@@ -94,10 +115,8 @@ def main():
     details = []
     summaries = []
 
-    for tf, d in df.groupby("timeframe"):
-        if tf not in TF_FOCUS:
-            continue
-
+    # load_joined only reads TF_FOCUS timeframes
+    for tf, d in df.groupby("timeframe", observed=True):
         d = d.sort_values("ts").reset_index(drop=True)
         close = d["close"].to_numpy(float)
 
@@ -120,45 +139,51 @@ def main():
 
         # event threshold = unconditional q95 of abs_fwd_H (per timeframe)
         q95_abs = float(d["abs_fwd_H"].quantile(0.95))
-        d["event"] = d["abs_fwd_H"] >= q95_abs
+        event = d["abs_fwd_H"].to_numpy() >= q95_abs
 
-        # groups
-        d["is_high"] = d["esc_pctl"] >= ESC_HIGH
-        d["is_low"]  = d["esc_pctl"] <= ESC_LOW
+        # groups (plain masks; no per-bin frame copies)
+        esc = d["esc_pctl"].to_numpy(dtype=float)
+        is_high = esc >= ESC_HIGH
+        is_low = esc <= ESC_LOW
 
         # control bins
-        d["bin_absret"] = qbin(d["abs_ret_t"], N_BINS)
-        d["bin_rv"]     = qbin(d["rv_20"], N_BINS)
-
-        # within-bin comparison
-        for (b1, b2), sub in d.groupby(["bin_absret","bin_rv"]):
-            hi = sub[sub["is_high"]]
-            lo = sub[sub["is_low"]]
-            if len(hi) == 0 or len(lo) == 0:
-                continue
-
-            hi_rate = float(hi["event"].mean())
-            lo_rate = float(lo["event"].mean())
-            diff = hi_rate - lo_rate
-
-            details.append({
-                "timeframe": tf,
-                "H": H,
-                "q95_abs_threshold": q95_abs,
-                "bin_absret": str(b1),
-                "bin_rv": str(b2),
-                "n_total": int(len(sub)),
-                "hi_n": int(len(hi)),
-                "lo_n": int(len(lo)),
-                "hi_event_rate": hi_rate,
-                "lo_event_rate": lo_rate,
-                "diff_hi_minus_lo": diff,
-                "bin_mean_absret": float(sub["abs_ret_t"].mean()),
-                "bin_mean_rv": float(sub["rv_20"].mean()),
-            })
-
-        det = pd.DataFrame(details)
-        det_tf = det[det["timeframe"] == tf].copy()
+        bin_absret = qbin(d["abs_ret_t"], N_BINS)
+        bin_rv = qbin(d["rv_20"], N_BINS)
+        cats1, cats2 = bin_absret.cat.categories, bin_rv.cat.categories
+        nb2 = len(cats2)
+        n_cells = len(cats1) * nb2
+        cell = bin_absret.cat.codes.to_numpy(dtype=np.int64) * nb2 + bin_rv.cat.codes.to_numpy(dtype=np.int64)
+
+        # within-bin comparison: per-cell tallies in (abs_ret bin, rv bin) order
+        n_total = np.bincount(cell, minlength=n_cells)
+        hi_n = np.bincount(cell[is_high], minlength=n_cells)
+        lo_n = np.bincount(cell[is_low], minlength=n_cells)
+        hi_ev = np.bincount(cell[is_high & event], minlength=n_cells)
+        lo_ev = np.bincount(cell[is_low & event], minlength=n_cells)
+        sum_absret = np.bincount(cell, weights=d["abs_ret_t"].to_numpy(dtype=float), minlength=n_cells)
+        sum_rv = np.bincount(cell, weights=d["rv_20"].to_numpy(dtype=float), minlength=n_cells)
+
+        # cells with both HIGH and LOW samples; rates and diffs as whole-array ops
+        used = np.flatnonzero((hi_n > 0) & (lo_n > 0))
+        hi_rate = hi_ev[used] / hi_n[used]
+        lo_rate = lo_ev[used] / lo_n[used]
+        det_tf = pd.DataFrame({
+            "timeframe": tf,
+            "H": H,
+            "q95_abs_threshold": q95_abs,
+            "bin_absret": [str(cats1[c]) for c in used // nb2],
+            "bin_rv": [str(cats2[c]) for c in used % nb2],
+            "n_total": n_total[used],
+            "hi_n": hi_n[used],
+            "lo_n": lo_n[used],
+            "hi_event_rate": hi_rate,
+            "lo_event_rate": lo_rate,
+            "diff_hi_minus_lo": hi_rate - lo_rate,
+            "bin_mean_absret": sum_absret[used] / n_total[used],
+            "bin_mean_rv": sum_rv[used] / n_total[used],
+        })
+        if not det_tf.empty:
+            details.append(det_tf)
 
         if det_tf.empty:
             summaries.append({
@@ -183,7 +208,7 @@ def main():
             "mean_bin_rv": float(det_tf["bin_mean_rv"].mean()),
         })
 
-    detail_df = pd.DataFrame(details)
+    detail_df = pd.concat(details, ignore_index=True) if details else pd.DataFrame()
     summary_df = pd.DataFrame(summaries).sort_values("timeframe").reset_index(drop=True)
 
     out_detail = os.path.join(OUTPUT_DIR, "step3A_widening_binned_detail.csv")
@@ -1,15 +1,27 @@
 from __future__ import annotations
 
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, List
 
 import numpy as np
 import pandas as pd
+import polars as pl
+from numpy.lib.stride_tricks import sliding_window_view
 
+import regime_engine
 from regime_engine.cli import compute_market_state_from_df
-from regime_engine.escalation_v2 import compute_escalation_v2
+from regime_engine.escalation_v2 import compute_escalation_v2_series
 from regime_engine.features import compute_ema
 
+# scripts.* when imported from the repo root (tests, build_audit_bundle), bare when run directly
+try:
+    from scripts._parquet_cache import cached_parquet
+except ModuleNotFoundError:
+    from _parquet_cache import cached_parquet
+
 
 # -----------------
 # CONFIG
@@ -18,6 +30,21 @@ CSV_PATH = Path("data/btcusd_clean.csv")  # use cleaned BTCUSD data
 FORWARD_WINDOWS = [5, 10, 20]
 STRESS_DAY_THRESHOLD = -0.02  # -2% daily return defines a "stress day"
 PRE_STRESS_LOOKBACKS = [5, 10, 20]  # days before stress day to evaluate warnings
+ENGINE_CACHE_DIR = Path("validation_outputs/.cache")  # parsed prices + per-bar engine outputs, reused across runs
+ENGINE_INPUT_COLS = ["open", "high", "low", "close", "adj_close", "volume"]  # checked against the cache
+MAX_WORKERS = 1  # >1 runs uncached bars in a process pool (each bar only sees df[:i+1])
+ENGINE_CHUNKS_PER_WORKER = 4  # later bars feed longer windows; smaller chunks balance the pool
+
+# output column -> key in the engine's out["metrics"]
+ENGINE_METRIC_KEYS = {
+    "iix": "instability_index",
+    "dsr": "downside_shock_risk",
+    "vrs": "vrs",
+    "lq": "lq",
+    "risk_level": "risk_level",
+    "structural_score": "structural_score",
+    "market_bias": "market_bias",
+}
 
 
 def load_csv(path: Path | None = None) -> pd.DataFrame:
@@ -25,8 +52,18 @@ def load_csv(path: Path | None = None) -> pd.DataFrame:
     Loads Yahoo-style CSV or _clean.csv:
     Date, Open, High, Low, Close, [Adj Close], Volume
     Normalizes to: timestamp, open, high, low, close, volume
+    The normalized frame is cached as Parquet, so reruns skip the CSV parse.
     """
     p = path if path is not None else CSV_PATH
+    # the UTC index is cached as a naive-UTC column and re-localized on read
+    flat = cached_parquet(
+        p, f"prices_{p.stem}", lambda: _read_price_csv(p).tz_convert(None).reset_index(), ENGINE_CACHE_DIR
+    )
+    index = pd.DatetimeIndex(flat.pop("timestamp"), name="timestamp").tz_localize("UTC")
+    return flat.set_index(index)
+
+
+def _read_price_csv(p: Path) -> pd.DataFrame:
     df = pd.read_csv(p)
 
     # Normalize column names (handle both Date and date)
@@ -71,104 +108,188 @@ def load_csv(path: Path | None = None) -> pd.DataFrame:
 
 
 def add_forward_returns(df: pd.DataFrame) -> pd.DataFrame:
+    close = df["adj_close"].to_numpy(dtype=float)
     for w in FORWARD_WINDOWS:
-        df[f"fwd_{w}"] = df["adj_close"].shift(-w) / df["adj_close"] - 1.0
+        fwd = np.full(len(close), np.nan)
+        fwd[:-w] = close[w:] / close[:-w] - 1.0
+        df[f"fwd_{w}"] = fwd
     return df
 
 
-def run_engine_over_history(df: pd.DataFrame, symbol: str = "SPY") -> pd.DataFrame:
+def _engine_fingerprint(symbol: str) -> str:
+    """Digest of symbol + every regime_engine source file: any engine edit invalidates the cache."""
+    h = hashlib.sha1(symbol.upper().encode())
+    pkg = Path(regime_engine.__file__).resolve().parent
+    for src in sorted(pkg.glob("*.py")):
+        h.update(src.name.encode())
+        h.update(src.read_bytes())
+    return h.hexdigest()
+
+
+def _engine_inputs(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    cols = {"ts": df.index.as_unit("ns").asi8}
+    for c in ENGINE_INPUT_COLS:
+        if c in df.columns:
+            cols[c] = df[c].to_numpy(dtype=float)
+    return cols
+
+
+def _load_engine_cache(path: Path, key: str, inputs: Dict[str, np.ndarray]) -> tuple[int, Dict[str, np.ndarray]]:
     """
-    Runs your deterministic engine bar-by-bar by feeding an expanding window df[:i+1].
-    Stores regime + confidence + key risk metrics for later validation.
+    (n, outputs) for the longest leading run of bars whose inputs match the cache.
+    The engine at bar i only sees df[:i+1], so those bars' outputs are unchanged and
+    only the bars after them (new or revised data) need the engine again.
     """
-    regimes: List[str] = []
-    confidences: List[float] = []
-    convictions: List[str] = []
-
+    if not path.exists():
+        return 0, {}
+    with np.load(path) as z:
+        if str(z["key"]) != key or set(inputs) != {f[3:] for f in z.files if f.startswith("in_")}:
+            return 0, {}
+        n = min(len(z["in_ts"]), len(inputs["ts"]))
+        same = np.ones(n, dtype=bool)
+        for c, a in inputs.items():
+            a, b = a[:n], z[f"in_{c}"][:n]
+            same &= (a == b) | ((a != a) & (b != b))  # NaN volume counts as a match
+        n = n if same.all() else int(np.argmin(same))
+        return n, {f[4:]: z[f][:n] for f in z.files if f.startswith("out_")}
+
+
+def _engine_bars(df: pd.DataFrame, symbol: str, lo: int, hi: int) -> Dict[str, np.ndarray]:
+    """
+    Engine outputs for bars lo..hi-1, each fed its expanding window df[:i+1], written
+    into preallocated columns: labels as object arrays, everything numeric as float64.
+    """
+    n = hi - lo
+    bars: Dict[str, np.ndarray] = {
+        "regime": np.empty(n, dtype=object),
+        "confidence": np.empty(n),
+        "conviction": np.empty(n, dtype=object),
+    }
     # store a few core risk/context series so we can test "warning" behavior
-    iix_list: List[float] = []
-    dsr_list: List[float] = []
-    vrs_list: List[float] = []
-    lq_list: List[float] = []
-    rl_list: List[float] = []
-    ss_list: List[float] = []
-    mb_list: List[float] = []
-
-    for i in range(len(df)):
-        sub = df.iloc[: i + 1].copy()
-        out = compute_market_state_from_df(sub, symbol)
+    for c in ENGINE_METRIC_KEYS:
+        bars[c] = np.empty(n)
+
+    for j, i in enumerate(range(lo, hi)):
+        # the engine only reads its input, so a lazy (copy-on-write) slice replaces .copy()
+        out = compute_market_state_from_df(df.iloc[: i + 1], symbol)
 
         cls = out["classification"]
-        regimes.append(cls["regime_label"])
-        confidences.append(float(cls["confidence"]))
+        bars["regime"][j] = cls["regime_label"]
+        bars["confidence"][j] = float(cls["confidence"])
 
         # conviction tag is embedded in strategy_tags (HIGH/MEDIUM/LOW_CONVICTION)
         tags = cls.get("strategy_tags", [])
-        conv = next((t for t in tags if t.endswith("_CONVICTION")), "UNKNOWN_CONVICTION")
-        convictions.append(conv)
+        bars["conviction"][j] = next((t for t in tags if t.endswith("_CONVICTION")), "UNKNOWN_CONVICTION")
 
         # pull from out["metrics"] (your canonical numeric dict)
         m = out.get("metrics", {})
-        iix_list.append(float(m.get("instability_index", np.nan)))
-        dsr_list.append(float(m.get("downside_shock_risk", np.nan)))
-        vrs_list.append(float(m.get("vrs", np.nan)))
-        lq_list.append(float(m.get("lq", np.nan)))
-        rl_list.append(float(m.get("risk_level", np.nan)))
-        ss_list.append(float(m.get("structural_score", np.nan)))
-        mb_list.append(float(m.get("market_bias", np.nan)))
-
-    # Add escalation_v2 (requires arrays; compute from bar 20 onward, min 12 bars for windows)
+        for c, k in ENGINE_METRIC_KEYS.items():
+            bars[c][j] = float(m.get(k, np.nan))
+    return bars
+
+
+def run_engine_over_history(
+    df: pd.DataFrame, symbol: str = "SPY", cache_dir: Path | None = None
+) -> pd.DataFrame:
+    """
+    Runs your deterministic engine bar-by-bar by feeding an expanding window df[:i+1].
+    Stores regime + confidence + key risk metrics for later validation.
+    With cache_dir set (main passes ENGINE_CACHE_DIR), per-bar outputs persist in an .npz
+    sidecar so a rerun only feeds the engine the bars after the longest unchanged prefix
+    (e.g. newly appended days). The default caches nothing.
+    """
+    inputs = _engine_inputs(df)
+    key = _engine_fingerprint(symbol)
+    cache_path = cache_dir / f"engine_history_{symbol.lower()}.npz" if cache_dir is not None else None
+    n_cached, cached = _load_engine_cache(cache_path, key, inputs) if cache_path is not None else (0, {})
+
+    # Bars are independent (bar i only sees df[:i+1]), so only the uncached ones run;
+    # MAX_WORKERS > 1 fans contiguous chunks of them out to worker processes
+    n = len(df)
+    if MAX_WORKERS > 1 and n - n_cached > 1:
+        n_chunks = min(MAX_WORKERS * ENGINE_CHUNKS_PER_WORKER, n - n_cached)
+        edges = np.linspace(n_cached, n, n_chunks + 1).astype(int).tolist()
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as ex:
+            chunks = list(ex.map(partial(_engine_bars, df, symbol), edges[:-1], edges[1:]))
+    else:
+        chunks = [_engine_bars(df, symbol, n_cached, n)]
+    parts = ([cached] if n_cached else []) + chunks
+    outputs = {c: np.concatenate([p[c] for p in parts]) for c in chunks[0]}
+
+    if cache_path is not None and n_cached < n:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            cache_path,
+            key=np.array(key),
+            **{f"in_{c}": a for c, a in inputs.items()},
+            **{f"out_{c}": a.astype(str) if a.dtype == object else a for c, a in outputs.items()},
+        )
+
+    # Add escalation_v2 (requires arrays; compute from bar 20 onward, min 12 bars for windows).
+    # Every component (trailing windows, expanding percentiles) is causal, so one series pass
+    # over arrays[20:] gives, at each bar i, the value compute_escalation_v2 returns for the
+    # growing window arrays[20:i+1].
     ema_100 = compute_ema(df["adj_close"], 100)
     min_bars = 12  # max(windows) + 2
-    escalation_v2_list: List[float] = [float("nan")] * (20 + min_bars - 1)
-    for i in range(20 + min_bars - 1, len(df)):
-        dsr_arr = np.array(dsr_list[20 : i + 1], dtype=float)
-        iix_arr = np.array(iix_list[20 : i + 1], dtype=float)
-        ss_arr = np.array(ss_list[20 : i + 1], dtype=float)
-        close_arr = df["adj_close"].iloc[20 : i + 1].astype(float).values
-        ema_arr = ema_100.iloc[20 : i + 1].astype(float).values
-        esc, _ = compute_escalation_v2(dsr_arr, iix_arr, ss_arr, close_arr, ema_arr)
-        escalation_v2_list.append(float(esc))
+    escalation_v2 = np.full(len(df), np.nan)
+    if len(df) >= 20 + min_bars:
+        esc_full = compute_escalation_v2_series(
+            outputs["dsr"][20:],
+            outputs["iix"][20:],
+            outputs["structural_score"][20:],
+            df["adj_close"].to_numpy(dtype=float)[20:],
+            ema_100.to_numpy(dtype=float)[20:],
+        )
+        escalation_v2[20 + min_bars - 1 :] = esc_full[min_bars - 1 :]
 
     df = df.copy()
-    df["regime"] = regimes
-    df["confidence"] = confidences
-    df["conviction"] = convictions
-    df["iix"] = iix_list
-    df["dsr"] = dsr_list
-    df["vrs"] = vrs_list
-    df["lq"] = lq_list
-    df["risk_level"] = rl_list
-    df["structural_score"] = ss_list
-    df["market_bias"] = mb_list
-    df["escalation_v2"] = escalation_v2_list
+    for c, a in outputs.items():
+        df[c] = a
+    df["escalation_v2"] = escalation_v2
     return df
 
 
 def regime_forward_stats(df: pd.DataFrame) -> pd.DataFrame:
     """
     Forward-return stats grouped by regime and also by regime+conviction.
+    Each grouping is one Polars group_by/agg pass (NaN returns as nulls, so mean/median/
+    winrate skip them like dropna() did) instead of a Python loop over groups.
     """
-    rows = []
-
-    def summarize(group: pd.DataFrame, key: str) -> Dict[str, Any]:
-        row: Dict[str, Any] = {"group": key, "count": int(len(group))}
-        for w in FORWARD_WINDOWS:
-            s = group[f"fwd_{w}"].dropna()
-            row[f"mean_fwd_{w}"] = float(s.mean()) if len(s) else np.nan
-            row[f"median_fwd_{w}"] = float(s.median()) if len(s) else np.nan
-            row[f"winrate_fwd_{w}"] = float((s > 0).mean()) if len(s) else np.nan
-        return row
-
-    # by regime
-    for reg, g in df.groupby("regime"):
-        rows.append(summarize(g, f"regime={reg}"))
-
-    # by regime + conviction
-    for (reg, conv), g in df.groupby(["regime", "conviction"]):
-        rows.append(summarize(g, f"regime={reg} | {conv}"))
-
-    return pd.DataFrame(rows).sort_values("mean_fwd_10", ascending=False)
+    fwd_cols = [f"fwd_{w}" for w in FORWARD_WINDOWS]
+    frame = pl.DataFrame(
+        {
+            "regime": df["regime"].to_numpy(dtype=object, na_value=None).tolist(),
+            "conviction": df["conviction"].to_numpy(dtype=object, na_value=None).tolist(),
+            **{c: df[c].to_numpy(dtype=float) for c in fwd_cols},
+        },
+        nan_to_null=True,
+    ).filter(pl.col("regime").is_not_null())
+
+    aggs = [pl.len().alias("count")]
+    for c in fwd_cols:
+        s = pl.col(c)
+        aggs += [
+            s.mean().alias(f"mean_{c}"),
+            s.median().alias(f"median_{c}"),
+            ((s > 0).sum() / s.count()).alias(f"winrate_{c}"),
+        ]
+
+    # by regime, then by regime + conviction (each in sorted key order)
+    by_regime = (
+        frame.group_by("regime").agg(aggs).sort("regime")
+        .with_columns(pl.format("regime={}", "regime").alias("group"))
+    )
+    by_conviction = (
+        frame.filter(pl.col("conviction").is_not_null())
+        .group_by(["regime", "conviction"]).agg(aggs).sort(["regime", "conviction"])
+        .with_columns(pl.format("regime={} | {}", "regime", "conviction").alias("group"))
+    )
+    cols = ["group", "count"] + [f"{st}_{c}" for c in fwd_cols for st in ("mean", "median", "winrate")]
+    stats = pl.concat([by_regime.select(cols), by_conviction.select(cols)])
+
+    out = pd.DataFrame({c: stats[c].to_numpy() for c in cols})
+    out["count"] = out["count"].astype(int)
+    return out.sort_values("mean_fwd_10", ascending=False)
 
 
 def stress_day_warning_test(df: pd.DataFrame) -> pd.DataFrame:
@@ -188,48 +309,50 @@ def stress_day_warning_test(df: pd.DataFrame) -> pd.DataFrame:
     if not stress_positions:
         return pd.DataFrame([{"note": "No stress days found for threshold."}])
 
-    def window_slice(end_pos: int, lookback: int) -> pd.DataFrame:
-        start = max(0, end_pos - lookback)
-        return d.iloc[start:end_pos]
-
-    def compute_window_features(win: pd.DataFrame) -> Dict[str, Any]:
-        if len(win) == 0:
-            return {
-                "risk_flag_rate": np.nan,
-                "mean_iix": np.nan,
-                "mean_dsr": np.nan,
-                "mean_conf": np.nan,
-            }
-        risk_flags = win["regime"].isin(["PANIC_RISK", "SHOCK"]).mean()
-        return {
-            "risk_flag_rate": float(risk_flags),
-            "mean_iix": float(win["iix"].mean()),
-            "mean_dsr": float(win["dsr"].mean()),
-            "mean_conf": float(win["confidence"].mean()),
-        }
+    # Per-bar features (rows). The lookbacks are nested, so every window is a tail of
+    # its endpoint's longest window: gather max_lb bars before each endpoint once
+    # (NaN-padded before the first bar) and take NaN-skipping means over the last lb.
+    feature_names = ["risk_flag_rate", "mean_iix", "mean_dsr", "mean_conf"]
+    features = np.vstack(
+        [
+            d["regime"].isin(["PANIC_RISK", "SHOCK"]).to_numpy(dtype=float),
+            d["iix"].to_numpy(dtype=float),
+            d["dsr"].to_numpy(dtype=float),
+            d["confidence"].to_numpy(dtype=float),
+        ]
+    )
+    max_lb = max(PRE_STRESS_LOOKBACKS)
+    padded = np.concatenate([np.full((len(feature_names), max_lb), np.nan), features], axis=1)
+
+    def lookback_averages(endpoints: List[int]) -> Dict[int, pd.Series]:
+        # padded[:, i + o] is bar i - max_lb + o, so offsets 0..max_lb-1 span bars [i - max_lb, i)
+        win = padded[:, np.asarray(endpoints)[:, None] + np.arange(max_lb)]  # (feature, window, bar)
+        averages = {}
+        for lb in PRE_STRESS_LOOKBACKS:
+            tail = win[:, :, max_lb - lb:]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                means = np.nansum(tail, axis=2) / (~np.isnan(tail)).sum(axis=2)
+            averages[lb] = pd.DataFrame(means.T, columns=feature_names).mean()
+        return averages
 
     out_rows = []
     n_windows = len(stress_positions)
 
     rng = np.random.default_rng(7)
     # baseline endpoints: integer positions with enough lookback
-    baseline_candidates = [
-        i for i in range(len(d)) if i >= max(PRE_STRESS_LOOKBACKS)
-    ]
+    baseline_candidates = np.arange(max_lb, len(d))
     baseline_endpoints = rng.choice(
         baseline_candidates,
         size=n_windows,
         replace=(n_windows > len(baseline_candidates)),
     ).tolist()
 
-    for lb in PRE_STRESS_LOOKBACKS:
-        # stress windows
-        stress_feats = [compute_window_features(window_slice(i, lb)) for i in stress_positions]
-        stress_avg = pd.DataFrame(stress_feats).mean(numeric_only=True)
+    stress_avgs = lookback_averages(stress_positions)
+    base_avgs = lookback_averages(baseline_endpoints)
 
-        # baseline windows
-        base_feats = [compute_window_features(window_slice(i, lb)) for i in baseline_endpoints]
-        base_avg = pd.DataFrame(base_feats).mean(numeric_only=True)
+    for lb in PRE_STRESS_LOOKBACKS:
+        stress_avg = stress_avgs[lb]
+        base_avg = base_avgs[lb]
 
         out_rows.append(
             {
@@ -258,44 +381,44 @@ def regime_risk_stats(df: pd.DataFrame) -> pd.DataFrame:
     d = df.copy()
     d["ret_1"] = d["adj_close"].pct_change()
 
-    def fwd_max_drawdown(closes: np.ndarray) -> float:
-        # max drawdown within the window relative to start
-        start = closes[0]
-        if start <= 0:
-            return np.nan
-        dd = (closes / start) - 1.0
-        return float(dd.min())
-
     rows = []
     horizons = [10, 20]
 
-    for reg, g in d.groupby("regime"):
-        row = {"regime": reg, "count": int(len(g))}
-        # Use integer positions (df has DatetimeIndex)
-        idxs = d.index.get_indexer(g.index)
+    # Per-start forward stats for every bar with a full h-bar window, computed once per
+    # horizon and gathered per regime. mdd is the min of close/start - 1 over [i, i+h]
+    # (NaN for a non-positive start); neg3 flags a -3% day among rets i+1..i+h.
+    close = d["adj_close"].to_numpy(dtype=float)
+    neg3 = (d["ret_1"] <= -0.03).to_numpy()
+    fwd_stats = {}
+    for h in horizons:
+        if len(close) <= h:
+            fwd_stats[h] = None
+            continue
+        start = close[:-h]
+        mdd = (sliding_window_view(close, h + 1) / start[:, None] - 1.0).min(axis=1)
+        mdd[start <= 0] = np.nan
+        fwd_ret = close[h:] / start - 1.0
+        p_neg3 = sliding_window_view(neg3[1:], h).any(axis=1).astype(float)
+        fwd_stats[h] = (mdd, fwd_ret, p_neg3)
+
+    # integer positions of each regime's bars, straight from the grouper (sorted by regime)
+    positions = d.groupby("regime").indices
+    for reg in sorted(positions):
+        idxs = positions[reg]
+        row = {"regime": reg, "count": int(len(idxs))}
 
         for h in horizons:
-            mdds = []
-            tails = []
-            p_neg3 = []
-
-            for i in idxs:
-                if i + h >= len(d):
-                    continue
-
-                window_closes = d["adj_close"].iloc[i : i + h + 1].to_numpy()
-                mdds.append(fwd_max_drawdown(window_closes))
-
-                fwd_ret = (d["adj_close"].iloc[i + h] / d["adj_close"].iloc[i]) - 1.0
-                tails.append(fwd_ret)
-
-                # probability of at least one -3% day in the next h days
-                window_rets = d["ret_1"].iloc[i + 1 : i + h + 1]
-                p_neg3.append(float((window_rets <= -0.03).any()))
-
-            row[f"mdd_{h}d_mean"] = float(np.nanmean(mdds)) if mdds else np.nan
-            row[f"fwd_{h}d_p5"] = float(np.nanpercentile(tails, 5)) if tails else np.nan
-            row[f"prob_-3pct_day_{h}d"] = float(np.nanmean(p_neg3)) if p_neg3 else np.nan
+            valid = idxs[idxs + h < len(d)]
+            if fwd_stats[h] is None or len(valid) == 0:
+                row[f"mdd_{h}d_mean"] = np.nan
+                row[f"fwd_{h}d_p5"] = np.nan
+                row[f"prob_-3pct_day_{h}d"] = np.nan
+                continue
+
+            mdd, fwd_ret, p_neg3 = fwd_stats[h]
+            row[f"mdd_{h}d_mean"] = float(np.nanmean(mdd[valid]))
+            row[f"fwd_{h}d_p5"] = float(np.nanpercentile(fwd_ret[valid], 5))
+            row[f"prob_-3pct_day_{h}d"] = float(np.nanmean(p_neg3[valid]))
 
         rows.append(row)
 
@@ -307,7 +430,7 @@ def main():
     df = add_forward_returns(df)
 
     print("Running engine over full history (this may take a bit on first run)...")
-    df = run_engine_over_history(df, symbol="SPY")
+    df = run_engine_over_history(df, symbol="SPY", cache_dir=ENGINE_CACHE_DIR)
 
     results_df = df.reset_index()
     results_df = results_df.rename(columns={"timestamp": "date"})
@@ -32,6 +32,14 @@ from pathlib import Path
 import sqlite3
 import numpy as np
 import pandas as pd
+import polars as pl
+
+try:
+    from scripts._parquet_cache import cached_parquet
+    from scripts._widening_kernels import nonoverlap_starts, stationary_bootstrap_means
+except ModuleNotFoundError:
+    from _parquet_cache import cached_parquet
+    from _widening_kernels import nonoverlap_starts, stationary_bootstrap_means
 
 PROJECT_DIR = "/Users/sherifsaad/Documents/regime-engine"
 DB_PATH = os.path.join(PROJECT_DIR, "data", "regime_cache_SPY_escalation_frozen_2026-02-19.db")
@@ -77,68 +85,65 @@ def ensure_dirs():
 
 
 def load_joined() -> pd.DataFrame:
-    con = sqlite3.connect(DB_PATH)
+    """
+    Bars joined to esc_pctl for SYMBOL/TF. The cleaned join is cached as Parquet in
+    OUTPUT_DIR/.cache, keyed by DB size + mtime, so reruns skip the SQLite scan.
+    """
+    return cached_parquet(DB_PATH, f"overlap_{SYMBOL}_{TF}", _query_joined, os.path.join(OUTPUT_DIR, ".cache"))
+
 
+def _query_joined() -> pd.DataFrame:
+    # read-only: the frozen DB is never written, and ro mode takes no write locks
+    con = sqlite3.connect(f"{Path(DB_PATH).resolve().as_uri()}?mode=ro", uri=True)
+
+    # symbol and timeframe are fixed by the WHERE clause, so only the join key and value are
+    # fetched; ORDER BY rides the (symbol, timeframe, ts) primary key
     esc = pd.read_sql_query(
-        f"SELECT symbol, timeframe, asof, esc_pctl FROM {ESC_TABLE} WHERE symbol=? AND timeframe=?",
+        f"SELECT asof, esc_pctl FROM {ESC_TABLE} WHERE symbol=? AND timeframe=?",
         con, params=(SYMBOL, TF)
     )
     bars = pd.read_sql_query(
-        f"SELECT symbol, timeframe, ts, close FROM {BARS_TABLE} WHERE symbol=? AND timeframe=?",
+        f"SELECT ts, close FROM {BARS_TABLE} WHERE symbol=? AND timeframe=? ORDER BY ts",
         con, params=(SYMBOL, TF)
     )
     con.close()
 
     esc["asof"] = pd.to_datetime(esc["asof"], errors="coerce")
     bars["ts"] = pd.to_datetime(bars["ts"], errors="coerce")
-
-    esc = esc.dropna(subset=["asof", "esc_pctl"]).copy()
-    bars = bars.dropna(subset=["ts", "close"]).copy()
-
     esc["esc_pctl"] = pd.to_numeric(esc["esc_pctl"], errors="coerce")
     bars["close"] = pd.to_numeric(bars["close"], errors="coerce")
 
-    esc = esc.dropna(subset=["esc_pctl"])
-    bars = bars.dropna(subset=["close"])
+    esc = esc.dropna(subset=["asof", "esc_pctl"])
+    bars = bars.dropna(subset=["ts", "close"])
+    if not bars["ts"].is_monotonic_increasing:  # text order differs from time order
+        bars = bars.sort_values("ts")
 
-    bars = bars.sort_values("ts").reset_index(drop=True)
-
-    df = bars.merge(
-        esc,
-        left_on=["symbol", "timeframe", "ts"],
-        right_on=["symbol", "timeframe", "asof"],
-        how="left"
-    ).drop(columns=["asof"])
-
-    df = df.dropna(subset=["esc_pctl"]).copy()
+    # inner join keeps bar order and drops bars without a percentile
+    df = bars.merge(esc, left_on="ts", right_on="asof", how="inner").drop(columns=["asof"])
     return df
 
 
 def add_forward(df: pd.DataFrame) -> pd.DataFrame:
     close = df["close"].to_numpy(float)
-    n = len(close)
-
-    fwd = np.full(n, np.nan)
-    if n > H:
-        fwd[:-H] = close[H:] / close[:-H] - 1.0
+    n_valid = max(len(close) - H, 0)
 
-    out = df.copy()
-    out["fwd_H"] = fwd
-    out["abs_fwd_H"] = np.abs(fwd)
-    out = out.dropna(subset=["fwd_H", "abs_fwd_H"]).copy()
-    return out
+    # only the first n - H bars have a full forward window: compute and keep just those
+    fwd = close[H:] / close[:n_valid] - 1.0
+    out = df.iloc[:n_valid].assign(fwd_H=fwd, abs_fwd_H=np.abs(fwd))
+    ok = ~np.isnan(fwd)
+    return out if ok.all() else out[ok]
 
 
 def compute_lift(work: pd.DataFrame, q95_abs: float) -> dict:
-    work = work.copy()
-    work["event"] = work["abs_fwd_H"] >= q95_abs
-    hi = work[work["esc_pctl"] >= ESC_HIGH]
-    lo = work[work["esc_pctl"] <= ESC_LOW]
+    event = work["abs_fwd_H"].to_numpy(dtype=float) >= q95_abs
+    esc = work["esc_pctl"].to_numpy(dtype=float)
+    hi = esc >= ESC_HIGH
+    lo = esc <= ESC_LOW
 
-    hi_n = len(hi)
-    lo_n = len(lo)
-    hi_rate = float(hi["event"].mean()) if hi_n else np.nan
-    lo_rate = float(lo["event"].mean()) if lo_n else np.nan
+    hi_n = np.count_nonzero(hi)
+    lo_n = np.count_nonzero(lo)
+    hi_rate = np.count_nonzero(event & hi) / hi_n if hi_n else np.nan
+    lo_rate = np.count_nonzero(event & lo) / lo_n if lo_n else np.nan
 
     return {
         "n_total": int(len(work)),
@@ -151,63 +156,62 @@ def compute_lift(work: pd.DataFrame, q95_abs: float) -> dict:
     }
 
 
-def _event_driven_pick(work: pd.DataFrame, mask: pd.Series) -> pd.DataFrame:
+def event_driven_episodes(work: pd.DataFrame, q95_abs: float) -> pd.DataFrame:
     """
-    Generic event-driven non-overlap picker:
-    - Scan forward.
-    - When mask[i] is True, keep i and then skip the next H bars.
+    Event-driven non-overlap HIGH and LOW episodes, in time order:
+    - Scan forward separately for each group.
+    - When the group's condition holds at i, keep i and then skip the next H bars.
+    Adds group (HIGH/LOW) and event (1 if |fwd_H| >= q95_abs).
     """
-    work = work.reset_index(drop=True).copy()
-    mask = mask.reset_index(drop=True)
+    esc = work["esc_pctl"].to_numpy(dtype=float)
+    hi_idx = nonoverlap_starts(esc >= ESC_HIGH, H)
+    lo_idx = nonoverlap_starts(esc <= ESC_LOW, H)
 
-    keep_idx = []
-    i = 0
-    n = len(work)
-    while i < n:
-        if bool(mask.iloc[i]):
-            keep_idx.append(i)
-            i += H
-        else:
-            i += 1
-    return work.iloc[keep_idx].copy()
+    # the groups are disjoint, so merging the two position lists gives time order
+    idx = np.concatenate([hi_idx, lo_idx])
+    is_hi = np.concatenate([np.ones(len(hi_idx), dtype=bool), np.zeros(len(lo_idx), dtype=bool)])
+    order = np.argsort(idx, kind="stable")
+    idx, is_hi = idx[order], is_hi[order]
 
+    eps = work.reset_index(drop=True).iloc[idx].reset_index(drop=True)
+    eps["group"] = np.where(is_hi, "HIGH", "LOW")
+    eps["event"] = (eps["abs_fwd_H"].to_numpy() >= q95_abs).astype(int)
+    return eps
 
-def non_overlap_high(work: pd.DataFrame) -> pd.DataFrame:
-    """Event-driven non-overlap HIGH episodes (consume HIGH then skip H)."""
-    return _event_driven_pick(work, work["esc_pctl"] >= ESC_HIGH)
 
+def write_episodes_csv(eps: pd.DataFrame, path: Path) -> None:
+    """Episode CSV via Polars' native writer, with pandas' ts text (date-only when every ts is midnight)."""
+    ts = eps["ts"]
+    fmt = "%Y-%m-%d" if (ts == ts.dt.normalize()).all() else "%Y-%m-%d %H:%M:%S"
+    pl.DataFrame({c: eps[c].to_numpy() for c in eps.columns}).write_csv(path, datetime_format=fmt)
 
-def non_overlap_low(work: pd.DataFrame) -> pd.DataFrame:
-    """Event-driven non-overlap LOW episodes (consume LOW then skip H)."""
-    return _event_driven_pick(work, work["esc_pctl"] <= ESC_LOW)
 
 def bootstrap_event_driven(work: pd.DataFrame, q95_abs: float, n_boot: int, seed: int) -> dict:
     """
     Bootstrap on event-driven non-overlapping episodes.
-    Resample HIGH and LOW episode blocks with replacement.
+    Stationary block bootstrap of the HIGH and LOW event flags, each in time order,
+    with expected block length n ** (1/3).
     """
     rng = np.random.default_rng(seed)
 
-    hi = work[work["esc_pctl"] >= ESC_HIGH].copy()
-    lo = work[work["esc_pctl"] <= ESC_LOW].copy()
+    # event flags (NaN forward move counts as no event, as the >= comparison did)
+    abs_fwd = work["abs_fwd_H"].to_numpy(dtype=float)
+    esc = work["esc_pctl"].to_numpy(dtype=float)
+    hi_ev = abs_fwd[esc >= ESC_HIGH] >= q95_abs
+    lo_ev = abs_fwd[esc <= ESC_LOW] >= q95_abs
+    nh, nl = len(hi_ev), len(lo_ev)
 
-    if len(hi) == 0 or len(lo) == 0:
+    if nh == 0 or nl == 0:
         return {"boot_mean_diff": np.nan,
                 "boot_p05_diff": np.nan,
                 "boot_p95_diff": np.nan,
                 "boot_draws": 0}
 
-    diffs = []
-
-    for _ in range(n_boot):
-        hi_s = hi.sample(n=len(hi), replace=True, random_state=None)
-        lo_s = lo.sample(n=len(lo), replace=True, random_state=None)
-
-        hi_rate = float((hi_s["abs_fwd_H"] >= q95_abs).mean())
-        lo_rate = float((lo_s["abs_fwd_H"] >= q95_abs).mean())
-        diffs.append(hi_rate - lo_rate)
-
-    diffs = np.array(diffs, dtype=float)
+    # episodes are non-overlapping but adjacent ones can still share a volatility regime;
+    # geometric blocks keep that dependence where an i.i.d. resample would shrink the CI
+    hi_rate = stationary_bootstrap_means(hi_ev, n_boot, max(1, int(nh ** (1 / 3))), rng)
+    lo_rate = stationary_bootstrap_means(lo_ev, n_boot, max(1, int(nl ** (1 / 3))), rng)
+    diffs = hi_rate - lo_rate
 
     return {
         "boot_mean_diff": float(np.mean(diffs)),
@@ -236,23 +240,17 @@ def main():
     a.update({"method": "A_overlapping", "timeframe": TF, "H": H, "q95_abs_threshold": q95_abs})
 
     # B) non-overlapping deterministic slice
-    work_hi = non_overlap_high(work)
-    work_lo = non_overlap_low(work)
-    work_b = pd.concat([work_hi, work_lo], ignore_index=True)
     # STEP 5 SUPPORT: export episode-level sample used for non-overlap lift
-    # Add group (HIGH/LOW) and event (1 if |fwd_H| >= q95_abs) for Step 5
-    work_b = work_b.copy()
-    work_b["group"] = np.where(work_b["esc_pctl"] >= ESC_HIGH, "HIGH", "LOW")
-    work_b["event"] = (work_b["abs_fwd_H"] >= q95_abs).astype(int)
+    work_b = event_driven_episodes(work, q95_abs)
     out_eps = Path("validation_outputs/era_step4_event_driven_episodes.csv")
-    work_b.sort_values("ts").to_csv(out_eps, index=False)
+    write_episodes_csv(work_b, out_eps)
     print(f"[Step4] Wrote episode-level file for Step 5: {out_eps}  rows={len(work_b)}")
     b = compute_lift(work_b, q95_abs)
     b.update({"method": "B_event_driven_nonoverlap", "timeframe": TF, "H": H, "q95_abs_threshold": q95_abs})
 
     # C) bootstrap non-overlapping
     boot = bootstrap_event_driven(work_b, q95_abs, N_BOOT, SEED)
-    c = compute_lift(work_b, q95_abs)  # reuse B rates as point estimate for non-overlap
+    c = dict(b)  # reuse B rates as point estimate for non-overlap
     c.update({
         "method": "C_bootstrap_nonoverlap_CI",
         "timeframe": TF,
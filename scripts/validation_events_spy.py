@@ -20,6 +20,13 @@ from pathlib import Path
 
 from core.providers.bars_provider import BarsProvider
 
+# Bottleneck C kernels when available (pip install regime-engine[perf])
+try:
+    import bottleneck as bn
+    _HAS_BOTTLENECK = True
+except ImportError:
+    _HAS_BOTTLENECK = False
+
 SYMBOL = "SPY"
 TIMEFRAME = "1day"
 
@@ -30,42 +37,45 @@ LOOKAHEAD_BARS = 20
 
 def load_bars():
     """Load bars from Parquet (canonical source)."""
+    cols = ["open", "high", "low", "close"]
+    # project in the lazy scan so Parquet reads only these columns; ts is already a
+    # sorted native datetime, so it becomes the index as-is
     lf = BarsProvider.get_bars(SYMBOL, TIMEFRAME)
-    pl_df = lf.sort("ts").collect()
+    pl_df = lf.select(["ts", *cols]).sort("ts").collect()
     if pl_df.is_empty():
         return pd.DataFrame()
-    df = pd.DataFrame({c: pl_df[c].to_numpy() for c in pl_df.columns})
-    df["ts"] = pd.to_datetime(df["ts"])
-    df = df.set_index("ts")
-    df = df[["open", "high", "low", "close"]]
-    return df.sort_index()
+    index = pd.DatetimeIndex(pl_df["ts"].to_numpy(), name="ts")
+    return pd.DataFrame({c: pl_df[c].to_numpy() for c in cols}, index=index)
 
 
 def compute_atr(df):
-    high_low = df["high"] - df["low"]
-    high_close = (df["high"] - df["close"].shift()).abs()
-    low_close = (df["low"] - df["close"].shift()).abs()
+    high = df["high"].to_numpy(dtype=float)
+    low = df["low"].to_numpy(dtype=float)
+    close = df["close"].to_numpy(dtype=float)
+    prev_close = np.full_like(close, np.nan)
+    prev_close[1:] = close[:-1]
 
-    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    atr = tr.rolling(ATR_PERIOD).mean()
+    # true range; fmax skips NaN (the first bar's missing prev close) like a row-wise max
+    tr = np.fmax.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    if _HAS_BOTTLENECK and len(tr) >= ATR_PERIOD:  # move_mean rejects windows longer than the input
+        atr = bn.move_mean(tr, ATR_PERIOD)
+    else:
+        atr = pd.Series(tr).rolling(ATR_PERIOD).mean().to_numpy()
 
-    return atr
+    return pd.Series(atr, index=df.index)
 
 
 def detect_events(df):
-    df = df.copy()
-
-    df["atr"] = compute_atr(df)
-
-    # forward move over LOOKAHEAD_BARS
-    fwd_return = (df["close"].shift(-LOOKAHEAD_BARS) - df["close"])
-    df["fwd_move"] = fwd_return
+    atr = compute_atr(df).to_numpy()
 
-    df["event"] = (
-        df["fwd_move"].abs() >= (ATR_MULT * df["atr"])
-    )
+    # forward move over LOOKAHEAD_BARS (NaN where the window runs past the last bar)
+    close = df["close"].to_numpy(dtype=float)
+    fwd_move = np.full_like(close, np.nan)
+    fwd_move[:-LOOKAHEAD_BARS] = close[LOOKAHEAD_BARS:] - close[:-LOOKAHEAD_BARS]
 
-    events = df[df["event"]].copy()
+    # only event rows are materialized, with their atr / fwd_move attached
+    event = np.abs(fwd_move) >= ATR_MULT * atr
+    events = df[event].assign(atr=atr[event], fwd_move=fwd_move[event], event=True)
 
     return events
 
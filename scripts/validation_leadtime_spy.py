@@ -14,14 +14,13 @@ Output:
 
 import os
 import json
-import sqlite3
 from pathlib import Path
 
 import pandas as pd
 import numpy as np
 
 # Per-asset compute.db (canonical state source)
-from core.storage import get_compute_db_path
+from core.storage import connect_readonly, get_compute_db_path
 DEFAULT_DB = get_compute_db_path("SPY")
 DB_PATH = os.getenv("VALIDATION_COMPUTE_DB") or os.getenv("REGIME_DB_PATH") or str(DEFAULT_DB)
 
@@ -46,12 +45,18 @@ def load_state_history_daily(symbol: str, tf: str) -> pd.DataFrame:
     """
     Load all daily states for symbol from state_history and extract escalation fields.
     """
-    conn = sqlite3.connect(DB_PATH)
+    # SQLite's JSON1 pulls the two fields out of well-formed blobs; only blobs it rejects
+    # (e.g. NaN, which json.dumps writes but JSON1 does not parse) come back for json.loads
+    conn = connect_readonly(DB_PATH)
     rows = conn.execute(
         """
-        SELECT asof, state_json
-        FROM state_history
-        WHERE symbol=? AND timeframe=?
+        SELECT asof,
+               CASE WHEN ok THEN json_extract(state_json, '$.escalation_v2') END,
+               CASE WHEN ok THEN json_extract(state_json, '$.escalation_bucket') END,
+               CASE WHEN ok THEN NULL ELSE state_json END
+        FROM (SELECT asof, state_json, json_valid(state_json) AS ok
+              FROM state_history
+              WHERE symbol=? AND timeframe=?)
         ORDER BY asof ASC
         """,
         (symbol, tf),
@@ -62,15 +67,18 @@ def load_state_history_daily(symbol: str, tf: str) -> pd.DataFrame:
         return pd.DataFrame(columns=["asof", "escalation_v2", "escalation_bucket"])
 
     recs = []
-    for asof, state_json in rows:
-        try:
-            st = json.loads(state_json)
-        except Exception:
-            continue
+    for asof, esc, bucket, state_json in rows:
+        if state_json is not None:
+            try:
+                st = json.loads(state_json)
+            except Exception:
+                continue
+            esc = st.get("escalation_v2", None)
+            bucket = st.get("escalation_bucket", None)
         recs.append({
             "asof": asof,
-            "escalation_v2": st.get("escalation_v2", None),
-            "escalation_bucket": st.get("escalation_bucket", None),
+            "escalation_v2": esc,
+            "escalation_bucket": bucket,
         })
 
     df = pd.DataFrame(recs)
@@ -89,47 +97,47 @@ def main():
             "Or: python scripts/compute_asset_full.py --symbol SPY -t 1day (requires Parquet bars)"
         )
 
-    results = []
-
-    # pre-index for fast slicing
     states = states.sort_values("asof_dt").reset_index(drop=True)
 
-    for _, ev in events.iterrows():
-        event_date = ev["event_date"]
-        event_dt = pd.to_datetime(event_date)
-
-        start_dt = event_dt - pd.Timedelta(days=LOOKBACK_DAYS)
-
-        # window: [start_dt, event_dt) i.e., strictly before event day
-        win = states[(states["asof_dt"] >= start_dt) & (states["asof_dt"] < event_dt)].copy()
-
-        # warning hits
-        warn = win[win["escalation_bucket"] == WARNING_BUCKET].copy()
-        first_warn = warn["asof"].iloc[0] if len(warn) else None
-
-        lead_days = None
-        if first_warn:
-            lead_days = (event_dt - pd.to_datetime(first_warn)).days
-
-        # max escalation_v2 (ignore None)
-        max_esc = None
-        max_esc_asof = None
-        win_esc = win.dropna(subset=["escalation_v2"])
-        if len(win_esc):
-            idx = win_esc["escalation_v2"].astype(float).idxmax()
-            max_esc = float(win_esc.loc[idx, "escalation_v2"])
-            max_esc_asof = str(win_esc.loc[idx, "asof"])
+    # Each event's window [event_dt - LOOKBACK_DAYS, event_dt) (strictly before the event
+    # day) is a contiguous run of the sorted states: bound it with two searchsorted calls
+    # and gather every window into one (events x longest window) position matrix.
+    asof = states["asof"].to_numpy()
+    asof_dt = states["asof_dt"].to_numpy(dtype="datetime64[ns]")
+    event_dts = pd.to_datetime(events["event_date"]).to_numpy(dtype="datetime64[ns]")
+    starts = np.searchsorted(asof_dt, event_dts - np.timedelta64(LOOKBACK_DAYS, "D"), side="left")
+    ends = np.searchsorted(asof_dt, event_dts, side="left")
+    width = max(int((ends - starts).max()) if len(events) else 0, 1)
+    pos = np.minimum(starts[:, None] + np.arange(width), len(states) - 1)
+    in_win = starts[:, None] + np.arange(width) < ends[:, None]
+    rows = np.arange(len(pos))
+
+    # warning hits: count per window and the first hit
+    is_warn = (states["escalation_bucket"] == WARNING_BUCKET).to_numpy(dtype=bool)
+    warn_cum = np.concatenate(([0], np.cumsum(is_warn)))
+    warn_count = warn_cum[ends] - warn_cum[starts]
+    first_warn_pos = pos[rows, np.argmax(is_warn[pos] & in_win, axis=1)]
+    lead_days = (event_dts - asof_dt[first_warn_pos]) // np.timedelta64(1, "D")
+
+    # max escalation_v2 (ignore None); argmax keeps the first of tied maxima
+    esc = states["escalation_v2"].astype(float).to_numpy()
+    win_esc = np.where(in_win, esc[pos], np.nan)
+    has_esc = (~np.isnan(win_esc)).any(axis=1)
+    max_pos = pos[rows, np.argmax(np.nan_to_num(win_esc, nan=-np.inf), axis=1)]
 
+    results = []
+    for i, (event_date, fwd_move, atr) in enumerate(zip(events["event_date"], events["fwd_move"], events["atr"])):
+        warned = warn_count[i] > 0
         results.append({
             "event_date": event_date,
-            "fwd_move": float(ev["fwd_move"]),
-            "atr": float(ev["atr"]),
-            "threshold": float(ev["atr"] * 10),
-            "first_warning_date": first_warn,
-            "lead_days": lead_days,
-            "max_escalation_v2": max_esc,
-            "max_escalation_date": max_esc_asof,
-            "warning_count_in_window": int(len(warn)),
+            "fwd_move": float(fwd_move),
+            "atr": float(atr),
+            "threshold": float(atr * 10),
+            "first_warning_date": asof[first_warn_pos[i]] if warned else None,
+            "lead_days": int(lead_days[i]) if warned else None,
+            "max_escalation_v2": float(esc[max_pos[i]]) if has_esc[i] else None,
+            "max_escalation_date": str(asof[max_pos[i]]) if has_esc[i] else None,
+            "warning_count_in_window": int(warn_count[i]),
         })
 
     out = pd.DataFrame(results)
@@ -11,40 +11,45 @@ Run after migrate_live_to_parquet.py to confirm migration integrity.
 
 Usage:
   python scripts/verify_migration_equivalence.py [--symbol SPY]
-  python scripts/verify_migration_equivalence.py --all
+  python scripts/verify_migration_equivalence.py --all [--workers 4]
 """
 
 import argparse
 import sqlite3
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
 import polars as pl
 
 from core.assets_registry import core_assets, daily_assets
 from core.providers.bars_provider import get_bars_path
+from core.storage import connect_readonly
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 TIMEFRAMES = ["15min", "1h", "4h", "1day", "1week"]
 
 
-def get_live_stats(symbol: str, tf: str, conn: sqlite3.Connection) -> dict | None:
-    """Get count, min_ts, max_ts, duplicates in live.db for symbol/tf."""
+def get_live_stats(symbol: str, conn: sqlite3.Connection) -> dict:
+    """Get count, min_ts, max_ts, duplicates in live.db for every TIMEFRAMES entry of symbol."""
+    # one aggregate query for all timeframes; the (symbol, timeframe, ts) key keeps it an index scan
+    marks = ",".join("?" * len(TIMEFRAMES))
     try:
         rows = conn.execute(
-            "SELECT ts FROM bars WHERE symbol=? AND timeframe=?",
-            (symbol, tf),
+            "SELECT timeframe, COUNT(*), COUNT(DISTINCT ts), MIN(ts), MAX(ts) FROM bars "
+            f"WHERE symbol=? AND timeframe IN ({marks}) GROUP BY timeframe",
+            (symbol, *TIMEFRAMES),
         ).fetchall()
     except Exception:
-        return None
-    if not rows:
-        return None
-    df = pl.DataFrame({"ts": [r[0] for r in rows]}).with_columns(pl.col("ts").str.to_datetime())
-    count = len(df)
-    min_ts = df["ts"].min()
-    max_ts = df["ts"].max()
-    dup_count = count - df["ts"].n_unique()
-    return {"count": count, "min_ts": min_ts, "max_ts": max_ts, "duplicates": dup_count}
+        return {}
+    stats = {}
+    for tf, count, n_unique, min_ts, max_ts in rows:
+        # ts is ISO text, so text order is time order; parse only the two bounds
+        min_ts, max_ts = pl.Series("ts", [min_ts, max_ts]).str.to_datetime().to_list()
+        dup_count = count - n_unique
+        stats[tf] = {"count": count, "min_ts": min_ts, "max_ts": max_ts, "duplicates": dup_count}
+    return stats
 
 
 def get_parquet_stats(symbol: str, tf: str) -> dict | None:
@@ -54,16 +59,19 @@ def get_parquet_stats(symbol: str, tf: str) -> dict | None:
         return None
     try:
         lf = pl.scan_parquet(path / "**/*.parquet")
-        df = lf.select("ts").collect()
+        # aggregate lazily so only the stats row is materialized, not the ts column
+        stats = lf.select(
+            pl.len().alias("count"),
+            pl.col("ts").min().alias("min_ts"),
+            pl.col("ts").max().alias("max_ts"),
+            pl.col("ts").n_unique().alias("n_unique"),
+        ).collect().row(0, named=True)
     except Exception:
         return None
-    if df.is_empty():
+    if not stats["count"]:
         return None
-    count = len(df)
-    min_ts = df["ts"].min()
-    max_ts = df["ts"].max()
-    dup_count = count - df["ts"].n_unique()
-    return {"count": count, "min_ts": min_ts, "max_ts": max_ts, "duplicates": dup_count}
+    dup_count = stats["count"] - stats["n_unique"]
+    return {"count": stats["count"], "min_ts": stats["min_ts"], "max_ts": stats["max_ts"], "duplicates": dup_count}
 
 
 def verify_symbol(symbol: str, verbose: bool = False) -> tuple[bool, list[str]]:
@@ -72,12 +80,13 @@ def verify_symbol(symbol: str, verbose: bool = False) -> tuple[bool, list[str]]:
     if not db_path.exists():
         return True, [f"SKIP {symbol}: live.db not found (nothing to verify)"]
 
-    conn = sqlite3.connect(str(db_path))
+    conn = connect_readonly(db_path)
     all_pass = True
     msgs = []
 
+    live_by_tf = get_live_stats(symbol, conn)
     for tf in TIMEFRAMES:
-        live = get_live_stats(symbol, tf, conn)
+        live = live_by_tf.get(tf)
         parquet = get_parquet_stats(symbol, tf)
 
         if live is None and parquet is None:
@@ -124,6 +133,7 @@ def main():
     ap.add_argument("--symbol", help="Single symbol (e.g. SPY)")
     ap.add_argument("--all", action="store_true", help="Verify all symbols with live.db")
     ap.add_argument("-v", "--verbose", action="store_true", help="Print OK for each tf")
+    ap.add_argument("--workers", type=int, default=4, help="Parallel workers for --all")
     args = ap.parse_args()
 
     if args.all:
@@ -135,9 +145,15 @@ def main():
         if not have_db:
             print("No symbols with live.db found.")
             return 0
+        # symbols are independent (each opens its own live.db); map keeps the print order
+        verify = partial(verify_symbol, verbose=args.verbose)
+        if args.workers > 1 and len(have_db) > 1:
+            with ProcessPoolExecutor(max_workers=args.workers) as ex:
+                results = list(ex.map(verify, have_db))
+        else:
+            results = [verify(s) for s in have_db]
         any_fail = False
-        for symbol in have_db:
-            ok, msgs = verify_symbol(symbol, verbose=args.verbose)
+        for ok, msgs in results:
             for m in msgs:
                 print(m)
             if not ok:
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
 Real-time monitor for vultr_run_compute. Run in a separate terminal.
+A watchdog observer redraws as soon as the state or running file changes; the
+--interval tick keeps the rate/ETA current between changes.
 
 Usage:
   python scripts/vultr_monitor.py
@@ -12,32 +14,71 @@ from __future__ import annotations
 import argparse
 import json
 import sys
+import threading
 import time
 from pathlib import Path
 
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 STATE_FILE = PROJECT_ROOT / "vultr_run_state.json"
 RUNNING_FILE = PROJECT_ROOT / "vultr_running.json"
+RATE_ALPHA = 0.3  # EWMA weight of the newest per-tick rate in the ETA
+
+
+class StateFilesWatcher(FileSystemEventHandler):
+    """Sets `changed` on any event touching the state or running file."""
+
+    def __init__(self, changed: threading.Event):
+        self.changed = changed
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        # save_state os.replace()s a temp file: the state file is a move's dest
+        paths = (event.src_path, getattr(event, "dest_path", "") or "")
+        if any(Path(p).name in (STATE_FILE.name, RUNNING_FILE.name) for p in paths if p):
+            self.changed.set()
+
+
+def _load_json_if_changed(path: Path, cache: dict) -> dict:
+    """json.load path, reusing the last parse while its (mtime, size) is unchanged."""
+    st = path.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    hit = cache.get(path)
+    if hit is None or hit[0] != key:
+        with open(path, encoding="utf-8") as f:
+            hit = cache[path] = (key, json.load(f))
+    return hit[1]
 
 
 def main() -> None:
     ap = argparse.ArgumentParser(description="Monitor Vultr compute progress")
-    ap.add_argument("--interval", type=int, default=3, help="Refresh interval (seconds)")
+    ap.add_argument("--interval", type=int, default=3,
+                    help="Max seconds between redraws; file changes redraw immediately")
     args = ap.parse_args()
 
     total = 1565
-    last_n = 0
+    last_n = None  # no rate until a second reading exists
     last_t = time.time()
-
+    ewma_rate = 0.0
+    inst = 0.0
+    parsed: dict = {}  # path -> ((mtime_ns, size), data); redraws between changes reuse it
+
+    changed = threading.Event()
+    observer = Observer()
+    observer.schedule(StateFilesWatcher(changed), path=str(PROJECT_ROOT), recursive=False)
+    observer.start()
     try:
         while True:
+            changed.clear()  # before reading, so a change during this pass wakes the next
             if not STATE_FILE.exists():
                 print("\rWaiting for vultr_run_state.json...", end="", flush=True)
-                time.sleep(args.interval)
+                changed.wait(timeout=args.interval)
                 continue
 
-            with open(STATE_FILE, encoding="utf-8") as f:
-                state = json.load(f)
+            state = _load_json_if_changed(STATE_FILE, parsed)
 
             completed = state.get("completed", [])
             failed = state.get("failed", {})
@@ -45,14 +86,20 @@ def main() -> None:
             n_failed = len(failed)
             n_pending = total - n_completed - n_failed
 
-            # Rate (symbols/min) from last interval
-            rate = (n_completed - last_n) / (args.interval / 60) if last_n > 0 or n_completed > 0 else 0
-            last_n = n_completed
-
-            if n_pending > 0 and rate > 0:
-                eta_str = f"ETA ~{n_pending / rate:.0f} min"
-            elif rate > 0:
-                eta_str = f"Rate: {rate:.1f}/min"
+            # Rate (symbols/min) over the last tick, smoothed with an EWMA for the ETA; change
+            # redraws in between leave it alone so bursts do not read as huge rates
+            now = time.time()
+            if last_n is None:
+                last_n, last_t = n_completed, now
+            elif now - last_t >= args.interval:
+                inst = (n_completed - last_n) / ((now - last_t) / 60)
+                ewma_rate = RATE_ALPHA * inst + (1 - RATE_ALPHA) * ewma_rate
+                last_n, last_t = n_completed, now
+
+            if n_pending > 0 and ewma_rate > 1e-6:
+                eta_str = f"ETA ~{n_pending / ewma_rate:.0f} min (rate {ewma_rate:.1f}/min, last tick {inst:.1f}/min)"
+            elif ewma_rate > 1e-6:
+                eta_str = f"Rate: {ewma_rate:.1f}/min (last tick {inst:.1f}/min)"
             else:
                 eta_str = ""
 
@@ -60,8 +107,7 @@ def main() -> None:
             running = {}
             if RUNNING_FILE.exists():
                 try:
-                    with open(RUNNING_FILE, encoding="utf-8") as f:
-                        running = json.load(f)
+                    running = _load_json_if_changed(RUNNING_FILE, parsed)
                 except (json.JSONDecodeError, OSError):
                     pass
 
@@ -81,10 +127,13 @@ def main() -> None:
             if failed:
                 print(f"  Last failed: {', '.join(list(failed.keys())[-3:])}")
 
-            time.sleep(args.interval)
+            changed.wait(timeout=args.interval)
     except KeyboardInterrupt:
         print("\nStopped.")
         sys.exit(0)
+    finally:
+        observer.stop()
+        observer.join()
 
 
 if __name__ == "__main__":
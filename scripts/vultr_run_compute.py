@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
 Vultr batch compute: run compute_asset_full for all symbols with Parquet bars.
-Resumable, parallel, tracks progress.
+Resumable, parallel, tracks progress. Symbols run in a process pool whose workers fork
+from a forkserver that has already imported the compute stack, so a worker starts warm;
+each worker is retired after MAX_TASKS_PER_WORKER symbols so its memory is released.
 
 Usage (on Vultr):
   pip install regime-engine[perf]   # Numba speedup
@@ -9,25 +11,38 @@ Usage (on Vultr):
   python scripts/vultr_run_compute.py --workers 4 --resume
   python scripts/vultr_run_compute.py --status
 
-Progress: vultr_run_state.json (completed, failed, timings)
+Progress: vultr_run_state.json (completed, failed, timings), snapshotted every
+SNAPSHOT_EVERY_S seconds / SNAPSHOT_EVERY_N symbols; vultr_run_state.log journals
+completions since the last snapshot and is replayed on the next start.
+A worker that dies (OOM, segfault) breaks the pool: the symbols it took down are rerun
+one per pool so only the one that crashed is marked failed, and the rest continue.
 """
 
 from __future__ import annotations
 
 import argparse
+import contextlib
+import io
 import json
+import multiprocessing
 import os
-import subprocess
 import sys
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))  # compute_asset_full imports core.*
 STATE_FILE = PROJECT_ROOT / "vultr_run_state.json"
 RUNNING_FILE = PROJECT_ROOT / "vultr_running.json"
-COMPUTE_SCRIPT = Path(__file__).resolve().parent / "compute_asset_full.py"
+JOURNAL_FILE = PROJECT_ROOT / "vultr_run_state.log"
+SNAPSHOT_EVERY_S = 30  # rewrite STATE_FILE at most this often...
+SNAPSHOT_EVERY_N = 25  # ...or after this many completions since the last snapshot
+MAX_TASKS_PER_WORKER = 1  # heavy symbols peak at GBs; a fresh worker per symbol returns it
+WORKER_PRELOAD = ["numpy", "pandas", "compute_asset_full", "regime_engine.escalation_v2"]
 
 RUNNING_SLOTS: list[str | None] = []
 RUNNING_LOCK = threading.Lock()
@@ -49,16 +64,39 @@ def get_symbols_with_bars() -> list[str]:
 
 
 def load_state() -> dict:
+    state = {"completed": [], "failed": {}, "started_at": None, "updated_at": None}
     if STATE_FILE.exists():
         with open(STATE_FILE, encoding="utf-8") as f:
-            return json.load(f)
-    return {"completed": [], "failed": {}, "started_at": None, "updated_at": None}
+            state = json.load(f)
+    # replay completions journaled after the last snapshot (idempotent, so a crash between
+    # snapshot and journal truncation replays harmlessly)
+    if JOURNAL_FILE.exists():
+        completed = state.setdefault("completed", [])
+        failed = state.setdefault("failed", {})
+        seen = set(completed)
+        with open(JOURNAL_FILE, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from a crash
+                if rec["ok"]:
+                    if rec["sym"] not in seen:
+                        completed.append(rec["sym"])
+                        seen.add(rec["sym"])
+                    failed.pop(rec["sym"], None)
+                else:
+                    failed[rec["sym"]] = rec["err"]
+    return state
 
 
 def save_state(state: dict) -> None:
+    """Snapshot state atomically (temp file + os.replace): readers never see a partial file."""
     state["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
-    with open(STATE_FILE, "w", encoding="utf-8") as f:
+    tmp = STATE_FILE.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
 
 
 def _write_running() -> None:
@@ -67,8 +105,51 @@ def _write_running() -> None:
         json.dump(d, f)
 
 
-def run_compute(symbol: str) -> tuple[str, bool, float, str]:
-    """Run compute_asset_full for one symbol. Returns (symbol, ok, duration, error)."""
+def _warm_worker() -> None:
+    """Pool initializer: import the compute stack (already loaded when forked from the
+    forkserver) and load the Numba kernels from their on-disk cache."""
+    import numpy as np
+    import pandas as pd
+
+    import compute_asset_full  # noqa: F401
+    from regime_engine.escalation_v2 import expanding_percentile_transform
+
+    expanding_percentile_transform(pd.Series(np.arange(100.0)), min_bars=1)
+
+
+def _start_pool(workers: int) -> ProcessPoolExecutor:
+    """Warmed compute pool. Workers start lazily from the slot threads, so they come from a
+    forkserver (spawn where unavailable) rather than a fork of a multi-threaded process;
+    the forkserver preloads WORKER_PRELOAD, so recycled workers do not re-import it."""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(WORKER_PRELOAD)
+    else:
+        ctx = multiprocessing.get_context("spawn")
+    kwargs = {}
+    if sys.version_info >= (3, 11):  # max_tasks_per_child is 3.11+; 3.10 keeps workers alive
+        kwargs["max_tasks_per_child"] = MAX_TASKS_PER_WORKER
+    return ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_warm_worker, **kwargs)
+
+
+def _compute_symbol(symbol: str) -> str:
+    """Worker body: compute one symbol. Returns "" on success, else the error tail."""
+    import compute_asset_full
+
+    # compute logs are discarded as they were when each symbol ran in a captured subprocess
+    sink = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+            compute_asset_full.run(symbol, source="parquet")
+    except (Exception, SystemExit):
+        return traceback.format_exc()[-500:]
+    return ""
+
+
+def run_compute(symbol: str, pool: ProcessPoolExecutor) -> tuple[str, bool, float, str] | None:
+    """Run compute_asset_full for one symbol on pool. Returns (symbol, ok, duration, error),
+    or None if the pool was already broken and the symbol never started. Raises
+    BrokenProcessPool if a worker died while the symbol was in flight."""
     slot = -1
     if RUNNING_SLOTS:
         with RUNNING_LOCK:
@@ -81,26 +162,20 @@ def run_compute(symbol: str) -> tuple[str, bool, float, str]:
             _write_running()
 
     t0 = time.perf_counter()
-    env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT)}
     try:
-        r = subprocess.run(
-            [sys.executable, str(COMPUTE_SCRIPT), "--symbol", symbol, "--input", "parquet"],
-            cwd=str(PROJECT_ROOT),
-            env=env,
-            capture_output=True,
-            text=True,
-            timeout=None,  # unlimited; heavy symbols (BTCUSD, AAPL, etc.) can take hours
-        )
-        duration = time.perf_counter() - t0
-        if r.returncode == 0:
-            return symbol, True, duration, ""
-        return symbol, False, duration, (r.stderr or r.stdout or "unknown")[:500]
-    except subprocess.TimeoutExpired:
+        try:
+            fut = pool.submit(_compute_symbol, symbol)
+        except BrokenProcessPool:
+            return None
+        # unlimited wait; heavy symbols (BTCUSD, AAPL, etc.) can take hours
+        err = fut.result()
         duration = time.perf_counter() - t0
-        return symbol, False, duration, "timeout"
+        return symbol, not err, duration, err
+    except BrokenProcessPool:
+        raise
     except Exception as e:
         duration = time.perf_counter() - t0
-        return symbol, False, duration, str(e)[:500]
+        return symbol, False, duration, str(e)[:500] or type(e).__name__
     finally:
         if slot >= 0 and RUNNING_SLOTS:
             with RUNNING_LOCK:
@@ -108,6 +183,20 @@ def run_compute(symbol: str) -> tuple[str, bool, float, str]:
             _write_running()
 
 
+def run_isolated(symbol: str) -> tuple[str, bool, float, str]:
+    """Rerun a symbol that was in flight when a worker died, alone in a fresh one-worker pool,
+    so a crash here is pinned on this symbol and nothing else."""
+    t0 = time.perf_counter()
+    with _start_pool(1) as pool:
+        try:
+            res = run_compute(symbol, pool)
+        except BrokenProcessPool as e:
+            return symbol, False, time.perf_counter() - t0, f"worker process died: {e}"[:500]
+    # a fresh pool cannot already be broken at submit
+    assert res is not None
+    return res
+
+
 def main() -> None:
     ap = argparse.ArgumentParser(description="Vultr: run compute for all symbols with Parquet")
     ap.add_argument("--workers", type=int, default=4, help="Parallel workers")
@@ -168,20 +257,61 @@ def main() -> None:
         RUNNING_FILE.unlink()
 
     done = 0
-    with ThreadPoolExecutor(max_workers=args.workers) as ex:
-        futures = {ex.submit(run_compute, s): s for s in to_run}
-        for fut in as_completed(futures):
-            symbol, ok, duration, err = fut.result()
-            done += 1
-            if ok:
-                state["completed"].append(symbol)
-                print(f"[{done}/{len(to_run)}] {symbol} OK ({duration:.1f}s)")
-            else:
-                state["failed"][symbol] = err
-                print(f"[{done}/{len(to_run)}] {symbol} FAIL ({duration:.1f}s): {err[:60]}...")
-            save_state(state)  # save every symbol so monitor sees real-time progress
+    # every completion is appended to the journal; the full state file is only rewritten at
+    # snapshot points (the monitor reads snapshots, so it lags by at most SNAPSHOT_EVERY_S)
+    last_snapshot_at = time.monotonic()
+    since_snapshot = 0
+
+    def finish(symbol: str, ok: bool, duration: float, err: str) -> None:
+        nonlocal done, last_snapshot_at, since_snapshot
+        done += 1
+        journal.write(json.dumps({"sym": symbol, "ok": ok, "dur": round(duration, 3), "err": err}) + "\n")
+        if ok:
+            state["completed"].append(symbol)
+            print(f"[{done}/{len(to_run)}] {symbol} OK ({duration:.1f}s)")
+        else:
+            state["failed"][symbol] = err
+            print(f"[{done}/{len(to_run)}] {symbol} FAIL ({duration:.1f}s): {err[:60]}...")
+        since_snapshot += 1
+        if since_snapshot >= SNAPSHOT_EVERY_N or time.monotonic() - last_snapshot_at >= SNAPSHOT_EVERY_S:
+            save_state(state)
+            journal.seek(0)
+            journal.truncate()
+            last_snapshot_at = time.monotonic()
+            since_snapshot = 0
+
+    pending = to_run
+    # (closed on error too; a journal left behind is replayed by the next load_state)
+    with open(JOURNAL_FILE, "w", encoding="utf-8", buffering=1) as journal:
+        while pending:
+            # threads keep the running-slot bookkeeping in this process; the compute itself
+            # runs in a persistent process pool whose workers are reused across symbols
+            retry: list[str] = []
+            suspects: list[str] = []
+            with _start_pool(args.workers) as pool, ThreadPoolExecutor(max_workers=args.workers) as ex:
+                futures = {ex.submit(run_compute, s, pool): s for s in pending}
+                for fut in as_completed(futures):
+                    try:
+                        res = fut.result()
+                    except BrokenProcessPool:
+                        suspects.append(futures[fut])
+                        continue
+                    if res is None:
+                        retry.append(futures[fut])
+                    else:
+                        finish(*res)
+            # a dead worker (OOM, segfault) breaks the whole pool and fails every symbol in
+            # flight; rerun those one per pool to find the culprit, then restart the rest
+            if suspects:
+                print(f"Worker died; rerunning {len(suspects)} in-flight symbol(s) in isolation, "
+                      f"{len(retry)} queued symbol(s) on a new pool")
+                with ThreadPoolExecutor(max_workers=args.workers) as ex:
+                    for fut in as_completed([ex.submit(run_isolated, s) for s in suspects]):
+                        finish(*fut.result())
+            pending = retry
 
     save_state(state)
+    JOURNAL_FILE.unlink()
     RUNNING_SLOTS.clear()
     if RUNNING_FILE.exists():
         RUNNING_FILE.unlink()
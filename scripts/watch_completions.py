@@ -2,13 +2,25 @@
 """
 Watch vultr_run_state.json and append each new completion to completions.log.
 Run in background, then: tail -f ~/regime-engine/completions.log
+
+A watchdog observer on the project root wakes the loop whenever the snapshot or
+the run's journal (vultr_run_state.log, truncated at every snapshot) is written
+or replaced; between events the watcher sleeps. The snapshot is only re-parsed
+when its (mtime, size) changed, and completions in between are read as new lines
+appended to the journal. A new snapshot restarts the journal read at offset 0; if
+a truncation is missed anyway and the read lands mid-line, the torn fragment fails
+to parse and is skipped (its completion is in the next snapshot).
 """
 import json
-import time
+import threading
 from pathlib import Path
 
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
 ROOT = Path(__file__).resolve().parent.parent
 STATE = ROOT / "vultr_run_state.json"
+JOURNAL = ROOT / "vultr_run_state.log"
 LOG = ROOT / "completions.log"
 
 # Create log file immediately so tail -f works
@@ -19,17 +31,78 @@ except OSError as e:
     raise SystemExit(1)
 
 seen = set()
-while True:
-    try:
-        if STATE.exists():
+state_key = None
+journal_pos = 0
+changed = threading.Event()
+
+
+class RunFilesWatcher(FileSystemEventHandler):
+    """Sets `changed` on any event touching the snapshot or the journal."""
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        # save_state writes a temp file and os.replace()s it: the snapshot is a move's dest
+        paths = (event.src_path, getattr(event, "dest_path", "") or "")
+        if any(Path(p).name in (STATE.name, JOURNAL.name) for p in paths if p):
+            changed.set()
+
+
+def record(symbols) -> None:
+    new = [s for s in symbols if s not in seen]
+    if not new:
+        return
+    seen.update(new)
+    with open(LOG, "a") as out:
+        out.writelines(f"{s} done\n" for s in new)
+        out.flush()
+
+
+def scan() -> None:
+    global state_key, journal_pos
+    if STATE.exists():
+        st = STATE.stat()
+        if (st.st_mtime_ns, st.st_size) != state_key:
             with open(STATE) as f:
                 d = json.load(f)
-            for s in d.get("completed", []):
-                if s not in seen:
-                    seen.add(s)
-                    with open(LOG, "a") as out:
-                        out.write(f"{s} done\n")
-                        out.flush()
-    except Exception:
-        pass
-    time.sleep(5)
+            state_key = (st.st_mtime_ns, st.st_size)
+            record(d.get("completed", []))
+            journal_pos = 0  # the journal is truncated right after every snapshot
+    if JOURNAL.exists():
+        size = JOURNAL.stat().st_size
+        if size < journal_pos:
+            journal_pos = 0  # truncated at a snapshot; its lines are in the snapshot
+        if size > journal_pos:
+            with open(JOURNAL, "rb") as f:
+                f.seek(journal_pos)
+                chunk = f.read()
+            # only consume complete lines; a partial last line is re-read on the next event
+            end = chunk.rfind(b"\n") + 1
+            journal_pos += end
+            done = []
+            for line in chunk[:end].splitlines():
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # blank, or the tail of a line cut by a missed truncation
+                if isinstance(rec, dict) and rec.get("ok"):
+                    done.append(rec["sym"])
+            record(done)
+
+
+observer = Observer()
+observer.schedule(RunFilesWatcher(), path=str(ROOT), recursive=False)
+observer.start()
+changed.set()  # initial scan picks up whatever is already on disk
+try:
+    while observer.is_alive():
+        if not changed.wait(timeout=1):
+            continue
+        changed.clear()
+        try:
+            scan()
+        except Exception:
+            pass
+finally:
+    observer.stop()
+    observer.join()
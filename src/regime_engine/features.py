@@ -18,22 +18,17 @@ def compute_realized_vol(returns: pd.Series, period: int = 20) -> pd.Series:
 
 
 def compute_atr(df: pd.DataFrame, period: int = 20) -> pd.Series:
-    high = df["high"]
-    low = df["low"]
-    close = df["close"]
+    high = df["high"].to_numpy(dtype=float)
+    low = df["low"].to_numpy(dtype=float)
+    close = df["close"].to_numpy(dtype=float)
 
-    prev_close = close.shift(1)
+    prev_close = np.full_like(close, np.nan)
+    prev_close[1:] = close[:-1]
 
-    tr = pd.concat(
-        [
-            high - low,
-            (high - prev_close).abs(),
-            (low - prev_close).abs(),
-        ],
-        axis=1,
-    ).max(axis=1)
+    # row-wise max of the three ranges; fmax skips NaN like DataFrame.max(axis=1)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
 
-    return tr.rolling(period).mean()
+    return pd.Series(tr, index=df.index).rolling(period).mean()
 
 
 def compute_drawdown(close: pd.Series) -> pd.Series:
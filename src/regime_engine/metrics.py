@@ -368,6 +368,75 @@ def compute_downside_shock_risk(
     return clamp(dsr, 0.0, 1.0)
 
 
+def _pivot_candidates(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    ATR_f: float,
+    *,
+    k: int,
+    delta: float,
+    tau_T: float,
+    h: int,
+    R_max: float,
+    W: int,
+    dup: np.ndarray | None = None,
+) -> list[tuple[float, float]]:
+    """
+    Swing-pivot evidence for compute_key_levels: (level, score) per pivot bar, in bar order.
+    Pivot high if high[t] is max in [t-k, t+k]; pivot low if low[t] is min in [t-k, t+k].
+    Score = 0.5*T (touches) + 0.3*R (rejection) + 0.2*Q (recency).
+    Window extremes and touch masks are computed for all bars at once; the per-pivot
+    scalar math is unchanged.
+
+    dup marks bars whose timestamp is duplicated in the window: their touches still
+    count toward T but are skipped for rejection (the label lookup was ambiguous).
+    Recency is measured by position, so a duplicated last touch gives its own bar's age.
+    """
+    n = len(close)
+    if n < 2 * k + 1:
+        return []
+
+    # rolling extremes skip NaN (as pandas max/min did); an all-NaN window never matches
+    win_high = np.lib.stride_tricks.sliding_window_view(np.where(np.isnan(high), -np.inf, high), 2 * k + 1).max(axis=1)
+    win_low = np.lib.stride_tricks.sliding_window_view(np.where(np.isnan(low), np.inf, low), 2 * k + 1).min(axis=1)
+    hi = high[k : n - k]
+    lo = low[k : n - k]
+    is_pivot_high = hi == win_high
+    is_pivot = is_pivot_high | (lo == win_low)
+    levels = np.where(is_pivot_high, hi, lo)[is_pivot]
+
+    # touches: bars where |close - L|/ATR <= delta, one row per pivot level
+    touches = np.abs(close[None, :] - levels[:, None]) / ATR_f <= delta
+    touch_counts = touches.sum(axis=1)
+    # rejection: move away over h bars from each touch (touches within h of the end have none)
+    rej_all = np.abs(close[h:] - close[: n - h]) / ATR_f if n > h else np.empty(0)
+    rej_ok = np.ones(len(rej_all), dtype=bool) if dup is None else ~dup[: len(rej_all)]
+    tau_Q = W / 3.0
+
+    out: list[tuple[float, float]] = []
+    for L, row, touch_count in zip(levels, touches, touch_counts):
+        T = float(1.0 - np.exp(-(int(touch_count) / tau_T)))  # saturating
+
+        rej_vals = rej_all[row[: len(rej_all)] & rej_ok]
+        if len(rej_vals):
+            rej_mean = float(np.mean(rej_vals))
+            R = clamp(rej_mean / R_max, 0.0, 1.0)
+        else:
+            R = 0.0
+
+        # recency: bars since last touch
+        if touch_count > 0:
+            age = n - 1 - int(np.flatnonzero(row)[-1])
+        else:
+            age = W
+        Q = float(np.exp(-(age / tau_Q)))
+
+        score_pivot = clamp(0.5 * T + 0.3 * R + 0.2 * Q, 0.0, 1.0)
+        out.append((float(L), float(score_pivot)))
+    return out
+
+
 def compute_key_levels(
     df: pd.DataFrame,
     n_f: int = 20,
@@ -467,60 +536,19 @@ def compute_key_levels(
     # -----------------------------
     # Evidence 1: Swing pivots
     # -----------------------------
-    pivot_cands: list[tuple[float, float]] = []
-
-    # pivot high if high[t] is max in [t-k, t+k]
-    # pivot low if low[t] is min in [t-k, t+k]
-    for i in range(k, len(d) - k):
-        window_high = high.iloc[i - k : i + k + 1]
-        window_low = low.iloc[i - k : i + k + 1]
-        hi = float(high.iloc[i])
-        lo = float(low.iloc[i])
-
-        is_pivot_high = hi == float(window_high.max())
-        is_pivot_low = lo == float(window_low.min())
-
-        # score pivots by: touches, rejection, recency
-        if is_pivot_high or is_pivot_low:
-            L = hi if is_pivot_high else lo
-
-            # touches: count bars where |close - L|/ATR <= delta
-            dist = (close - L).abs() / ATR_f
-            touches_idx = dist[dist <= delta].index
-            touch_count = int(len(touches_idx))
-
-            T = float(1.0 - np.exp(-(touch_count / tau_T)))  # saturating
-
-            # rejection: for each touch, measure move away over h bars
-            rej_vals = []
-            for ts in touches_idx:
-                pos = d.index.get_loc(ts)
-                if isinstance(pos, slice):
-                    continue
-                j = pos + h
-                if j >= len(d):
-                    continue
-                rej = abs(float(close.iloc[j]) - float(close.iloc[pos])) / ATR_f
-                rej_vals.append(rej)
-
-            if rej_vals:
-                rej_mean = float(np.mean(rej_vals))
-                R = clamp(rej_mean / R_max, 0.0, 1.0)
-            else:
-                R = 0.0
-
-            # recency: bars since last touch
-            if touch_count > 0:
-                last_touch = touches_idx[-1]
-                age = len(d) - 1 - d.index.get_loc(last_touch)
-            else:
-                age = W
-
-            tau_Q = W / 3.0
-            Q = float(np.exp(-(age / tau_Q)))
-
-            score_pivot = clamp(0.5 * T + 0.3 * R + 0.2 * Q, 0.0, 1.0)
-            pivot_cands.append((float(L), float(score_pivot)))
+    pivot_cands = _pivot_candidates(
+        high.to_numpy(dtype=float),
+        low.to_numpy(dtype=float),
+        close.to_numpy(dtype=float),
+        ATR_f,
+        k=k,
+        delta=delta,
+        tau_T=tau_T,
+        h=h,
+        R_max=R_max,
+        W=W,
+        dup=d.index.duplicated(keep=False) if not d.index.is_unique else None,
+    )
 
     # -----------------------------
     # Evidence 2: Volume-at-price (optional)
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from regime_engine import metrics
+from regime_engine.metrics import compute_key_levels
+
+
+def clamp(x, lo, hi):
+    return max(lo, min(hi, x))
+
+
+def _reference_pivot_candidates(d, ATR_f, *, k, delta, tau_T, h, R_max, W):
+    # the per-bar pandas loop _pivot_candidates replaced
+    high, low, close = d["high"], d["low"], d["close"]
+    out = []
+    for i in range(k, len(d) - k):
+        window_high = high.iloc[i - k : i + k + 1]
+        window_low = low.iloc[i - k : i + k + 1]
+        hi = float(high.iloc[i])
+        lo = float(low.iloc[i])
+        is_pivot_high = hi == float(window_high.max())
+        is_pivot_low = lo == float(window_low.min())
+        if is_pivot_high or is_pivot_low:
+            L = hi if is_pivot_high else lo
+            dist = (close - L).abs() / ATR_f
+            touches_idx = dist[dist <= delta].index
+            touch_count = int(len(touches_idx))
+            T = float(1.0 - np.exp(-(touch_count / tau_T)))
+            rej_vals = []
+            for ts in touches_idx:
+                pos = d.index.get_loc(ts)
+                if isinstance(pos, slice):
+                    continue
+                j = pos + h
+                if j >= len(d):
+                    continue
+                rej_vals.append(abs(float(close.iloc[j]) - float(close.iloc[pos])) / ATR_f)
+            R = clamp(float(np.mean(rej_vals)) / R_max, 0.0, 1.0) if rej_vals else 0.0
+            if touch_count > 0:
+                age = len(d) - 1 - d.index.get_loc(touches_idx[-1])
+            else:
+                age = W
+            Q = float(np.exp(-(age / (W / 3.0))))
+            out.append((float(L), float(clamp(0.5 * T + 0.3 * R + 0.2 * Q, 0.0, 1.0))))
+    return out
+
+
+def make_df(n, seed, nan_frac=0.0, decimals=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2020-01-01", periods=n, freq="D")
+    # coarse rounding produces tied highs/lows inside pivot windows
+    close = np.round(100 + np.cumsum(rng.normal(0, 1.0, n)), decimals)
+    high = np.round(close + rng.uniform(0, 2, n), decimals)
+    low = np.round(close - rng.uniform(0, 2, n), decimals)
+    if nan_frac:
+        for col in (close, high, low):
+            col[rng.random(n) < nan_frac] = np.nan
+    return pd.DataFrame(
+        {"open": close, "high": high, "low": low, "close": close, "volume": np.full(n, 1_000_000.0)},
+        index=idx,
+    )
+
+
+def _arrays(d):
+    return (
+        d["high"].to_numpy(dtype=float),
+        d["low"].to_numpy(dtype=float),
+        d["close"].to_numpy(dtype=float),
+    )
+
+
+@pytest.mark.parametrize("k", [2, 3])
+@pytest.mark.parametrize("W", [50, 250])
+@pytest.mark.parametrize("nan_frac", [0.0, 0.05])
+def test_pivot_candidates_match_reference_loop(k, W, nan_frac):
+    for seed in range(3):
+        d = make_df(W, seed, nan_frac=nan_frac)
+        params = dict(k=k, delta=0.30, tau_T=3.0, h=5, R_max=2.0, W=W)
+        got = metrics._pivot_candidates(*_arrays(d), 1.7, **params)
+        want = _reference_pivot_candidates(d, 1.7, **params)
+        assert got == pytest.approx(want, rel=1e-12, abs=1e-12)
+
+
+@pytest.mark.parametrize("k", [2, 3])
+@pytest.mark.parametrize("W", [50, 250])
+@pytest.mark.parametrize("nan_frac", [0.0, 0.05])
+def test_key_levels_match_reference_loop(monkeypatch, k, W, nan_frac):
+    df = make_df(W + 40, 7, nan_frac=nan_frac)
+    got = compute_key_levels(df, n_f=20, W=W, k=k)
+
+    def reference(high, low, close, ATR_f, **params):
+        params.pop("dup", None)
+        d = pd.DataFrame({"high": high, "low": low, "close": close}, index=df.index[-len(close) :])
+        return _reference_pivot_candidates(d, ATR_f, **params)
+
+    monkeypatch.setattr(metrics, "_pivot_candidates", reference)
+    assert got == compute_key_levels(df, n_f=20, W=W, k=k)
+
+
+def test_pivot_candidates_skip_duplicate_timestamps_for_rejection():
+    d = make_df(80, 3)
+    # duplicate labels early in the window (monotonic index, as after a bad merge);
+    # the last touch of every level stays on a unique label
+    labels = d.index.to_numpy().copy()
+    labels[1:20:2] = labels[0:20:2]
+    d.index = pd.DatetimeIndex(labels)
+    d.iloc[-10:, d.columns.get_loc("close")] = d["close"].iloc[:10].to_numpy()
+
+    params = dict(k=3, delta=0.30, tau_T=3.0, h=5, R_max=2.0, W=80)
+    dup = d.index.duplicated(keep=False)
+    got = metrics._pivot_candidates(*_arrays(d), 1.7, dup=dup, **params)
+    want = _reference_pivot_candidates(d, 1.7, **params)
+    assert got == pytest.approx(want, rel=1e-12, abs=1e-12)
@@ -0,0 +1,81 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("polars")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from _parquet_cache import cached_parquet  # noqa: E402
+
+
+def _frame():
+    return pd.DataFrame({
+        "ts": pd.date_range("2020-01-01", periods=4, freq="D"),
+        "tf": ["1day", "1day", "4h", "4h"],
+        "group": pd.Categorical(["HIGH", "LOW", "LOW", "HIGH"]),
+        "event": np.array([0, 1, 1, 0], dtype=np.int8),
+        "close": [1.0, np.nan, 3.5, 4.0],
+    })
+
+
+def test_hit_skips_build_and_round_trips(tmp_path):
+    src = tmp_path / "src.csv"
+    src.write_text("x")
+    calls = []
+
+    def build():
+        calls.append(1)
+        return _frame()
+
+    first = cached_parquet(src, "k", build, tmp_path / "cache")
+    second = cached_parquet(src, "k", build, tmp_path / "cache")
+    assert len(calls) == 1
+    want = first.assign(group=first["group"].astype(object))
+    pd.testing.assert_frame_equal(second, want, check_dtype=False)
+    assert second["ts"].dtype.kind == "M"
+
+
+def test_source_change_misses_and_drops_only_its_own_stale_cache(tmp_path):
+    cache_dir = tmp_path / "cache"
+    a = tmp_path / "btcusd_clean.csv"
+    b = tmp_path / "btcusd_clean_v2.csv"
+    a.write_text("x")
+    b.write_text("y")
+    cached_parquet(a, "prices_btcusd_clean", _frame, cache_dir)
+    cached_parquet(b, "prices_btcusd_clean_v2", _frame, cache_dir)
+
+    a.write_text("xx")
+    os.utime(a, (0, 1))
+    calls = []
+    cached_parquet(a, "prices_btcusd_clean", lambda: calls.append(1) or _frame(), cache_dir)
+    assert calls == [1]
+    names = sorted(p.name for p in cache_dir.iterdir())
+    assert len(names) == 2
+    assert any(n.startswith("prices_btcusd_clean_v2@") for n in names)
+
+
+def test_unsupported_columns_and_missing_source_are_not_cached(tmp_path):
+    cache_dir = tmp_path / "cache"
+    src = tmp_path / "src.csv"
+    src.write_text("x")
+    tz = _frame().assign(ts=lambda d: d["ts"].dt.tz_localize("UTC"))
+    cached_parquet(src, "k", lambda: tz, cache_dir)
+    assert not cache_dir.exists()
+    with pytest.raises(FileNotFoundError):
+        cached_parquet(tmp_path / "missing.csv", "k", lambda: pd.read_csv(tmp_path / "missing.csv"), cache_dir)
+
+
+def test_same_size_rewrite_within_a_second_misses(tmp_path):
+    src = tmp_path / "src.csv"
+    src.write_text("a")
+    os.utime(src, ns=(0, 5_000_000_000))
+    cached_parquet(src, "k", _frame, tmp_path / "cache")
+    src.write_text("b")
+    os.utime(src, ns=(0, 5_400_000_000))
+    calls = []
+    cached_parquet(src, "k", lambda: calls.append(1) or _frame(), tmp_path / "cache")
+    assert calls == [1]
@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+stats = pytest.importorskip("scipy.stats")
+pytest.importorskip("polars")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import validate_escalation_rolling_oos as oos  # noqa: E402
+
+
+def _scipy_asymptotic(x, y):
+    res = stats.mannwhitneyu(x, y, alternative="two-sided", method="asymptotic")
+    return float(res.statistic), float(res.pvalue)
+
+
+@pytest.mark.parametrize("n1,n2", [(9, 9), (30, 200), (400, 25)])
+def test_mwu_kernel_matches_scipy_asymptotic(n1, n2):
+    rng = np.random.default_rng(n1 + n2)
+    # rounding forces ties so the tie correction is exercised
+    x = np.round(rng.normal(size=n1), 1)
+    y = np.round(rng.normal(0.2, 1, size=n2), 1)
+    u, p = oos._mwu_asymptotic_numba(x, y)
+    want_u, want_p = _scipy_asymptotic(x, y)
+    assert u == pytest.approx(want_u, abs=1e-9)
+    assert p == pytest.approx(want_p, rel=1e-9, abs=1e-15)
+
+
+def test_mwu_kernel_all_tied_matches_scipy():
+    x = np.full(12, -0.05)
+    y = np.full(40, -0.05)
+    assert oos._mwu_asymptotic_numba(x, y) == pytest.approx(_scipy_asymptotic(x, y))
+    assert oos.mann_whitney(x, y)[1] == 1.0
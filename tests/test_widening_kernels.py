@@ -0,0 +1,145 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# imported the way the validation scripts import it, so numba's on-disk cache is shared
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import _widening_kernels as wk  # noqa: E402
+
+
+@pytest.fixture(params=[True, False], ids=["numba", "numpy"])
+def use_numba(request, monkeypatch):
+    if request.param and not wk._HAS_NUMBA:
+        pytest.skip("numba not installed")
+    monkeypatch.setattr(wk, "_HAS_NUMBA", request.param)
+    return request.param
+
+
+def _reference_forward_stats(close, H):
+    # the original per-bar loop from validate_escalation_distribution_widening.py
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    fwd = np.full(n, np.nan)
+    if n > H:
+        fwd[:-H] = close[H:] / close[:-H] - 1.0
+    mdd = np.full(n, np.nan)
+    mur = np.full(n, np.nan)
+    for i in range(n - H):
+        window = close[i + 1 : i + H + 1] / close[i] - 1.0
+        mdd[i] = np.min(window)
+        mur[i] = np.max(window)
+    return fwd, mdd, mur
+
+
+def _reference_nonoverlap_starts(mask, H):
+    # the original pandas scan from validate_widening_overlap_bias.py
+    mask = pd.Series(mask).reset_index(drop=True)
+    keep_idx = []
+    i = 0
+    while i < len(mask):
+        if bool(mask.iloc[i]):
+            keep_idx.append(i)
+            i += H
+        else:
+            i += 1
+    return np.asarray(keep_idx, dtype=np.int64)
+
+
+def _close(n, seed, nan_frac=0.0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    # repeated prices exercise ties in the window min/max
+    close[rng.random(n) < 0.1] = 100.0
+    if nan_frac:
+        close[rng.random(n) < nan_frac] = np.nan
+    return close
+
+
+@pytest.mark.parametrize("H", [1, 5, 20])
+@pytest.mark.parametrize("n", [0, 3, 20, 21, 300])
+@pytest.mark.parametrize("nan_frac", [0.0, 0.05])
+def test_forward_stats_matches_reference(use_numba, H, n, nan_frac):
+    close = _close(n, seed=n + H, nan_frac=nan_frac)
+    got = wk.forward_stats(close, H)
+    want = _reference_forward_stats(close, H)
+    for g, w in zip(got, want):
+        np.testing.assert_array_equal(g, w)
+
+
+def test_forward_stats_multi_stacks_horizons(use_numba):
+    close = _close(200, seed=1, nan_frac=0.02)
+    fwd, mdd, mur = wk.forward_stats_multi(close, [5, 20])
+    for k, H in enumerate([5, 20]):
+        want = _reference_forward_stats(close, H)
+        np.testing.assert_array_equal(fwd[k], want[0])
+        np.testing.assert_array_equal(mdd[k], want[1])
+        np.testing.assert_array_equal(mur[k], want[2])
+
+
+@pytest.mark.parametrize("H", [1, 3, 20])
+@pytest.mark.parametrize("n", [0, 5, 500])
+@pytest.mark.parametrize("p", [0.0, 0.1, 0.7, 1.0])
+def test_nonoverlap_starts_matches_reference(use_numba, H, n, p):
+    mask = np.random.default_rng(n + H).random(n) < p
+    got = wk.nonoverlap_starts(mask, H)
+    assert got.dtype == np.int64
+    np.testing.assert_array_equal(got, _reference_nonoverlap_starts(mask, H))
+
+
+def _reference_stationary_bootstrap_means(x, n_boot, block_len, rng):
+    # same draws as the kernel, indices built by walking each resample bar by bar
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    p = 1.0 / max(float(block_len), 1.0)
+    out = np.empty(n_boot)
+    rows = max(1, wk._BOOT_CHUNK_ELEMS // max(n, 1))
+    for r0 in range(0, n_boot, rows):
+        m = min(rows, n_boot - r0)
+        new_block = rng.random((m, n)) < p
+        origin = rng.integers(0, n, size=(m, n))
+        for r in range(m):
+            idx = np.empty(n, dtype=np.int64)
+            for t in range(n):
+                idx[t] = origin[r, t] if t == 0 or new_block[r, t] else (idx[t - 1] + 1) % n
+            out[r0 + r] = x[idx].mean()
+    return out
+
+
+@pytest.mark.parametrize("block_len", [0.5, 1.0, 4.0, 50.0])
+def test_stationary_bootstrap_means_matches_reference(block_len):
+    x = np.random.default_rng(0).normal(size=40)
+    got = wk.stationary_bootstrap_means(x, 30, block_len, np.random.default_rng(1))
+    want = _reference_stationary_bootstrap_means(x, 30, block_len, np.random.default_rng(1))
+    np.testing.assert_allclose(got, want, rtol=1e-12)
+
+
+def test_stationary_bootstrap_means_chunks_and_constant_input(monkeypatch):
+    monkeypatch.setattr(wk, "_BOOT_CHUNK_ELEMS", 64)  # several chunks for n=25
+    x = np.full(25, 3.0)
+    got = wk.stationary_bootstrap_means(x, 17, 5.0, np.random.default_rng(2))
+    assert got.shape == (17,)
+    np.testing.assert_allclose(got, 3.0)
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 7, 100])
+def test_upper_quantile_matches_nanquantile(n):
+    rng = np.random.default_rng(n)
+    a = np.round(rng.normal(size=n), 1)
+    a[rng.random(n) < 0.1] = np.nan
+    for q in [0.0, 0.1, 0.5, 0.9, 0.95, 1.0]:
+        want = np.nanquantile(a, q) if np.isfinite(a).any() else np.nan
+        np.testing.assert_equal(wk.upper_quantile(a, q), want)
+
+
+def test_cliffs_delta_matches_pairwise_definition():
+    rng = np.random.default_rng(3)
+    x = np.round(rng.normal(size=30), 1)
+    y = np.round(rng.normal(0.3, 1, size=25), 1)
+    x[4] = np.nan
+    gt = (x[~np.isnan(x), None] > y[None, :]).mean()
+    lt = (x[~np.isnan(x), None] < y[None, :]).mean()
+    assert wk.cliffs_delta(x, y) == pytest.approx(gt - lt, abs=1e-12)
+    assert np.isnan(wk.cliffs_delta(x[:0], y))